@@ -0,0 +1,17 @@
+-- Adds the optional article_chunk table, which stores the scores of each chunk of live
+-- blogs and oversized articles loaded with STORE_ARTICLE_CHUNKS=true, to an existing
+-- database. It predates the other migrations, and 002 moves it onto monthly partitions.
+
+CREATE TABLE IF NOT EXISTS article_chunk (
+    article_id SMALLINT NOT NULL,
+    article_chunk_index SMALLINT NOT NULL,
+    article_chunk_word_count INT NOT NULL,
+    article_chunk_polarity FLOAT NOT NULL,
+    article_chunk_subjectivity FLOAT NOT NULL,
+    article_chunk_positive_sentiment FLOAT NOT NULL,
+    article_chunk_neutral_sentiment FLOAT NOT NULL,
+    article_chunk_negative_sentiment FLOAT NOT NULL,
+    article_chunk_compound_sentiment FLOAT NOT NULL,
+    PRIMARY KEY (article_id, article_chunk_index),
+    FOREIGN KEY (article_id) REFERENCES article(article_id) ON DELETE CASCADE
+);
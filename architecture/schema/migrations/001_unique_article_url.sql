@@ -0,0 +1,15 @@
+-- Adds the unique index on article_url to an existing database. Duplicate articles are
+-- removed first, keeping the earliest stored copy (their topics and chunks cascade).
+
+DELETE FROM article
+WHERE article_id IN (
+    SELECT article_id
+    FROM (
+        SELECT article_id,
+            ROW_NUMBER() OVER (PARTITION BY article_url ORDER BY article_id) AS url_copy
+        FROM article
+    ) AS numbered
+    WHERE url_copy > 1
+);
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS article_url_key ON article (article_url);
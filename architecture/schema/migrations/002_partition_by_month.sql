@@ -0,0 +1,140 @@
+-- Moves article, article_topic and article_chunk onto BIGINT keys and monthly range
+-- partitions of article_published_date. The old tables are renamed, the partitioned
+-- tables and create_article_partitions are created as in schema.sql, a partition is
+-- created for every month from the earliest article to now, and the rows are copied
+-- across before the old tables are dropped. An empty article_chunk is created first if
+-- 000 was not run. Run it while the pipelines are paused; it runs in a single
+-- transaction, so a failure leaves the database unchanged.
+
+BEGIN;
+
+-- article_chunk as created by 000, in case that migration was not run
+CREATE TABLE IF NOT EXISTS article_chunk (
+    article_id SMALLINT NOT NULL,
+    article_chunk_index SMALLINT NOT NULL,
+    article_chunk_word_count INT NOT NULL,
+    article_chunk_polarity FLOAT NOT NULL,
+    article_chunk_subjectivity FLOAT NOT NULL,
+    article_chunk_positive_sentiment FLOAT NOT NULL,
+    article_chunk_neutral_sentiment FLOAT NOT NULL,
+    article_chunk_negative_sentiment FLOAT NOT NULL,
+    article_chunk_compound_sentiment FLOAT NOT NULL,
+    PRIMARY KEY (article_id, article_chunk_index),
+    FOREIGN KEY (article_id) REFERENCES article(article_id) ON DELETE CASCADE
+);
+
+ALTER TABLE article_chunk RENAME TO article_chunk_unpartitioned;
+ALTER TABLE article_topic RENAME TO article_topic_unpartitioned;
+ALTER TABLE article RENAME TO article_unpartitioned;
+ALTER INDEX article_chunk_pkey RENAME TO article_chunk_unpartitioned_pkey;
+ALTER INDEX article_topic_pkey RENAME TO article_topic_unpartitioned_pkey;
+ALTER INDEX article_pkey RENAME TO article_unpartitioned_pkey;
+ALTER INDEX IF EXISTS article_url_key RENAME TO article_unpartitioned_url_key;
+
+CREATE SEQUENCE article_id_seq AS BIGINT;
+
+CREATE TABLE article (
+    article_id BIGINT NOT NULL DEFAULT nextval('article_id_seq'),
+    news_outlet_id SMALLINT NOT NULL,
+    article_headline VARCHAR(255) NOT NULL,
+    article_url VARCHAR(400) NOT NULL,
+    article_published_date TIMESTAMP NOT NULL,
+    article_subjectivity FLOAT NOT NULL,
+    article_polarity FLOAT NOT NULL,
+    article_positive_sentiment FLOAT NOT NULL,
+    article_neutral_sentiment FLOAT NOT NULL,
+    article_negative_sentiment FLOAT NOT NULL,
+    article_compound_sentiment FLOAT NOT NULL,
+    PRIMARY KEY (article_id, article_published_date),
+    FOREIGN KEY (news_outlet_id) REFERENCES  news_outlet(news_outlet_id)
+) PARTITION BY RANGE (article_published_date);
+
+ALTER SEQUENCE article_id_seq OWNED BY article.article_id;
+
+CREATE UNIQUE INDEX article_url_key ON article (article_url, article_published_date);
+
+CREATE TABLE article_topic (
+    article_id BIGINT NOT NULL,
+    article_published_date TIMESTAMP NOT NULL,
+    topic_id SMALLINT NOT NULL,
+    article_topic_positive_sentiment FLOAT NOT NULL,
+    article_topic_negative_sentiment FLOAT NOT NULL,
+    article_topic_neutral_sentiment FLOAT NOT NULL,
+    article_topic_compound_sentiment FLOAT NOT NULL,
+    PRIMARY KEY (article_id, topic_id, article_published_date),
+    FOREIGN KEY (article_id, article_published_date)
+        REFERENCES article(article_id, article_published_date) ON DELETE CASCADE,
+    FOREIGN KEY (topic_id) REFERENCES topic(topic_id)
+) PARTITION BY RANGE (article_published_date);
+
+CREATE TABLE article_chunk (
+    article_id BIGINT NOT NULL,
+    article_published_date TIMESTAMP NOT NULL,
+    article_chunk_index SMALLINT NOT NULL,
+    article_chunk_word_count INT NOT NULL,
+    article_chunk_polarity FLOAT NOT NULL,
+    article_chunk_subjectivity FLOAT NOT NULL,
+    article_chunk_positive_sentiment FLOAT NOT NULL,
+    article_chunk_neutral_sentiment FLOAT NOT NULL,
+    article_chunk_negative_sentiment FLOAT NOT NULL,
+    article_chunk_compound_sentiment FLOAT NOT NULL,
+    PRIMARY KEY (article_id, article_chunk_index, article_published_date),
+    FOREIGN KEY (article_id, article_published_date)
+        REFERENCES article(article_id, article_published_date) ON DELETE CASCADE
+) PARTITION BY RANGE (article_published_date);
+
+CREATE OR REPLACE FUNCTION create_article_partitions(month DATE) RETURNS VOID AS $$
+DECLARE
+    month_start DATE := date_trunc('month', month);
+    suffix TEXT := to_char(month_start, '"p"YYYY_MM');
+    parent TEXT;
+BEGIN
+    IF to_regclass('article_chunk_' || suffix) IS NOT NULL THEN
+        RETURN;
+    END IF;
+    -- serialise concurrent loads creating the same month
+    PERFORM pg_advisory_xact_lock(hashtext('create_article_partitions'));
+    FOREACH parent IN ARRAY ARRAY['article', 'article_topic', 'article_chunk'] LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            parent || '_' || suffix, parent, month_start, month_start + INTERVAL '1 month');
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT create_article_partitions(month::DATE)
+FROM generate_series(
+    date_trunc('month', COALESCE(
+        (SELECT MIN(article_published_date) FROM article_unpartitioned), NOW())),
+    NOW(),
+    INTERVAL '1 month'
+) AS month;
+
+INSERT INTO article
+SELECT article_id, news_outlet_id, article_headline, article_url, article_published_date,
+    article_subjectivity, article_polarity, article_positive_sentiment,
+    article_neutral_sentiment, article_negative_sentiment, article_compound_sentiment
+FROM article_unpartitioned;
+
+INSERT INTO article_topic
+SELECT t.article_id, a.article_published_date, t.topic_id,
+    t.article_topic_positive_sentiment, t.article_topic_negative_sentiment,
+    t.article_topic_neutral_sentiment, t.article_topic_compound_sentiment
+FROM article_topic_unpartitioned AS t
+JOIN article_unpartitioned AS a USING (article_id);
+
+INSERT INTO article_chunk
+SELECT c.article_id, a.article_published_date, c.article_chunk_index,
+    c.article_chunk_word_count, c.article_chunk_polarity, c.article_chunk_subjectivity,
+    c.article_chunk_positive_sentiment, c.article_chunk_neutral_sentiment,
+    c.article_chunk_negative_sentiment, c.article_chunk_compound_sentiment
+FROM article_chunk_unpartitioned AS c
+JOIN article_unpartitioned AS a USING (article_id);
+
+SELECT setval('article_id_seq', COALESCE((SELECT MAX(article_id) FROM article), 0) + 1, false);
+
+DROP TABLE article_chunk_unpartitioned;
+DROP TABLE article_topic_unpartitioned;
+DROP TABLE article_unpartitioned;
+
+COMMIT;
@@ -0,0 +1,13 @@
+-- Adds the indexes the dashboard and daily report queries use, on the date, outlet and
+-- topic they filter and join on. Indexes on partitioned tables cannot be built
+-- CONCURRENTLY, so this blocks writes to the article tables while it runs; run it while
+-- the pipelines are paused. Partitions created later get the indexes automatically.
+
+CREATE INDEX IF NOT EXISTS article_published_date_brin
+    ON article USING BRIN (article_published_date);
+CREATE INDEX IF NOT EXISTS article_news_outlet_published_date_idx
+    ON article (news_outlet_id, article_published_date);
+CREATE INDEX IF NOT EXISTS article_topic_topic_id_idx ON article_topic (topic_id);
+
+ANALYZE article;
+ANALYZE article_topic;
@@ -0,0 +1,55 @@
+-- Adds the daily_outlet_sentiment and daily_topic_sentiment rollups and fills them from
+-- the stored articles. Run it with the pipelines paused, as rows loaded while it runs
+-- would be missed (or counted twice).
+
+BEGIN;
+
+CREATE TABLE daily_outlet_sentiment (
+    day DATE NOT NULL,
+    news_outlet_id SMALLINT NOT NULL,
+    article_count INT NOT NULL,
+    subjectivity_sum FLOAT NOT NULL,
+    polarity_sum FLOAT NOT NULL,
+    positive_sum FLOAT NOT NULL,
+    neutral_sum FLOAT NOT NULL,
+    negative_sum FLOAT NOT NULL,
+    compound_sum FLOAT NOT NULL,
+    compound_sum_squares FLOAT NOT NULL,
+    PRIMARY KEY (day, news_outlet_id),
+    FOREIGN KEY (news_outlet_id) REFERENCES news_outlet(news_outlet_id)
+);
+
+CREATE TABLE daily_topic_sentiment (
+    day DATE NOT NULL,
+    news_outlet_id SMALLINT NOT NULL,
+    topic_id SMALLINT NOT NULL,
+    article_count INT NOT NULL,
+    positive_sum FLOAT NOT NULL,
+    negative_sum FLOAT NOT NULL,
+    neutral_sum FLOAT NOT NULL,
+    compound_sum FLOAT NOT NULL,
+    compound_sum_squares FLOAT NOT NULL,
+    PRIMARY KEY (day, news_outlet_id, topic_id),
+    FOREIGN KEY (news_outlet_id) REFERENCES news_outlet(news_outlet_id),
+    FOREIGN KEY (topic_id) REFERENCES topic(topic_id)
+);
+
+INSERT INTO daily_outlet_sentiment
+SELECT article_published_date::DATE, news_outlet_id, COUNT(*),
+    SUM(article_subjectivity), SUM(article_polarity), SUM(article_positive_sentiment),
+    SUM(article_neutral_sentiment), SUM(article_negative_sentiment),
+    SUM(article_compound_sentiment), SUM(article_compound_sentiment ^ 2)
+FROM article
+GROUP BY 1, 2;
+
+INSERT INTO daily_topic_sentiment
+SELECT a.article_published_date::DATE, a.news_outlet_id, at.topic_id, COUNT(*),
+    SUM(at.article_topic_positive_sentiment), SUM(at.article_topic_negative_sentiment),
+    SUM(at.article_topic_neutral_sentiment), SUM(at.article_topic_compound_sentiment),
+    SUM(at.article_topic_compound_sentiment ^ 2)
+FROM article_topic AS at
+JOIN article AS a ON a.article_id = at.article_id
+    AND a.article_published_date = at.article_published_date
+GROUP BY 1, 2, 3;
+
+COMMIT;
@@ -0,0 +1,43 @@
+-- Adds the optional article_sentence_score table, partitioned by month like the other
+-- article tables, and makes create_article_partitions create its partitions. Its
+-- partitions are created for every month already partitioned. The table is only filled
+-- for articles loaded with STORE_SENTENCE_SCORES=true.
+
+BEGIN;
+
+CREATE TABLE article_sentence_score (
+    article_id BIGINT NOT NULL,
+    article_published_date TIMESTAMP NOT NULL,
+    article_sentence_offsets BYTEA NOT NULL,
+    article_sentence_scores BYTEA NOT NULL,
+    PRIMARY KEY (article_id, article_published_date),
+    FOREIGN KEY (article_id, article_published_date)
+        REFERENCES article(article_id, article_published_date) ON DELETE CASCADE
+) PARTITION BY RANGE (article_published_date);
+
+CREATE OR REPLACE FUNCTION create_article_partitions(month DATE) RETURNS VOID AS $$
+DECLARE
+    month_start DATE := date_trunc('month', month);
+    suffix TEXT := to_char(month_start, '"p"YYYY_MM');
+    parent TEXT;
+BEGIN
+    IF to_regclass('article_sentence_score_' || suffix) IS NOT NULL THEN
+        RETURN;
+    END IF;
+    -- serialise concurrent loads creating the same month
+    PERFORM pg_advisory_xact_lock(hashtext('create_article_partitions'));
+    FOREACH parent IN ARRAY
+            ARRAY['article', 'article_topic', 'article_chunk', 'article_sentence_score'] LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            parent || '_' || suffix, parent, month_start, month_start + INTERVAL '1 month');
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT create_article_partitions(to_date(substring(c.relname FROM '_p(\d{4}_\d{2})$'), 'YYYY_MM'))
+FROM pg_inherits AS i
+JOIN pg_class AS c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'article'::regclass;
+
+COMMIT;
@@ -0,0 +1,24 @@
+-- Moves the uniqueness of article urls into the unpartitioned article_url table, as in
+-- schema.sql. Since 002 the unique index on article also covered article_published_date,
+-- so an article whose feed date changed could be stored twice. The earliest stored
+-- article of each url is recorded, and the index is dropped. Articles already stored
+-- twice are kept; they can be found by grouping article on article_url. Run it while
+-- the pipelines are paused.
+
+BEGIN;
+
+CREATE TABLE article_url (
+    article_url VARCHAR(400) NOT NULL,
+    article_id BIGINT NOT NULL,
+    article_published_date TIMESTAMP NOT NULL,
+    PRIMARY KEY (article_url)
+);
+
+INSERT INTO article_url (article_url, article_id, article_published_date)
+SELECT DISTINCT ON (article_url) article_url, article_id, article_published_date
+FROM article
+ORDER BY article_url, article_id;
+
+DROP INDEX IF EXISTS article_url_key;
+
+COMMIT;
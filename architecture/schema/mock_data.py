@@ -39,17 +39,19 @@ def generate_mock_articles(articles_per_day: int, start_date: datetime, end_date
     return articles
 
 
-def generate_mock_article_topics(article_ids: list[tuple], max_topic_id: int):
-    '''Generate the article topics.'''
+def generate_mock_article_topics(article_keys: list[tuple], max_topic_id: int):
+    '''Generate the article topics, from the (article_id, article_published_date) keys.'''
     topic_ids = list(range(1, max_topic_id+1))
     article_topics = []
-    for article_id in article_ids:
+    for article_id, published_date in article_keys:
         random.shuffle(topic_ids)
         article_topic_ids = topic_ids[:random.randint(1, 10)]
         for article_topic_id in article_topic_ids:
             article_topics.append((
                 # article_id
                 article_id,
+                # article_published_date
+                published_date,
                 # topic_id
                 article_topic_id,
                 # article_topic_positive_sentiment
@@ -88,8 +90,12 @@ if __name__ == "__main__":
         start_date=date(year=2024, month=11, day=5),
         end_date=date(year=2025, month=1, day=30),
     )
+    # CREATE THE MONTHLY PARTITIONS
+    for month in sorted({article[3].date().replace(day=1) for article in articles}):
+        cur.execute("SELECT create_article_partitions(%s)", (month,))
+
     # INSERT THE ARTICLES
-    article_ids = []
+    article_keys = []
     for article in articles:
         query = '''
             INSERT INTO article
@@ -99,23 +105,22 @@ if __name__ == "__main__":
                 article_negative_sentiment, article_compound_sentiment)
             VALUES 
                 (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING article_id
+            RETURNING article_id, article_published_date
         '''
         cur.execute(query, article)
-        article_ids.append(cur.fetchone()[0])
+        article_keys.append(cur.fetchone())
 
     # GENERATE THE ARTICLE TOPICS
-    article_topics = generate_mock_article_topics(article_ids, max_topic_id=35)
+    article_topics = generate_mock_article_topics(article_keys, max_topic_id=35)
 
     # INSERT THE ARTICLE TOPICS
     cur.executemany('''
         INSERT INTO article_topic
-            (article_id, topic_id, article_topic_positive_sentiment,
+            (article_id, article_published_date, topic_id, article_topic_positive_sentiment,
                     article_topic_negative_sentiment, article_topic_neutral_sentiment,
                     article_topic_compound_sentiment)
-        OVERRIDING SYSTEM VALUE
         VALUES
-            (%s, %s, %s, %s, %s, %s)
+            (%s, %s, %s, %s, %s, %s, %s)
     ''', article_topics)
 
     conn.commit()
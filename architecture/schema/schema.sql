@@ -1,7 +1,13 @@
+DROP TABLE IF EXISTS daily_topic_sentiment;
+DROP TABLE IF EXISTS daily_outlet_sentiment;
+DROP TABLE IF EXISTS article_sentence_score;
+DROP TABLE IF EXISTS article_chunk;
 DROP TABLE IF EXISTS article_topic;
+DROP TABLE IF EXISTS article_url;
 DROP TABLE IF EXISTS article;
 DROP TABLE IF EXISTS news_outlet;
 DROP TABLE IF EXISTS topic;
+DROP FUNCTION IF EXISTS create_article_partitions;
 
 -- TABLE DEFINITIONS
 
@@ -17,8 +23,14 @@ CREATE TABLE news_outlet (
     PRIMARY KEY (news_outlet_id)
 );
 
+-- Articles and their topics, chunks and sentence scores are range-partitioned by
+-- publication month, so date-filtered queries only scan the months they need and the
+-- archiver can drop whole months. Keys of a partitioned table must include the partition key, so the article
+-- is identified by (article_id, article_published_date) in keys and foreign keys.
+CREATE SEQUENCE article_id_seq AS BIGINT;
+
 CREATE TABLE article (
-    article_id SMALLINT NOT NULL GENERATED ALWAYS AS IDENTITY,
+    article_id BIGINT NOT NULL DEFAULT nextval('article_id_seq'),
     news_outlet_id SMALLINT NOT NULL,
     article_headline VARCHAR(255) NOT NULL, 
     article_url VARCHAR(400) NOT NULL,
@@ -29,22 +41,135 @@ CREATE TABLE article (
     article_neutral_sentiment FLOAT NOT NULL, 
     article_negative_sentiment FLOAT NOT NULL, 
     article_compound_sentiment FLOAT NOT NULL, 
-    PRIMARY KEY (article_id),
+    PRIMARY KEY (article_id, article_published_date),
     FOREIGN KEY (news_outlet_id) REFERENCES  news_outlet(news_outlet_id)
+) PARTITION BY RANGE (article_published_date);
+
+ALTER SEQUENCE article_id_seq OWNED BY article.article_id;
+
+-- One row per url, with the key of its article, so loads can skip articles already stored
+-- (ON CONFLICT DO NOTHING) whatever their published date. A unique index on the
+-- partitioned article table would have to include article_published_date, so would not
+-- stop an article whose feed date changed being stored twice. The loader claims the urls
+-- of a batch here before inserting its articles. There is no foreign key, so the urls are
+-- kept when their months are archived, and archived articles are not loaded again.
+CREATE TABLE article_url (
+    article_url VARCHAR(400) NOT NULL,
+    article_id BIGINT NOT NULL,
+    article_published_date TIMESTAMP NOT NULL,
+    PRIMARY KEY (article_url)
 );
 
 CREATE TABLE article_topic (
-    article_id SMALLINT NOT NULL,
+    article_id BIGINT NOT NULL,
+    article_published_date TIMESTAMP NOT NULL,
     topic_id SMALLINT NOT NULL,
     article_topic_positive_sentiment FLOAT NOT NULL, 
     article_topic_negative_sentiment FLOAT NOT NULL,
     article_topic_neutral_sentiment FLOAT NOT NULL,
     article_topic_compound_sentiment FLOAT NOT NULL,
-    PRIMARY KEY (article_id, topic_id),
-    FOREIGN KEY (article_id) REFERENCES article(article_id) ON DELETE CASCADE,
+    PRIMARY KEY (article_id, topic_id, article_published_date),
+    FOREIGN KEY (article_id, article_published_date)
+        REFERENCES article(article_id, article_published_date) ON DELETE CASCADE,
     FOREIGN KEY (topic_id) REFERENCES topic(topic_id)
+) PARTITION BY RANGE (article_published_date);
+
+-- Optional per-chunk detail of articles analysed in chunks (e.g. live blogs).
+CREATE TABLE article_chunk (
+    article_id BIGINT NOT NULL,
+    article_published_date TIMESTAMP NOT NULL,
+    article_chunk_index SMALLINT NOT NULL,
+    article_chunk_word_count INT NOT NULL,
+    article_chunk_polarity FLOAT NOT NULL,
+    article_chunk_subjectivity FLOAT NOT NULL,
+    article_chunk_positive_sentiment FLOAT NOT NULL,
+    article_chunk_neutral_sentiment FLOAT NOT NULL,
+    article_chunk_negative_sentiment FLOAT NOT NULL,
+    article_chunk_compound_sentiment FLOAT NOT NULL,
+    PRIMARY KEY (article_id, article_chunk_index, article_published_date),
+    FOREIGN KEY (article_id, article_published_date)
+        REFERENCES article(article_id, article_published_date) ON DELETE CASCADE
+) PARTITION BY RANGE (article_published_date);
+
+-- Optional scores of each sentence of an article, for rebuilding topic sentiment for other
+-- key terms without re-running the analysis: the (start, end) character offsets of the
+-- sentences as little-endian uint32 pairs, and their VADER (pos, neu, neg, compound)
+-- scores as little-endian float16s, 16 bytes per sentence.
+CREATE TABLE article_sentence_score (
+    article_id BIGINT NOT NULL,
+    article_published_date TIMESTAMP NOT NULL,
+    article_sentence_offsets BYTEA NOT NULL,
+    article_sentence_scores BYTEA NOT NULL,
+    PRIMARY KEY (article_id, article_published_date),
+    FOREIGN KEY (article_id, article_published_date)
+        REFERENCES article(article_id, article_published_date) ON DELETE CASCADE
+) PARTITION BY RANGE (article_published_date);
+
+-- Daily rollups of the article and topic scores per outlet (and topic), kept up to date by
+-- the scraper pipeline in the transaction loading the articles, so the dashboard and the
+-- daily report read a few rows per day instead of aggregating the article tables. They
+-- hold sums rather than means, so days can be combined: the mean is sum / article_count,
+-- and the variance (compound_sum_squares - compound_sum^2 / article_count) /
+-- (article_count - 1). The rollups are kept when the articles are archived.
+CREATE TABLE daily_outlet_sentiment (
+    day DATE NOT NULL,
+    news_outlet_id SMALLINT NOT NULL,
+    article_count INT NOT NULL,
+    subjectivity_sum FLOAT NOT NULL,
+    polarity_sum FLOAT NOT NULL,
+    positive_sum FLOAT NOT NULL,
+    neutral_sum FLOAT NOT NULL,
+    negative_sum FLOAT NOT NULL,
+    compound_sum FLOAT NOT NULL,
+    compound_sum_squares FLOAT NOT NULL,
+    PRIMARY KEY (day, news_outlet_id),
+    FOREIGN KEY (news_outlet_id) REFERENCES news_outlet(news_outlet_id)
 );
 
+CREATE TABLE daily_topic_sentiment (
+    day DATE NOT NULL,
+    news_outlet_id SMALLINT NOT NULL,
+    topic_id SMALLINT NOT NULL,
+    article_count INT NOT NULL,
+    positive_sum FLOAT NOT NULL,
+    negative_sum FLOAT NOT NULL,
+    neutral_sum FLOAT NOT NULL,
+    compound_sum FLOAT NOT NULL,
+    compound_sum_squares FLOAT NOT NULL,
+    PRIMARY KEY (day, news_outlet_id, topic_id),
+    FOREIGN KEY (news_outlet_id) REFERENCES news_outlet(news_outlet_id),
+    FOREIGN KEY (topic_id) REFERENCES topic(topic_id)
+);
+
+-- Indexes for the dashboard and daily report. Articles are loaded in roughly publication
+-- order, so a BRIN index covers date ranges at a fraction of the size of a B-tree.
+CREATE INDEX article_published_date_brin ON article USING BRIN (article_published_date);
+CREATE INDEX article_news_outlet_published_date_idx
+    ON article (news_outlet_id, article_published_date);
+CREATE INDEX article_topic_topic_id_idx ON article_topic (topic_id);
+
+-- Creates the partitions of the month containing the given date (e.g. article_p2025_01),
+-- if they do not exist. The pipeline calls it for the months of each batch it loads.
+CREATE FUNCTION create_article_partitions(month DATE) RETURNS VOID AS $$
+DECLARE
+    month_start DATE := date_trunc('month', month);
+    suffix TEXT := to_char(month_start, '"p"YYYY_MM');
+    parent TEXT;
+BEGIN
+    IF to_regclass('article_sentence_score_' || suffix) IS NOT NULL THEN
+        RETURN;
+    END IF;
+    -- serialise concurrent loads creating the same month
+    PERFORM pg_advisory_xact_lock(hashtext('create_article_partitions'));
+    FOREACH parent IN ARRAY
+            ARRAY['article', 'article_topic', 'article_chunk', 'article_sentence_score'] LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            parent || '_' || suffix, parent, month_start, month_start + INTERVAL '1 month');
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
 -- SEEDING
 
 INSERT INTO news_outlet
@@ -0,0 +1,70 @@
+'''
+    Script defining the ArchiveReader class, which queries the articles archived in the S3
+    bucket. The partitions to read are chosen from the archive's manifest by the
+    publication dates of their rows, so the bucket is never listed and only the partitions
+    a query covers are downloaded.
+
+        python archive_reader.py 2024-03-01 2024-03-08 --columns article_headline --output week.csv
+'''
+
+import argparse
+import io
+from datetime import datetime
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+from s3_manager import S3Manager
+from transformer import ARCHIVE_SCHEMA
+
+
+class ArchiveReader:
+    '''Class reading the archived rows published within a date range.'''
+
+    def __init__(self, s3_manager: S3Manager) -> None:
+        '''Instantiate the reader on the S3 manager of the archive's bucket.'''
+        self.__s3_manager = s3_manager
+
+    def get_partition_keys(self, start: datetime, end: datetime) -> list[str]:
+        '''Get the keys of the partitions with rows published from the start until the
+        end, from the manifest.'''
+        return sorted(key for key, entry in self.__s3_manager.get_manifest().items()
+                      if datetime.fromisoformat(entry['first_published']) < end
+                      and datetime.fromisoformat(entry['last_published']) >= start)
+
+    def read_articles(self, start: datetime, end: datetime,
+                      columns: list[str] = None) -> pd.DataFrame:
+        '''Read the archived rows published from the start until the end, with the
+        columns given (or every column).'''
+        filters = [('article_published_date', '>=', start),
+                   ('article_published_date', '<', end)]
+        tables = [pq.read_table(io.BytesIO(self.__s3_manager.read_object(key)),
+                                columns=columns, filters=filters)
+                  for key in self.get_partition_keys(start, end)]
+        if not tables:
+            return ARCHIVE_SCHEMA.empty_table().select(columns or ARCHIVE_SCHEMA.names).to_pandas()
+        return pa.concat_tables(tables).to_pandas()
+
+
+def main() -> None:
+    '''Write the archived rows published within a date range to a CSV file.'''
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('start', type=datetime.fromisoformat,
+                        help='First publication date to read (inclusive).')
+    parser.add_argument('end', type=datetime.fromisoformat,
+                        help='Publication date to read until (exclusive).')
+    parser.add_argument('--columns', nargs='+', choices=ARCHIVE_SCHEMA.names,
+                        help='Columns to read (default: every column).')
+    parser.add_argument('--output', default='archive.csv', help='CSV file to write.')
+    args = parser.parse_args()
+    load_dotenv()
+    reader = ArchiveReader(S3Manager())
+    keys = reader.get_partition_keys(args.start, args.end)
+    articles = reader.read_articles(args.start, args.end, args.columns)
+    articles.to_csv(args.output, index=False)
+    print(f"{len(articles)} rows read from {len(keys)} partitions to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,18 @@
     The following script contains the high-level pipeline for the entire archival pipeline.
 '''
 
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, timedelta
 from dotenv import load_dotenv
 from database_manager import DatabaseManager
-from transformer import DataFrameToCSVTransformer
+from transformer import DataFrameToParquetTransformer
 from s3_manager import S3Manager
 
+# Each worker borrows a connection from the pool, which also holds the archiver's own, so
+# keep ARCHIVE_WORKERS below DB_POOL_MAX_CONNECTIONS (5 by default).
+DEFAULT_WORKERS = 4
+
 
 class Archiver:
     # pylint: disable=too-few-public-methods
@@ -16,22 +22,67 @@ class Archiver:
 
     def __init__(self, months_ago: int):
         '''Instantiate the archiver with the cut-off date. Any dates before this one 
-        should be archived.'''
-        self.__cut_off_date = date.today() - timedelta(days=months_ago*30)
+        should be archived. The cut-off is the start of a month, as whole monthly
+        partitions are archived. Days are archived on ARCHIVE_WORKERS threads.'''
+        self.__cut_off_date = (date.today() - timedelta(days=months_ago*30)).replace(day=1)
+        self.__workers = int(os.environ.get('ARCHIVE_WORKERS', DEFAULT_WORKERS))
         self.__db_manager = DatabaseManager()
-        self.__transformer = DataFrameToCSVTransformer()
         self.__loader = S3Manager()
+        self.__transformer = DataFrameToParquetTransformer(
+            open_partition=self.__loader.open_object_writer)
 
     def run_pipeline(self) -> None:
-        '''Run the entire data-pipeline for archiving.'''
+        '''Run the entire data-pipeline for archiving. Every day still in the database
+        before the cut-off is exported, as its rows may have changed (e.g. rescored by a
+        backfill) without their number changing, and the checksum of its file decides
+        whether it is uploaded again.'''
         print("Pipeline has begun.")
-        data_to_archive = self.__db_manager.fetch_data_to_archive(
-            self.__cut_off_date)
-        print("Data to archive retrieved.")
-        self.__transformer.save_dataframe_to_csv(data_to_archive)
-        print("Data converted to CSV file.")
-        self.__loader.upload_csv_to_bucket(self.__cut_off_date)
-        print("CSV uploaded to S3 bucket.")
-        self.__db_manager.remove_archived_rows()
+        days = sorted(self.__db_manager.count_rows_to_archive(self.__cut_off_date))
+        changed = self._archive_days(days)
+        print(f"{len(days)} days archived to daily Parquet files in the S3 bucket, "
+              f"{len(days) - changed} of them unchanged.")
+        self.__db_manager.remove_archived_rows(self._is_month_archived)
         print("Archived rows removed from RDS")
         self.__db_manager.close_connection()
+
+    def _archive_day(self, day: date) -> dict[str, dict]:
+        '''Export the data of a day and upload it to its partition, on a database
+        connection of its own. Returns the manifest entry of the partition by its key.'''
+        db_manager = DatabaseManager()
+        try:
+            chunks = db_manager.stream_data_to_archive(day + timedelta(days=1), start_date=day)
+            return self.__transformer.save_dataframes_to_parquet(chunks)
+        finally:
+            db_manager.close_connection()
+
+    def _archive_days(self, days: list[date]) -> int:
+        '''Archive the days in parallel, on a bounded pool of threads, and add their
+        partitions to the manifest. The manifest is saved even if a day fails, so a re-run
+        does not upload the days which were archived again. Returns the number of
+        partitions which changed.'''
+        executor = ThreadPoolExecutor(max_workers=self.__workers)
+        futures = [executor.submit(self._archive_day, day) for day in days]
+        changed = 0
+        try:
+            for future in as_completed(futures):
+                future.result()
+        finally:
+            # after a failure, days not started are cancelled and days running finish
+            executor.shutdown(cancel_futures=True)
+            for future in futures:
+                if not future.cancelled() and future.exception() is None:
+                    for key, entry in future.result().items():
+                        changed += self.__loader.add_to_manifest(key, entry)
+            self.__loader.save_manifest()
+        return changed
+
+    def _is_month_archived(self, month: date, rows_by_day: dict[date, int]) -> bool:
+        '''Check the partition of every day of a month is in the S3 bucket, with as many
+        rows as the database holds for the day.'''
+        for day, rows in sorted(rows_by_day.items()):
+            key = self.__transformer.get_partition_key(day)
+            archived_rows = self.__loader.get_parquet_row_count(key)
+            if archived_rows != rows:
+                print(f"{key} holds {archived_rows} rows, not {rows}; {month:%Y-%m} is kept.")
+                return False
+        return True
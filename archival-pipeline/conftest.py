@@ -0,0 +1,22 @@
+'''
+    Makes the shared modules (e.g. db_pool) importable in the tests, as they are in the
+    Docker image, and defines the fixtures shared by the tests.
+'''
+
+import os
+import sys
+import boto3
+import pytest
+from moto import mock_aws
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+
+
+@pytest.fixture
+def bucket():
+    '''A client of a bucket in moto's stand-in for S3, named as in the environment.'''
+    with mock_aws():
+        client = boto3.client("s3", region_name="eu-west-2")
+        client.create_bucket(Bucket="my-fake-bucket",
+                             CreateBucketConfiguration={"LocationConstraint": "eu-west-2"})
+        yield client
@@ -1,14 +1,19 @@
 '''
     The following script defines the DatabaseManager, a class concerned with connecting 
     to the database. This class has two main functions, querying data to be archived, and
-    then later removing those rows from the database once archiving was successful.
+    then later removing those rows from the database once archiving was successful. The
+    data is streamed through a server-side cursor in fixed-size chunks, so memory use does
+    not grow with the size of the archive. The article tables are partitioned by month, so
+    archived rows are removed by detaching and dropping whole monthly partitions, a month
+    at a time once its archive is verified.
 '''
 
-import os
 from datetime import date
-import psycopg2
+from typing import Callable, Iterator
+from psycopg2 import sql
 from psycopg2.extensions import connection
 import pandas as pd
+import db_pool
 
 
 class DatabaseManager:
@@ -28,53 +33,159 @@ class DatabaseManager:
             at.article_topic_negative_sentiment, 
             at.article_topic_neutral_sentiment, 
             at.article_topic_compound_sentiment
-        FROM article_topic at
-        JOIN article a ON a.article_id = at.article_id
-        JOIN topic t ON t.topic_id = at.topic_id
+        FROM article a
+        LEFT JOIN article_topic at ON at.article_id = a.article_id
+            AND at.article_published_date = a.article_published_date
+        LEFT JOIN topic t ON t.topic_id = at.topic_id
         JOIN news_outlet no ON no.news_outlet_id = a.news_outlet_id
-        WHERE a.article_published_date < %s
+        WHERE a.article_published_date >= %s AND a.article_published_date < %s
+        ORDER BY a.article_published_date, a.article_id, at.topic_id
     """
-    DELETE_ARTICLES_QUERY = """
-        DELETE FROM article WHERE article.article_id in %s;
+    PARTITIONS_QUERY = """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'article'::regclass;
     """
+    # The rows of each day of a date range, as the archive query returns them.
+    ARCHIVED_ROW_COUNT_QUERY = """
+        SELECT a.article_published_date::DATE AS day, COUNT(*)
+        FROM article a
+        LEFT JOIN article_topic at ON at.article_id = a.article_id
+            AND at.article_published_date = a.article_published_date
+        JOIN news_outlet no ON no.news_outlet_id = a.news_outlet_id
+        WHERE a.article_published_date >= %s AND a.article_published_date < %s
+        GROUP BY day;
+    """
+    LOCK_TIMEOUT_QUERY = "SET LOCAL lock_timeout = '5s';"
+    LOCK_PARTITIONS_QUERY = sql.SQL("LOCK TABLE {} IN SHARE MODE;")
+    DETACH_PARTITION_QUERY = sql.SQL("ALTER TABLE {} DETACH PARTITION {};")
+    DROP_PARTITION_QUERY = sql.SQL("DROP TABLE {};")
+    # Partitions referencing article are removed before the article partition.
+    PARTITIONED_TABLES = ('article_sentence_score', 'article_chunk', 'article_topic', 'article')
+    EXPORT_CURSOR_NAME = 'archive_export'
+    DEFAULT_CHUNK_SIZE = 50_000
 
     def __init__(self) -> None:
         '''Initializes the DatabaseManager by connecting to the RDS database.'''
         self.__db_connection = self._create_connection()
-        self.__data_to_archive = None
+        self.__cut_off_date = None
 
     def _create_connection(self) -> connection:
-        '''Gets a connection to the RDS database'''
-        return psycopg2.connect(
-            database=os.environ['DB_NAME'],
-            user=os.environ["DB_USERNAME"],
-            host=os.environ["DB_HOST"],
-            password=os.environ["DB_PASSWORD"],
-            port=os.environ["DB_PORT"]
-        )
-
-    def fetch_data_to_archive(self, cut_off_date: date) -> pd.DataFrame:
-        '''Fetches data from the RDS database and reads it into a dataframe'''
-        data_to_archive = pd.read_sql(self.FETCH_ARTICLE_DATA_QUERY,
-                                      self.__db_connection,
-                                      params=(cut_off_date,))
-        self.__data_to_archive = data_to_archive
-        return data_to_archive
-
-    def remove_archived_rows(self) -> None:
-        '''Remove the rows which were previously queried from the database to be archived.'''
-        if self.__data_to_archive is None:
+        '''Gets a connection to the RDS database from the process's pool, so warm
+        invocations reuse an open connection.'''
+        return db_pool.get_connection()
+
+    def _reconnect(self) -> None:
+        '''Replace a broken connection with a new one from the pool.'''
+        db_pool.release_connection(self.__db_connection, discard=True)
+        self.__db_connection = self._create_connection()
+
+    def stream_data_to_archive(self, cut_off_date: date,
+                               chunk_size: int = DEFAULT_CHUNK_SIZE,
+                               start_date: date = date.min) -> Iterator[pd.DataFrame]:
+        '''Streams the data published from the start date until the cut-off date, in order
+        of publication, in dataframes of at most chunk_size rows read from a named
+        (server-side) cursor, so only one chunk is held in memory whatever the size of the
+        archive. An empty dataframe with the columns is yielded if there is no data. The
+        archived rows can only be removed once every chunk has been read.'''
+        self.__cut_off_date = None
+        rows_exported = 0
+        with self.__db_connection.cursor(name=self.EXPORT_CURSOR_NAME) as cursor:
+            cursor.itersize = chunk_size
+            cursor.execute(self.FETCH_ARTICLE_DATA_QUERY, (start_date, cut_off_date))
+            while True:
+                records = cursor.fetchmany(chunk_size)
+                if records or rows_exported == 0:
+                    columns = [column.name for column in cursor.description]
+                    yield pd.DataFrame.from_records(records, columns=columns)
+                if not records:
+                    break
+                rows_exported += len(records)
+        # end the transaction the cursor was read in
+        self.__db_connection.commit()
+        self.__cut_off_date = cut_off_date
+
+    def _read_rows_by_day(self, start_date: date, end_date: date) -> dict[date, int]:
+        '''Counts the rows of the archive query of each day in a date range.'''
+        with self.__db_connection.cursor() as cursor:
+            cursor.execute(self.ARCHIVED_ROW_COUNT_QUERY, (start_date, end_date))
+            rows_by_day = dict(cursor.fetchall())
+        self.__db_connection.commit()
+        return rows_by_day
+
+    def count_rows_to_archive(self, cut_off_date: date) -> dict[date, int]:
+        '''Counts the rows of the data older than the cut-off date by publication day, so
+        the days can be archived separately. The archived rows can then be removed.'''
+        rows_by_day = db_pool.retry(self._read_rows_by_day, date.min, cut_off_date,
+                                    on_retry=self._reconnect)
+        self.__cut_off_date = cut_off_date
+        return rows_by_day
+
+    def remove_archived_rows(
+            self, verify_month: Callable[[date, dict[date, int]], bool]) -> list[date]:
+        '''Remove the rows which were previously queried from the database to be archived,
+        by dropping the monthly partitions which end on or before the cut-off date. Rows
+        of a month the cut-off falls within are kept, so the cut-off should be the start
+        of a month. Each month is dropped in its own transaction, and only once
+        verify_month confirms its archive holds the month's number of rows of each day.
+        Removal stops at the first month which is not verified, so a failed or interrupted
+        run resumes from it when re-run. Returns the months dropped.'''
+        if self.__cut_off_date is None:
             raise ValueError(
-                "No data to archive. Ensure fetch_data_to_archive has called previously.")
-        article_ids = tuple(int(n)
-                            for n in self.__data_to_archive['article_id'].unique())
-        if len(article_ids) == 0:
-            return None
+                "No data to archive. Ensure the data to archive has been read previously.")
+        months = db_pool.retry(self._get_archived_months, on_retry=self._reconnect)
+        for month in months:
+            db_pool.retry(self._drop_month_partitions, month, verify_month,
+                          on_retry=self._reconnect)
+            print(f"Partitions of {month:%Y-%m} dropped.")
+        return months
+
+    @staticmethod
+    def _get_partition_month(partition_name: str) -> date:
+        '''Get the month of an article partition from its name, e.g. article_p2025_01.'''
+        year, month = partition_name.rsplit('_p', 1)[1].split('_')
+        return date(int(year), int(month), 1)
+
+    @staticmethod
+    def _get_next_month(month: date) -> date:
+        '''Get the first day of the month after the given month.'''
+        return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+    def _get_archived_months(self) -> list[date]:
+        '''Get the months, in order, whose partitions end by the cut-off date.'''
+        with self.__db_connection.cursor() as cursor:
+            cursor.execute(self.PARTITIONS_QUERY)
+            months = sorted(self._get_partition_month(name)
+                            for (name,) in cursor.fetchall())
+        self.__db_connection.commit()
+        return [month for month in months
+                if self._get_next_month(month) <= self.__cut_off_date]
+
+    def _drop_month_partitions(self, month: date,
+                               verify_month: Callable[[date, dict[date, int]], bool]) -> None:
+        '''Detaches and drops a month's partitions of every article table, in a single
+        transaction. The partitions are locked against writes while the rows of each day
+        are counted and verified, so the rows dropped are the rows verified.'''
+        partitions = [sql.Identifier(f"{table}_p{month:%Y_%m}")
+                      for table in self.PARTITIONED_TABLES]
         with self.__db_connection.cursor() as cursor:
-            cursor.execute(self.DELETE_ARTICLES_QUERY, (article_ids,))
+            cursor.execute(self.LOCK_TIMEOUT_QUERY)
+            cursor.execute(self.LOCK_PARTITIONS_QUERY.format(sql.SQL(', ').join(partitions)))
+            cursor.execute(self.ARCHIVED_ROW_COUNT_QUERY,
+                           (month, self._get_next_month(month)))
+            rows_by_day = dict(cursor.fetchall())
+            if not verify_month(month, rows_by_day):
+                self.__db_connection.rollback()
+                raise ValueError(
+                    f"The archive of {month:%Y-%m} could not be verified, so it was not removed.")
+            for table, partition in zip(self.PARTITIONED_TABLES, partitions):
+                cursor.execute(self.DETACH_PARTITION_QUERY.format(
+                    sql.Identifier(table), partition))
+                cursor.execute(self.DROP_PARTITION_QUERY.format(partition))
         self.__db_connection.commit()
 
     def close_connection(self) -> None:
-        '''Closes the database connection.'''
+        '''Gives the database connection back to the pool.'''
         if self.__db_connection:
-            self.__db_connection.close()
+            db_pool.release_connection(self.__db_connection)
@@ -1,21 +1,169 @@
 '''
-    This script defines the S3Manager class, which interacts with the S3 bucket on AWS.
+    This script defines the S3Manager class, which interacts with the S3 bucket on AWS and
+    keeps the manifest of the archive, and the S3MultipartWriter class, a file object
+    streaming an object to the bucket without writing it to disk.
 '''
 
+import hashlib
+import io
+import json
 import os
-from datetime import timedelta, date
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable
 import boto3
+import pyarrow.parquet as pq
+
+# Readers of the archive as a dataset (e.g. pyarrow) skip keys starting with an underscore.
+MANIFEST_KEY = '_manifest.json'
+# A Parquet file ends with its footer's length (4 bytes) and magic number (4 bytes).
+PARQUET_TAIL_SIZE = 8
+# Parts of a multipart upload must be at least 5 MiB, except the last.
+PART_SIZE = 8 * 1024 * 1024
+MAX_CONCURRENT_PARTS = 4
+
+
+class S3MultipartWriter:
+    # pylint: disable=too-many-instance-attributes
+    '''Writable file object streaming an object to S3. Writes are buffered into parts,
+    which are uploaded in parallel as a multipart upload once the first part fills, with at
+    most MAX_CONCURRENT_PARTS parts held in memory. An object smaller than one part is
+    uploaded with a single put when it is closed. Leaving a with block by an exception
+    aborts the upload, so no partial object is written.
+
+    The SHA-256 checksum of the object is computed as it is written. If an object smaller
+    than one part matches skip_checksum, it is not put, keeping the object already in the
+    bucket. The parts of a larger object are uploaded before its checksum is known, so its
+    multipart upload is always completed.'''
+
+    def __init__(self, client, bucket_name: str, key: str, executor: Executor,
+                 part_size: int = PART_SIZE, skip_checksum: str = None,
+                 on_close: Callable[[str, int, str], None] = None) -> None:
+        '''Initialise the writer of an object, uploading parts on the executor. on_close
+        is called with the key, size and checksum of the object once it is closed.'''
+        # pylint: disable=too-many-arguments, too-many-positional-arguments
+        self.__client = client
+        self.__bucket_name = bucket_name
+        self.__key = key
+        self.__executor = executor
+        self.__part_size = part_size
+        self.__buffer = bytearray()
+        self.__position = 0
+        self.__upload_id = None
+        self.__parts: list[Future] = []
+        self.__hash = hashlib.sha256()
+        self.__skip_checksum = skip_checksum
+        self.__on_close = on_close
+        self.closed = False
+        self.skipped = False
+
+    def __enter__(self) -> 'S3MultipartWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _put_part(self, part_number: int, data: bytes) -> dict:
+        '''Upload one part of the multipart upload.'''
+        response = self.__client.upload_part(
+            Bucket=self.__bucket_name, Key=self.__key, UploadId=self.__upload_id,
+            PartNumber=part_number, Body=data)
+        return {'PartNumber': part_number, 'ETag': response['ETag']}
+
+    def _upload_part(self) -> None:
+        '''Submit the buffer as the next part, starting the multipart upload with the first
+        part, and waiting for a part to finish if too many are in flight.'''
+        if self.__upload_id is None:
+            self.__upload_id = self.__client.create_multipart_upload(
+                Bucket=self.__bucket_name, Key=self.__key)['UploadId']
+        in_flight = [part for part in self.__parts if not part.done()]
+        if len(in_flight) >= MAX_CONCURRENT_PARTS:
+            wait(in_flight, return_when=FIRST_COMPLETED)
+        self.__parts.append(self.__executor.submit(
+            self._put_part, len(self.__parts) + 1, bytes(self.__buffer)))
+        self.__buffer = bytearray()
+
+    def write(self, data: bytes) -> int:
+        '''Write bytes to the object.'''
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        self.__buffer += data
+        self.__hash.update(data)
+        size = memoryview(data).nbytes
+        self.__position += size
+        if len(self.__buffer) >= self.__part_size:
+            self._upload_part()
+        return size
+
+    def tell(self) -> int:
+        '''Get the number of bytes written.'''
+        return self.__position
+
+    def writable(self) -> bool:
+        '''The object can only be written.'''
+        return True
+
+    def flush(self) -> None:
+        '''Parts are only uploaded once they fill, so there is nothing to flush.'''
+
+    def close(self) -> None:
+        '''Upload the rest of the object, and complete the multipart upload, or put the
+        object if it is smaller than one part and its checksum does not match
+        skip_checksum.'''
+        if self.closed:
+            return
+        checksum = self.__hash.hexdigest()
+        if self.__upload_id is not None:
+            self._complete_multipart_upload()
+        elif checksum == self.__skip_checksum:
+            self.skipped = True
+        else:
+            self.__client.put_object(
+                Bucket=self.__bucket_name, Key=self.__key, Body=bytes(self.__buffer))
+        self.__buffer = bytearray()
+        self.closed = True
+        if self.__on_close is not None:
+            self.__on_close(self.__key, self.__position, checksum)
+
+    def _complete_multipart_upload(self) -> None:
+        '''Upload the last part and complete the multipart upload, aborting it if this
+        fails.'''
+        completed = False
+        try:
+            if self.__buffer:
+                self._upload_part()
+            parts = [part.result() for part in self.__parts]
+            self.__client.complete_multipart_upload(
+                Bucket=self.__bucket_name, Key=self.__key, UploadId=self.__upload_id,
+                MultipartUpload={'Parts': parts})
+            completed = True
+        finally:
+            if not completed:
+                self.abort()
+
+    def abort(self) -> None:
+        '''Abandon the object, aborting its multipart upload if one was started.'''
+        if self.__upload_id is not None:
+            wait(self.__parts)
+            self.__client.abort_multipart_upload(
+                Bucket=self.__bucket_name, Key=self.__key, UploadId=self.__upload_id)
+            self.__upload_id = None
+        self.__buffer = bytearray()
+        self.closed = True
 
 
 class S3Manager:
-    # pylint: disable=too-few-public-methods
     '''Class that interacts with AWS S3 bucket'''
 
-    def __init__(self, output_path: str = '/tmp/data.csv'):
+    def __init__(self):
         '''Initialise the S3 manager class.'''
-        self.__output_path = os.path.abspath(output_path)
         self.__client_s3 = self._get_s3_client()
         self.__bucket_name = self._get_bucket_name()
+        self.__executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_PARTS)
+        self.__manifest = None
+        self.__uploads = {}
 
     def _get_s3_client(self):
         '''Initialise an S3 client with boto3.'''
@@ -30,16 +178,63 @@ class S3Manager:
         '''Get the bucket name from environment variables.'''
         return os.environ['BUCKET_NAME']
 
-    def _create_bucket_key(self, cut_off_date: date) -> str:
-        '''Returns the key of the object (csv) to be stored on S3. The archived data
-        is everything before the cut-off date, meaning the data comes from a day before the
-        cut-off date.'''
-        archive_date = cut_off_date-timedelta(days=1)
-        return archive_date.strftime("%Y/%m/%d.csv")
-
-    def upload_csv_to_bucket(self, cut_off_date: date):
-        '''Upload the archived data, in the csv to the specified S3 bucket.'''
-        bucket_key = self._create_bucket_key(cut_off_date)
-        with open(self.__output_path, 'rb') as file:
-            self.__client_s3.put_object(
-                Bucket=self.__bucket_name, Key=bucket_key, Body=file)
+    def open_object_writer(self, key: str) -> S3MultipartWriter:
+        '''Open a file object streaming an object to the S3 bucket under the key. Parts
+        are uploaded in parallel, on threads shared by the objects of this manager. The
+        put of an object smaller than one part is skipped if the manifest holds it with the
+        same checksum, and the object's size and checksum are kept for its manifest
+        entry.'''
+        skip_checksum = self.get_manifest().get(key, {}).get('checksum')
+        return S3MultipartWriter(self.__client_s3, self.__bucket_name, key, self.__executor,
+                                 skip_checksum=skip_checksum, on_close=self._record_upload)
+
+    def _record_upload(self, key: str, size: int, checksum: str) -> None:
+        '''Keep the size and checksum of an object written, for its manifest entry.'''
+        self.__uploads[key] = {'bytes': size, 'checksum': checksum}
+
+    def get_parquet_row_count(self, key: str) -> int:
+        '''Get the number of rows of a Parquet object in the S3 bucket from its footer, read
+        with ranged GETs, or None if there is no such object.'''
+        try:
+            tail = self.__client_s3.get_object(
+                Bucket=self.__bucket_name, Key=key,
+                Range=f'bytes=-{PARQUET_TAIL_SIZE}')['Body'].read()
+        except self.__client_s3.exceptions.NoSuchKey:
+            return None
+        footer_size = int.from_bytes(tail[:4], 'little') + PARQUET_TAIL_SIZE
+        footer = self.__client_s3.get_object(
+            Bucket=self.__bucket_name, Key=key, Range=f'bytes=-{footer_size}')['Body'].read()
+        return pq.read_metadata(io.BytesIO(footer)).num_rows
+
+    def read_object(self, key: str) -> bytes:
+        '''Read a whole object from the S3 bucket.'''
+        return self.__client_s3.get_object(Bucket=self.__bucket_name, Key=key)['Body'].read()
+
+    def get_manifest(self) -> dict[str, dict]:
+        '''Get the manifest of the archive: the entry of each partition uploaded, by its
+        key, with its number of rows, size in bytes, SHA-256 checksum and the first and
+        last publication dates of its rows. It is read from the bucket once, and is empty
+        if nothing has been archived.'''
+        if self.__manifest is None:
+            try:
+                response = self.__client_s3.get_object(
+                    Bucket=self.__bucket_name, Key=MANIFEST_KEY)
+                self.__manifest = json.loads(response['Body'].read())['partitions']
+            except self.__client_s3.exceptions.NoSuchKey:
+                self.__manifest = {}
+        return self.__manifest
+
+    def add_to_manifest(self, key: str, entry: dict) -> bool:
+        '''Add (or replace) the entry of a partition written with open_object_writer to
+        the manifest, with the size and checksum of its object. Returns whether the object
+        differs from the one the manifest held.'''
+        entry = {**entry, **self.__uploads.pop(key)}
+        previous = self.get_manifest().get(key, {})
+        self.get_manifest()[key] = entry
+        return previous.get('checksum') != entry['checksum']
+
+    def save_manifest(self) -> None:
+        '''Write the manifest to the bucket.'''
+        manifest = json.dumps({'partitions': self.get_manifest()}, indent=1, sort_keys=True)
+        self.__client_s3.put_object(Bucket=self.__bucket_name, Key=MANIFEST_KEY,
+                                    Body=manifest.encode(), ContentType='application/json')
@@ -0,0 +1,64 @@
+'''
+    This file tests the ArchiveReader class, against moto's stand-in for S3.
+'''
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+import pytest
+from archive_reader import ArchiveReader
+from s3_manager import S3Manager
+from transformer import DataFrameToParquetTransformer
+from test_transformer import make_archive_rows
+
+
+@pytest.fixture(autouse=True)
+def mock_env(monkeypatch):
+    '''Mock required AWS environment variables.'''
+    monkeypatch.setenv("ACCESS_KEY", "fake-access-key")
+    monkeypatch.setenv("SECRET_ACCESS_KEY", "fake-secret")
+    monkeypatch.setenv("BUCKET_REGION", "eu-west-2")
+    monkeypatch.setenv("BUCKET_NAME", "my-fake-bucket")
+
+
+@pytest.fixture
+def reader(bucket):  # pylint: disable=unused-argument
+    '''A reader of an archive of four days of rows, six hours apart, from 1 March 2024.'''
+    s3 = S3Manager()
+    transformer = DataFrameToParquetTransformer(open_partition=s3.open_object_writer)
+    partitions = transformer.save_dataframes_to_parquet(
+        [make_archive_rows(datetime(2024, 3, 1), 16, timedelta(hours=6))])
+    for key, entry in partitions.items():
+        s3.add_to_manifest(key, entry)
+    s3.save_manifest()
+    return ArchiveReader(S3Manager())
+
+
+def test_partitions_are_pruned_by_manifest(reader):  # pylint: disable=redefined-outer-name
+    '''Test that only the partitions with rows in the date range are chosen, by the
+    first and last publication dates in the manifest.'''
+    keys = reader.get_partition_keys(datetime(2024, 3, 2, 12), datetime(2024, 3, 3, 6))
+
+    assert keys == ["year=2024/month=03/day=02/articles.parquet",
+                    "year=2024/month=03/day=03/articles.parquet"]
+    assert reader.get_partition_keys(datetime(2024, 3, 5), datetime(2024, 3, 9)) == []
+
+
+def test_read_articles_filters_rows_and_columns(reader):  # pylint: disable=redefined-outer-name
+    '''Test that only the rows in the date range are read, with the columns asked for.'''
+    with patch.object(S3Manager, "read_object", autospec=True,
+                      side_effect=S3Manager.read_object) as mock_read:
+        articles = reader.read_articles(datetime(2024, 3, 2, 12), datetime(2024, 3, 3, 6),
+                                        columns=["article_id", "article_published_date"])
+
+    assert mock_read.call_count == 2
+    assert list(articles.columns) == ["article_id", "article_published_date"]
+    assert articles["article_id"].tolist() == [6, 7, 8]
+
+
+def test_read_articles_without_partitions(reader):  # pylint: disable=redefined-outer-name
+    '''Test that an empty dataframe is read when no partition covers the date range.'''
+    articles = reader.read_articles(datetime(2025, 1, 1), datetime(2025, 2, 1),
+                                    columns=["article_headline"])
+
+    assert articles.empty
+    assert list(articles.columns) == ["article_headline"]
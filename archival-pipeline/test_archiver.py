@@ -0,0 +1,119 @@
+'''
+    This file tests the Archiver class, against a mock database and moto's stand-in for S3.
+'''
+
+import json
+from datetime import date, datetime, timedelta
+from unittest.mock import patch, MagicMock
+import pytest
+from archiver import Archiver
+from test_transformer import make_archive_rows
+
+# pylint: disable=redefined-outer-name
+
+DAY_1 = date(2024, 3, 1)
+DAY_2 = date(2024, 3, 2)
+ROWS_BY_DAY = {DAY_1: 2, DAY_2: 3}
+KEY_1 = "year=2024/month=03/day=01/articles.parquet"
+KEY_2 = "year=2024/month=03/day=02/articles.parquet"
+
+
+@pytest.fixture(autouse=True)
+def mock_env(monkeypatch):
+    '''Mock required AWS environment variables.'''
+    monkeypatch.setenv("ACCESS_KEY", "fake-access-key")
+    monkeypatch.setenv("SECRET_ACCESS_KEY", "fake-secret")
+    monkeypatch.setenv("BUCKET_REGION", "eu-west-2")
+    monkeypatch.setenv("BUCKET_NAME", "my-fake-bucket")
+    monkeypatch.setenv("ARCHIVE_WORKERS", "2")
+
+
+@pytest.fixture
+def mock_db():
+    '''A mock DatabaseManager holding ROWS_BY_DAY rows, shared by every instance.'''
+    with patch("archiver.DatabaseManager") as mock_db_class:
+        db = MagicMock()
+        mock_db_class.return_value = db
+        db.count_rows_to_archive.return_value = ROWS_BY_DAY
+
+        def stream_day(cut_off_date, start_date):
+            rows = make_archive_rows(datetime.combine(start_date, datetime.min.time()),
+                                     ROWS_BY_DAY[start_date], timedelta(hours=1))
+            assert cut_off_date == start_date + timedelta(days=1)
+            return [rows]
+
+        db.stream_data_to_archive.side_effect = stream_day
+        yield db
+
+
+def test_run_pipeline_archives_each_day_and_updates_manifest(bucket, mock_db):
+    '''Test that every day is uploaded to its partition and recorded in the manifest,
+    before the verified months are removed.'''
+    archiver = Archiver(3)
+    archiver.run_pipeline()
+
+    keys = [item["Key"] for item in bucket.list_objects_v2(Bucket="my-fake-bucket")["Contents"]]
+    assert sorted(keys) == ["_manifest.json", KEY_1, KEY_2]
+    manifest = json.loads(bucket.get_object(
+        Bucket="my-fake-bucket", Key="_manifest.json")["Body"].read())["partitions"]
+    assert list(manifest) == [KEY_1, KEY_2]
+    size = bucket.head_object(Bucket="my-fake-bucket", Key=KEY_2)["ContentLength"]
+    assert manifest[KEY_2]["rows"] == 3
+    assert manifest[KEY_2]["bytes"] == size
+    assert len(manifest[KEY_2]["checksum"]) == 64
+    assert manifest[KEY_2]["first_published"] == "2024-03-02T00:00:00"
+    assert manifest[KEY_2]["last_published"] == "2024-03-02T02:00:00"
+
+    verify_month = mock_db.remove_archived_rows.call_args.args[0]
+    assert verify_month(DAY_1, ROWS_BY_DAY)
+    assert not verify_month(DAY_1, {DAY_1: 2, DAY_2: 4})
+    assert not verify_month(DAY_1, {date(2024, 3, 3): 1})
+
+
+def test_run_pipeline_uploads_only_changed_days(bucket, mock_db):
+    '''Test that every day is exported again, but only a day whose rows changed is
+    uploaded, even if its number of rows did not change.'''
+    Archiver(3).run_pipeline()
+    for key in (KEY_1, KEY_2):
+        bucket.put_object(Bucket="my-fake-bucket", Key=key, Body=b"previous upload")
+    stream_day = mock_db.stream_data_to_archive.side_effect
+
+    def rescore_day_2(cut_off_date, start_date):
+        chunks = stream_day(cut_off_date, start_date)
+        if start_date == DAY_2:
+            chunks[0]["article_polarity"] = -0.5
+        return chunks
+
+    mock_db.stream_data_to_archive.side_effect = rescore_day_2
+    mock_db.stream_data_to_archive.reset_mock()
+
+    Archiver(3).run_pipeline()
+
+    assert mock_db.stream_data_to_archive.call_count == 2
+    assert bucket.get_object(Bucket="my-fake-bucket", Key=KEY_1)["Body"].read() == \
+        b"previous upload"
+    assert bucket.get_object(Bucket="my-fake-bucket", Key=KEY_2)["Body"].read() != \
+        b"previous upload"
+
+
+def test_failed_day_keeps_other_days_in_manifest(bucket, mock_db):
+    '''Test that a failed day stops the pipeline before removal, but the days which were
+    uploaded are recorded in the manifest.'''
+    stream_day = mock_db.stream_data_to_archive.side_effect
+
+    def fail_day_2(cut_off_date, start_date):
+        if start_date == DAY_2:
+            raise RuntimeError("Export failed")
+        return stream_day(cut_off_date, start_date)
+
+    mock_db.stream_data_to_archive.side_effect = fail_day_2
+    archiver = Archiver(3)
+
+    with pytest.raises(RuntimeError, match="Export failed"):
+        archiver.run_pipeline()
+
+    manifest = json.loads(bucket.get_object(
+        Bucket="my-fake-bucket", Key="_manifest.json")["Body"].read())["partitions"]
+    assert list(manifest) == [KEY_1]
+    mock_db.remove_archived_rows.assert_not_called()
+    assert mock_db.close_connection.call_count == 2
@@ -4,10 +4,10 @@
 
 from datetime import date
 from unittest.mock import patch, MagicMock
-import pandas as pd
 import pytest
-from database_manager import DatabaseManager
 import psycopg2
+from psycopg2 import sql
+from database_manager import DatabaseManager
 
 
 @pytest.fixture(autouse=True)
@@ -20,185 +20,253 @@ def mock_env_vars(monkeypatch):
     monkeypatch.setenv("DB_PORT", "5432")
 
 
-@patch("database_manager.psycopg2.connect")
+@patch("database_manager.db_pool.get_connection")
 def test_create_connection(mock_connect):
-    '''Test that DatabaseManager creates a connection using the correct environment variables.'''
+    '''Test that DatabaseManager borrows a connection from the pool.'''
     mock_conn = MagicMock()
     mock_connect.return_value = mock_conn
     db = DatabaseManager()
-    mock_connect.assert_called_once_with(
-        database="test_db",
-        user="test_user",
-        host="localhost",
-        password="sneaky_pass",
-        port="5432"
-    )
+    mock_connect.assert_called_once_with()
     assert db._DatabaseManager__db_connection == mock_conn  # pylint: disable=protected-access
 
 
-@patch("database_manager.pd.read_sql")
-@patch("database_manager.psycopg2.connect")
-def test_fetch_joined_dataframe(mock_connect, mock_read_sql):
-    '''Test that fetch_joined_dataframe executes the SQL query
-    and returns the expected dataframe.'''
+def make_export_cursor(mock_conn, chunks):
+    '''Make the named cursor of a mock connection return the chunks of rows, of columns
+    a and b.'''
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_cursor.fetchmany.side_effect = chunks + [[]]
+    column_a, column_b = MagicMock(), MagicMock()
+    column_a.name, column_b.name = "a", "b"
+    mock_cursor.description = [column_a, column_b]
+    return mock_cursor
+
+
+@patch("database_manager.db_pool.get_connection")
+def test_stream_data_to_archive_yields_chunks_from_named_cursor(mock_connect):
+    '''Test that the data is read in chunks of the chunk size through a server-side
+    cursor, and that the archived rows can then be removed.'''
     mock_conn = MagicMock()
     mock_connect.return_value = mock_conn
-    mock_read_sql.return_value = "fake_df"
+    mock_cursor = make_export_cursor(mock_conn, [[(1, "x"), (2, "y")], [(3, "z")]])
 
     db = DatabaseManager()
-    result = db.fetch_data_to_archive(cut_off_date=date(2025, 1, 1))
+    chunks = list(db.stream_data_to_archive(date(2025, 1, 1), chunk_size=2))
 
-    mock_read_sql.assert_called_once()
-    assert result == "fake_df"
+    mock_conn.cursor.assert_called_once_with(name=db.EXPORT_CURSOR_NAME)
+    mock_cursor.execute.assert_called_once_with(
+        db.FETCH_ARTICLE_DATA_QUERY, (date.min, date(2025, 1, 1)))
+    mock_cursor.fetchmany.assert_called_with(2)
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert list(chunks[0].columns) == ["a", "b"]
+    assert chunks[1].iloc[0].tolist() == [3, "z"]
+    mock_conn.commit.assert_called_once()
+    # pylint: disable=protected-access
+    assert db._DatabaseManager__cut_off_date == date(2025, 1, 1)
 
 
-@patch("database_manager.psycopg2.connect")
-def test_remove_archived_rows_success(mock_connect):
-    '''Test that remove_archived_rows deletes the correct article IDs.'''
+@patch("database_manager.db_pool.get_connection")
+def test_stream_data_to_archive_yields_columns_when_empty(mock_connect):
+    '''Test that an empty dataframe with the columns is yielded if there is no data.'''
+    mock_conn = MagicMock()
+    mock_connect.return_value = mock_conn
+    make_export_cursor(mock_conn, [])
+
+    chunks = list(DatabaseManager().stream_data_to_archive(date(2025, 1, 1)))
+
+    assert len(chunks) == 1
+    assert chunks[0].empty
+    assert list(chunks[0].columns) == ["a", "b"]
+
+
+@patch("database_manager.db_pool.get_connection")
+def test_count_rows_to_archive_by_day(mock_connect):
+    '''Test that the rows older than the cut-off date are counted by day, after which
+    the archived rows can be removed.'''
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
     mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_cursor.fetchall.side_effect = [[(date(2024, 12, 1), 3), (date(2024, 12, 2), 1)], []]
 
     db = DatabaseManager()
 
-    # Simulate data returned from fetch_data_to_archive
-    test_df = pd.DataFrame({
-        "article_id": [101, 102, 103],
-        "article_headline": ["a", "b", "c"]
-    })
-    # pylint: disable=invalid-name, protected-access
-    db._DatabaseManager__data_to_archive = test_df
+    assert db.count_rows_to_archive(date(2025, 1, 1)) == {
+        date(2024, 12, 1): 3, date(2024, 12, 2): 1}
+    mock_cursor.execute.assert_called_once_with(
+        db.ARCHIVED_ROW_COUNT_QUERY, (date.min, date(2025, 1, 1)))
+    assert db.remove_archived_rows(MagicMock()) == []
+
+
+@patch("database_manager.db_pool.get_connection")
+def test_stream_data_to_archive_from_start_date(mock_connect):
+    '''Test that the data of a single day can be streamed.'''
+    mock_conn = MagicMock()
+    mock_connect.return_value = mock_conn
+    mock_cursor = make_export_cursor(mock_conn, [[(1, "x")]])
 
-    db.remove_archived_rows()
+    db = DatabaseManager()
+    list(db.stream_data_to_archive(date(2024, 12, 2), start_date=date(2024, 12, 1)))
 
-    expected_ids = (101, 102, 103)
     mock_cursor.execute.assert_called_once_with(
-        db.DELETE_ARTICLES_QUERY,
-        (expected_ids,)
-    )
-    mock_conn.commit.assert_called_once()
+        db.FETCH_ARTICLE_DATA_QUERY, (date(2024, 12, 1), date(2024, 12, 2)))
 
 
-@patch("database_manager.psycopg2.connect")
-def test_remove_archived_rows_raises_if_no_data(mock_connect):
-    '''Test that remove_archived_rows raises if fetch_data_to_archive was not called.'''
+@patch("database_manager.db_pool.get_connection")
+def test_remove_archived_rows_raises_if_stream_not_read(mock_connect):
+    '''Test that rows cannot be removed before every chunk of the stream is read.'''
     mock_conn = MagicMock()
     mock_connect.return_value = mock_conn
+    make_export_cursor(mock_conn, [[(1, "x")], [(2, "y")]])
 
     db = DatabaseManager()
+    next(db.stream_data_to_archive(date(2025, 1, 1), chunk_size=1))
 
     with pytest.raises(ValueError, match="No data to archive"):
-        db.remove_archived_rows()
+        db.remove_archived_rows(MagicMock())
+
 
+def get_drop_statements(db, month: str) -> list:
+    '''Get the statements detaching and dropping a month's partitions.'''
+    statements = []
+    for table in db.PARTITIONED_TABLES:
+        partition = sql.Identifier(f"{table}_p{month}")
+        statements.append(db.DETACH_PARTITION_QUERY.format(sql.Identifier(table), partition))
+        statements.append(db.DROP_PARTITION_QUERY.format(partition))
+    return statements
 
-@patch("database_manager.psycopg2.connect")
-def test_close_connection(mock_connect):
-    '''Test that the database connection is closed properly.'''
+
+@patch("database_manager.db_pool.get_connection")
+def test_remove_archived_rows_drops_verified_months_one_at_a_time(mock_connect):
+    '''Test that remove_archived_rows drops the partitions of each month ending by the
+    cut-off date, referencing tables first, in a transaction per month, after verifying
+    the month's rows of each day.'''
     mock_conn = MagicMock()
+    mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_cursor.fetchall.side_effect = [
+        [("article_p2024_12",), ("article_p2024_11",), ("article_p2025_01",)],
+        [(date(2024, 11, 3), 5)],
+        [(date(2024, 12, 1), 2), (date(2024, 12, 2), 4)]]
+    verify_month = MagicMock(return_value=True)
+
     db = DatabaseManager()
-    db.close_connection()
+    setattr(db, "_DatabaseManager__cut_off_date", date(2025, 1, 1))
 
-    mock_conn.close.assert_called_once()
+    assert db.remove_archived_rows(verify_month) == [date(2024, 11, 1), date(2024, 12, 1)]
 
+    assert [call.args for call in verify_month.call_args_list] == [
+        (date(2024, 11, 1), {date(2024, 11, 3): 5}),
+        (date(2024, 12, 1), {date(2024, 12, 1): 2, date(2024, 12, 2): 4})]
+    statements = [call.args[0] for call in mock_cursor.execute.call_args_list]
+    assert statements[4:12] == get_drop_statements(db, "2024_11")
+    assert statements[15:] == get_drop_statements(db, "2024_12")
+    assert mock_cursor.execute.call_args_list[3].args[1] == (
+        date(2024, 11, 1), date(2024, 12, 1))
+    assert mock_conn.commit.call_count == 3
 
-@patch("database_manager.psycopg2.connect")
-def test_create_connection_invalid_credentials(mock_connect):
-    '''Test that an invalid database connection raises an exception.'''
 
-    mock_connect.side_effect = psycopg2.OperationalError(
-        "Faked database connection error")
+@patch("database_manager.db_pool.get_connection")
+def test_remove_archived_rows_stops_at_unverified_month(mock_connect):
+    '''Test that a month whose archive is not verified is rolled back rather than
+    dropped, and that later months are kept.'''
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_connect.return_value = mock_conn
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_cursor.fetchall.side_effect = [
+        [("article_p2024_10",), ("article_p2024_11",), ("article_p2024_12",)],
+        [(date(2024, 10, 1), 1)], [(date(2024, 11, 1), 1)]]
+    verify_month = MagicMock(side_effect=[True, False])
 
-    with pytest.raises(psycopg2.OperationalError, match="Faked database connection error"):
-        db = DatabaseManager()
+    db = DatabaseManager()
+    setattr(db, "_DatabaseManager__cut_off_date", date(2025, 1, 1))
 
+    with pytest.raises(ValueError, match="2024-11 could not be verified"):
+        db.remove_archived_rows(verify_month)
 
-@patch("database_manager.psycopg2.connect")
-def test_remove_archived_rows_with_duplicate_ids(mock_connect):
-    '''Test that remove_archived_rows handles duplicate article IDs correctly.'''
+    statements = [call.args[0] for call in mock_cursor.execute.call_args_list]
+    assert statements[4:12] == get_drop_statements(db, "2024_10")
+    assert len(statements) == 15
+    assert mock_conn.commit.call_count == 2
+    mock_conn.rollback.assert_called_once()
+
+
+@patch("database_manager.db_pool.get_connection")
+def test_remove_archived_rows_keeps_partition_of_cut_off_month(mock_connect):
+    '''Test that the partition of a month the cut-off falls within is not dropped.'''
     mock_conn = MagicMock()
     mock_cursor = MagicMock()
     mock_connect.return_value = mock_conn
     mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [("article_p2024_12",)]
 
     db = DatabaseManager()
+    setattr(db, "_DatabaseManager__cut_off_date", date(2024, 12, 31))
 
-    # Simulate data with duplicate article IDs
-    test_df = pd.DataFrame({
-        "article_id": [101, 102, 102, 103],
-        "article_headline": ["a", "b", "c", "d"]
-    })
-    db._DatabaseManager__data_to_archive = test_df
+    assert db.remove_archived_rows(MagicMock()) == []
+    mock_cursor.execute.assert_called_once_with(db.PARTITIONS_QUERY)
 
-    db.remove_archived_rows()
 
-    expected_ids = (101, 102, 103)  # Only unique IDs should be used
-    mock_cursor.execute.assert_called_once_with(
-        db.DELETE_ARTICLES_QUERY,
-        (expected_ids,)
-    )
-    mock_conn.commit.assert_called_once()
+def test_get_next_month_rolls_over_year():
+    '''Test the first day of the next month, including December.'''
+    # pylint: disable=protected-access
+    assert DatabaseManager._get_next_month(date(2024, 11, 1)) == date(2024, 12, 1)
+    assert DatabaseManager._get_next_month(date(2024, 12, 1)) == date(2025, 1, 1)
+    assert DatabaseManager._get_partition_month("article_topic_p2024_12") == date(2024, 12, 1)
 
 
-@patch("database_manager.psycopg2.connect")
-@patch("database_manager.pd.read_sql")
-def test_fetch_data_to_archive_raises_error(mock_read_sql, mock_connect):
-    '''Test that fetch_data_to_archive raises an error when the query fails.'''
+@patch("database_manager.db_pool.get_connection")
+def test_remove_archived_rows_raises_if_no_data(mock_connect):
+    '''Test that remove_archived_rows raises if count_rows_to_archive was not called.'''
     mock_conn = MagicMock()
     mock_connect.return_value = mock_conn
-    mock_read_sql.side_effect = pd.io.sql.DatabaseError(
-        "Faked SQL query error")
 
     db = DatabaseManager()
 
-    with pytest.raises(pd.io.sql.DatabaseError, match="Faked SQL query error"):
-        db.fetch_data_to_archive(cut_off_date=date(2025, 1, 1))
+    with pytest.raises(ValueError, match="No data to archive"):
+        db.remove_archived_rows(MagicMock())
 
 
-@patch("database_manager.psycopg2.connect")
-@patch("database_manager.pd.read_sql")
-def test_fetch_data_to_archive_empty_dataframe(mock_read_sql, mock_connect):
-    '''Test that fetch_data_to_archive returns an empty dataframe if no rows match the query.'''
+@patch("database_manager.db_pool.get_connection")
+@patch("database_manager.db_pool.release_connection")
+def test_close_connection(mock_release, mock_connect):
+    '''Test that the database connection is given back to the pool.'''
     mock_conn = MagicMock()
     mock_connect.return_value = mock_conn
-    # Simulate an empty result set
-    mock_read_sql.return_value = pd.DataFrame(columns=[
-        "article_id", "article_headline", "article_url", "article_published_date",
-        "article_subjectivity", "article_polarity", "news_outlet_name", "topic_name",
-        "article_topic_positive_sentiment", "article_topic_negative_sentiment",
-        "article_topic_neutral_sentiment", "article_topic_compound_sentiment"
-    ])
-
     db = DatabaseManager()
-    result = db.fetch_data_to_archive(cut_off_date=date(2025, 1, 1))
+    db.close_connection()
 
-    # Ensure that an empty dataframe is returned
-    assert result.empty
+    mock_release.assert_called_once_with(mock_conn)
 
 
-@patch("database_manager.psycopg2.connect")
-def test_remove_archived_rows_commits_once_for_duplicate_ids(mock_connect):
-    '''Test that remove_archived_rows commits only once, even for duplicate article IDs.'''
-    mock_conn = MagicMock()
-    mock_cursor = MagicMock()
-    mock_connect.return_value = mock_conn
-    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+@patch("database_manager.db_pool.get_connection")
+def test_create_connection_invalid_credentials(mock_connect):
+    '''Test that an invalid database connection raises an exception.'''
 
-    db = DatabaseManager()
+    mock_connect.side_effect = psycopg2.OperationalError(
+        "Faked database connection error")
 
-    # Simulate data with duplicate article IDs
-    test_df = pd.DataFrame({
-        "article_id": [101, 102, 102, 103, 103],
-        "article_headline": ["a", "b", "c", "d", "e"]
-    })
-    db._DatabaseManager__data_to_archive = test_df
+    with pytest.raises(psycopg2.OperationalError, match="Faked database connection error"):
+        DatabaseManager()
+
+
+@patch("database_manager.db_pool.time.sleep")
+@patch("database_manager.db_pool.release_connection")
+@patch("database_manager.db_pool.get_connection")
+def test_count_rows_to_archive_retries_on_new_connection(mock_connect, mock_release, _):
+    '''Test that count_rows_to_archive is retried on a new connection after a transient
+    error, the broken connection being discarded.'''
+    broken_conn, new_conn = MagicMock(), MagicMock()
+    mock_connect.side_effect = [broken_conn, new_conn]
+    broken_conn.cursor.return_value.__enter__.return_value.execute.side_effect = \
+        psycopg2.OperationalError("dropped")
+    new_conn.cursor.return_value.__enter__.return_value.fetchall.return_value = [
+        (date(2024, 12, 31), 3)]
 
-    db.remove_archived_rows()
+    db = DatabaseManager()
 
-    expected_ids = (101, 102, 103)  # Only unique IDs should be used
-    mock_cursor.execute.assert_called_once_with(
-        db.DELETE_ARTICLES_QUERY,
-        (expected_ids,)
-    )
-    mock_conn.commit.assert_called_once()
+    assert db.count_rows_to_archive(date(2025, 1, 1)) == {date(2024, 12, 31): 3}
+    mock_release.assert_called_once_with(broken_conn, discard=True)
+    new_conn.commit.assert_called_once()
@@ -2,11 +2,18 @@
     This file tests the S3Manager class.
 '''
 
+import io
 import os
-from datetime import date
-from unittest.mock import patch, MagicMock, mock_open
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
 from s3_manager import S3Manager
+from transformer import DataFrameToParquetTransformer
+
+# pylint: disable=redefined-outer-name
 
 
 @pytest.fixture(autouse=True)
@@ -24,7 +31,7 @@ def test_s3_client_initialization(mock_boto_client):
     mock_client = MagicMock()
     mock_boto_client.return_value = mock_client
 
-    s3 = S3Manager("tmp/test.csv")
+    s3 = S3Manager()
 
     mock_boto_client.assert_called_once_with(
         "s3",
@@ -35,46 +42,6 @@ def test_s3_client_initialization(mock_boto_client):
     assert s3._S3Manager__client_s3 == mock_client  # pylint: disable=protected-access
 
 
-def test_bucket_key_generation():
-    '''Test the S3 key generated for a given cutoff date.'''
-    s3 = S3Manager("tmp/test.csv")
-    cutoff = date(2025, 4, 5)
-    expected_key = "2025/04/04.csv"
-    # pylint: disable=protected-access
-    result_key = s3._create_bucket_key(cutoff)
-    assert result_key == expected_key
-
-
-@patch("s3_manager.boto3.client")
-@patch("builtins.open", new_callable=mock_open, read_data=b"fake,data\n1,2")
-def test_upload_csv_to_bucket(mock_file_open, mock_boto_client):
-    '''Test that the CSV file is uploaded correctly to S3.'''
-    mock_client = MagicMock()
-    mock_boto_client.return_value = mock_client
-
-    s3 = S3Manager("tmp/test.csv")
-    cutoff = date(2025, 4, 5)
-
-    s3.upload_csv_to_bucket(cutoff)
-
-    expected_key = "2025/04/04.csv"
-    mock_file_open.assert_called_once_with(
-        s3._S3Manager__output_path, 'rb')  # pylint: disable=protected-access
-    mock_client.put_object.assert_called_once_with(
-        Bucket="my-fake-bucket",
-        Key=expected_key,
-        Body=mock_file_open.return_value
-    )
-
-
-@patch("s3_manager.boto3.client")
-def test_output_path_is_absolute(_):
-    '''Test that the output path is resolved to an absolute path.'''
-    s3 = S3Manager("tmp/test.csv")
-    assert os.path.isabs(
-        s3._S3Manager__output_path)  # pylint: disable=protected-access
-
-
 def test_missing_env_vars(monkeypatch):
     '''Ensure missing environment variables raise KeyError.'''
     monkeypatch.delenv("ACCESS_KEY", raising=False)
@@ -83,29 +50,129 @@ def test_missing_env_vars(monkeypatch):
     monkeypatch.delenv("BUCKET_NAME", raising=False)
 
     with pytest.raises(KeyError):
-        S3Manager("tmp/test.csv")
+        S3Manager()
 
 
 @patch("s3_manager.boto3.client")
-def test_get_bucket_name(mock_boto_client):  # pylint: disable=protected-access
+def test_get_bucket_name(_):
     '''Test _get_bucket_name returns correct bucket name.'''
-    s3 = S3Manager("tmp/test.csv")
+    s3 = S3Manager()
     # pylint: disable=protected-access
     assert s3._get_bucket_name() == "my-fake-bucket"
 
 
-def test_bucket_key_generation_leap_year():
-    '''Ensure bucket key is generated correctly for leap year cutoff.'''
-    s3 = S3Manager("tmp/test.csv")
-    cutoff = date(2024, 3, 1)
-    expected_key = "2024/02/29.csv"  # Leap day
-    # pylint: disable=protected-access
-    assert s3._create_bucket_key(cutoff) == expected_key
-
-
-@patch("s3_manager.boto3.client")
-def test_upload_csv_file_not_found(mock_boto_client):  # pylint: disable=protected-access
-    '''Ensure FileNotFoundError is raised if output CSV does not exist.'''
-    s3 = S3Manager("nonexistent.csv")
-    with pytest.raises(FileNotFoundError):
-        s3.upload_csv_to_bucket(date(2025, 4, 5))
+def test_object_writer_puts_small_object(bucket):
+    '''Test that an object smaller than one part is uploaded with a single put.'''
+    with S3Manager().open_object_writer("small.bin") as file:
+        file.write(b"fake,data\n")
+        file.write(b"1,2")
+        assert file.tell() == 13
+
+    response = bucket.get_object(Bucket="my-fake-bucket", Key="small.bin")
+    assert response["Body"].read() == b"fake,data\n1,2"
+    assert "-" not in response["ETag"]
+
+
+def test_object_writer_streams_large_object_in_parts(bucket):
+    '''Test that an object larger than one part is uploaded in parts, in order.'''
+    pieces = [os.urandom(1024 * 1024) for _ in range(11)]
+    with S3Manager().open_object_writer("large.bin") as file:
+        for piece in pieces:
+            file.write(piece)
+
+    response = bucket.get_object(Bucket="my-fake-bucket", Key="large.bin")
+    assert response["Body"].read() == b"".join(pieces)
+    assert response["ETag"].strip('"').endswith("-2")
+    assert "Uploads" not in bucket.list_multipart_uploads(Bucket="my-fake-bucket")
+
+
+def test_object_writer_aborts_on_error(bucket):
+    '''Test that an error while writing aborts the upload, leaving no object.'''
+    with pytest.raises(RuntimeError):
+        with S3Manager().open_object_writer("failed.bin") as file:
+            file.write(os.urandom(9 * 1024 * 1024))
+            raise RuntimeError("Export failed")
+
+    assert "Contents" not in bucket.list_objects_v2(Bucket="my-fake-bucket")
+    assert "Uploads" not in bucket.list_multipart_uploads(Bucket="my-fake-bucket")
+
+
+def test_parquet_partitions_stream_to_bucket(bucket):
+    '''Test that the transformer streams its partitions straight to the bucket.'''
+    df = pd.DataFrame({
+        "article_id": [1, 2], "article_headline": ["A", "B"],
+        "article_url": ["https://example.com/1", "https://example.com/2"],
+        "article_published_date": [datetime(2024, 3, 1, 9), datetime(2024, 3, 2, 9)],
+        "article_subjectivity": [0.5, 0.4], "article_polarity": [0.1, 0.2],
+        "news_outlet_name": ["BBC", "BBC"], "topic_name": ["Economy", None],
+        "article_topic_positive_sentiment": [0.2, None],
+        "article_topic_negative_sentiment": [0.1, None],
+        "article_topic_neutral_sentiment": [0.7, None],
+        "article_topic_compound_sentiment": [0.3, None],
+    })
+    transformer = DataFrameToParquetTransformer(
+        open_partition=S3Manager().open_object_writer)
+
+    partitions = transformer.save_dataframes_to_parquet([df])
+
+    key = "year=2024/month=03/day=02/articles.parquet"
+    assert list(partitions) == ["year=2024/month=03/day=01/articles.parquet", key]
+    body = bucket.get_object(Bucket="my-fake-bucket", Key=key)["Body"].read()
+    assert pq.read_table(io.BytesIO(body)).column("article_id").to_pylist() == [2]
+
+
+@pytest.mark.usefixtures("bucket")
+def test_parquet_row_count_is_read_from_footer():
+    '''Test that the row count of an uploaded partition is read from its footer, and is
+    None for a partition which was not uploaded.'''
+    table = pa.table({"article_id": list(range(1234))})
+    with S3Manager().open_object_writer("year=2024/month=03/day=01/articles.parquet") as file:
+        pq.write_table(table, file)
+
+    s3 = S3Manager()
+    assert s3.get_parquet_row_count("year=2024/month=03/day=01/articles.parquet") == 1234
+    assert s3.get_parquet_row_count("year=2024/month=03/day=02/articles.parquet") is None
+
+
+def test_upload_is_skipped_when_checksum_matches_manifest(bucket):
+    '''Test that an object whose checksum matches its manifest entry is not uploaded
+    again, and that one whose content changed is.'''
+    s3 = S3Manager()
+    with s3.open_object_writer("a.bin") as file:
+        file.write(b"same content")
+    s3.add_to_manifest("a.bin", {"rows": 1})
+    s3.save_manifest()
+    assert s3.get_manifest()["a.bin"]["bytes"] == 12
+    bucket.delete_object(Bucket="my-fake-bucket", Key="a.bin")
+
+    s3 = S3Manager()
+    with s3.open_object_writer("a.bin") as file:
+        file.write(b"same content")
+    assert file.skipped
+    assert "a.bin" not in [item["Key"] for item in
+                           bucket.list_objects_v2(Bucket="my-fake-bucket")["Contents"]]
+
+    with s3.open_object_writer("a.bin") as file:
+        file.write(b"new content")
+    assert not file.skipped
+    assert bucket.get_object(Bucket="my-fake-bucket", Key="a.bin")["Body"].read() == \
+        b"new content"
+
+
+def test_multipart_upload_is_completed_when_checksum_matches_manifest(bucket):
+    '''Test that an unchanged object larger than one part, whose parts are uploaded
+    before its checksum is known, is completed rather than abandoned.'''
+    content = os.urandom(9 * 1024 * 1024)
+    s3 = S3Manager()
+    with s3.open_object_writer("large.bin") as file:
+        file.write(content)
+    assert s3.add_to_manifest("large.bin", {"rows": 1})
+    bucket.delete_object(Bucket="my-fake-bucket", Key="large.bin")
+
+    with s3.open_object_writer("large.bin") as file:
+        file.write(content)
+
+    assert not file.skipped
+    assert not s3.add_to_manifest("large.bin", {"rows": 1})
+    assert bucket.get_object(Bucket="my-fake-bucket", Key="large.bin")["Body"].read() == content
+    assert "Uploads" not in bucket.list_multipart_uploads(Bucket="my-fake-bucket")
@@ -1,141 +1,103 @@
 '''
-    This file tests the DataFrameToCSVTransformer class.
+    This file tests the DataFrameToParquetTransformer class.
 '''
 
-import os
+from datetime import date, datetime, timedelta
 from unittest.mock import patch
 import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import pytest
-from transformer import DataFrameToCSVTransformer
-
-
-def test_default_output_path_is_absolute():
-    '''Test that the default output path resolves to an absolute path.'''
-    transformer = DataFrameToCSVTransformer()
-    output_path = transformer._DataFrameToCSVTransformer__output_path  # pylint: disable=protected-access
-    assert os.path.isabs(output_path)
-    assert output_path.endswith("tmp/data.csv")
-
-
-def test_custom_output_path_is_absolute():
-    '''Test that a custom output path is correctly resolved to absolute.'''
-    transformer = DataFrameToCSVTransformer("relative/path/to/file.csv")
-    output_path = transformer._DataFrameToCSVTransformer__output_path  # pylint: disable=protected-access
-    assert os.path.isabs(output_path)
-    assert output_path.endswith("relative/path/to/file.csv")
-
-
-@patch("pandas.DataFrame.to_csv")
-def test_to_csv_called_with_correct_arguments(mock_to_csv):
-    '''Test that the DataFrame's to_csv is called with the correct arguments.'''
-    df = pd.DataFrame({"x": [1, 2]})
-    transformer = DataFrameToCSVTransformer("tmp/output.csv")
-    transformer.save_dataframe_to_csv(df)
-
-    expected_path = transformer._DataFrameToCSVTransformer__output_path  # pylint: disable=protected-access
-    mock_to_csv.assert_called_once_with(expected_path, index=False)
-
-
-def test_file_is_actually_written(tmp_path):
-    '''Test that the file is actually created with correct content.'''
-    df = pd.DataFrame({"x": [1, 2], "y": ["a", "b"]})
-    file_path = tmp_path / "output.csv"
-    transformer = DataFrameToCSVTransformer(str(file_path))
-    transformer.save_dataframe_to_csv(df)
-
-    assert file_path.exists()
-
-    # Read it back and verify contents
-    written_df = pd.read_csv(file_path)
-    pd.testing.assert_frame_equal(df, written_df)
-
-
-def test_empty_dataframe_still_writes_file(tmp_path):
-    '''Test that even an empty DataFrame creates a CSV file (with headers).'''
-    df = pd.DataFrame(columns=["x", "y"])
-    file_path = tmp_path / "empty.csv"
-    transformer = DataFrameToCSVTransformer(str(file_path))
-    transformer.save_dataframe_to_csv(df)
-
-    assert file_path.exists()
-    with open(file_path, encoding='utf-8') as f:
-        header = f.readline().strip()
-        assert header == "x,y"
-
-
-@patch("pandas.DataFrame.to_csv")
-def test_to_csv_raises_exception_if_fails(mock_to_csv):
-    '''Test that if to_csv raises an exception, it bubbles up.'''
-    df = pd.DataFrame({"x": [1, 2]})
-    transformer = DataFrameToCSVTransformer("tmp/will_fail.csv")
-    mock_to_csv.side_effect = IOError("Disk full!")
-
-    with pytest.raises(IOError, match="Disk full!"):
-        transformer.save_dataframe_to_csv(df)
-
-
-def test_save_to_nested_directory(tmp_path):
-    '''Tests that the data frame will save with a nested dictionary'''
-    df = pd.DataFrame({"a": [1, 2], "b": [3, 4]})
-    nested_dir = tmp_path / "folder" / "subfolder"
-    nested_dir.mkdir(parents=True, exist_ok=True)
-    file_path = nested_dir / "data.csv"
-    transformer = DataFrameToCSVTransformer(str(file_path))
-    transformer.save_dataframe_to_csv(df)
-    assert file_path.exists()
-
-
-def test_save_dataframe_with_special_characters(tmp_path):
-    '''Tests that the dataframe saves with special characters'''
-    df = pd.DataFrame({"text": ["hello, world!", "goodbye; world?"]})
-    file_path = tmp_path / "special_chars.csv"
-    transformer = DataFrameToCSVTransformer(str(file_path))
-    transformer.save_dataframe_to_csv(df)
-    assert file_path.exists()
-    written_df = pd.read_csv(file_path)
-    pd.testing.assert_frame_equal(df, written_df)
-
-
-def test_save_dataframe_with_non_utf8_encoding(tmp_path):
-    '''Test the dataframe saves with non utf8 encoding.'''
-    df = pd.DataFrame({"text": ["hello", "world"]})
-    file_path = tmp_path / "non_utf8.csv"
-    transformer = DataFrameToCSVTransformer(str(file_path))
-    transformer.save_dataframe_to_csv(df)
-    assert file_path.exists()
-    with open(file_path, "r", encoding="utf-8") as f:
-        content = f.read()
-    assert content == "text\nhello\nworld\n"
-
-
-def test_save_large_dataframe(tmp_path):
-    '''Tests the dataframe saves with a large dataframe'''
-    df = pd.DataFrame({"a": range(1000000), "b": range(1000000)})
-    file_path = tmp_path / "large_data.csv"
-    transformer = DataFrameToCSVTransformer(str(file_path))
-    transformer.save_dataframe_to_csv(df)
-    assert file_path.exists()
-    written_df = pd.read_csv(file_path)
-    pd.testing.assert_frame_equal(df, written_df)
-
-
-def test_save_dataframe_with_mixed_types(tmp_path):
-    '''Tests dataframe saves with mixed types'''
-    df = pd.DataFrame({"int": [1, 2], "float": [1.1, 2.2], "str": ["a", "b"]})
-    file_path = tmp_path / "mixed_types.csv"
-    transformer = DataFrameToCSVTransformer(str(file_path))
-    transformer.save_dataframe_to_csv(df)
-    assert file_path.exists()
-    written_df = pd.read_csv(file_path)
-    pd.testing.assert_frame_equal(df, written_df)
-
-
-def test_save_dataframe_with_nan(tmp_path):
-    '''tests dataframe saves with NaN values'''
-    df = pd.DataFrame({"a": [1, 2, None], "b": [None, 4, 5]})
-    file_path = tmp_path / "nan_values.csv"
-    transformer = DataFrameToCSVTransformer(str(file_path))
-    transformer.save_dataframe_to_csv(df)
-    assert file_path.exists()
-    written_df = pd.read_csv(file_path)
-    pd.testing.assert_frame_equal(df, written_df)
+from transformer import DataFrameToParquetTransformer
+
+
+def make_archive_rows(start: datetime, count: int, step: timedelta) -> pd.DataFrame:
+    '''Make rows of the archive query, published step apart from the start.'''
+    return pd.DataFrame({
+        "article_id": range(count),
+        "article_headline": [f"Headline {i}" for i in range(count)],
+        "article_url": [f"https://example.com/{i}" for i in range(count)],
+        "article_published_date": [start + i * step for i in range(count)],
+        "article_subjectivity": [0.5] * count,
+        "article_polarity": [0.1] * count,
+        "news_outlet_name": ["BBC", "Fox News"] * (count // 2) + ["BBC"] * (count % 2),
+        "topic_name": [None if i % 3 == 0 else "Economy" for i in range(count)],
+        "article_topic_positive_sentiment": [None if i % 3 == 0 else 0.2 for i in range(count)],
+        "article_topic_negative_sentiment": [None if i % 3 == 0 else 0.1 for i in range(count)],
+        "article_topic_neutral_sentiment": [None if i % 3 == 0 else 0.7 for i in range(count)],
+        "article_topic_compound_sentiment": [None if i % 3 == 0 else 0.3 for i in range(count)],
+    })
+
+
+def test_parquet_partitions_by_publication_day(tmp_path):
+    '''Test that chunks are written to one Parquet file per publication day, which read
+    back as a Hive-partitioned dataset with every row.'''
+    df = make_archive_rows(datetime(2024, 2, 28, 12), 12, timedelta(hours=8))
+    transformer = DataFrameToParquetTransformer(str(tmp_path))
+
+    partitions = transformer.save_dataframes_to_parquet(
+        df.iloc[i:i + 5] for i in range(0, 12, 5))
+
+    assert {key: entry["rows"] for key, entry in partitions.items()} == {
+        "year=2024/month=02/day=28/articles.parquet": 2,
+        "year=2024/month=02/day=29/articles.parquet": 3,
+        "year=2024/month=03/day=01/articles.parquet": 3,
+        "year=2024/month=03/day=02/articles.parquet": 3,
+        "year=2024/month=03/day=03/articles.parquet": 1,
+    }
+    assert partitions["year=2024/month=02/day=29/articles.parquet"] == {
+        "rows": 3, "first_published": "2024-02-29T04:00:00",
+        "last_published": "2024-02-29T20:00:00"}
+    dataset = ds.dataset(str(tmp_path), format="parquet", partitioning="hive")
+    table = dataset.to_table(filter=(ds.field("month") == 3) & (ds.field("day") == 1))
+    assert table.column("article_id").to_pylist() == [5, 6, 7]
+    written = dataset.to_table().to_pandas().sort_values("article_id")
+    assert written["article_headline"].tolist() == df["article_headline"].tolist()
+    assert written["topic_name"].isna().tolist() == df["topic_name"].isna().tolist()
+
+
+def test_parquet_is_dictionary_encoded_and_zstd_compressed(tmp_path):
+    '''Test that string columns are dictionary-encoded and every column compressed with
+    zstd.'''
+    transformer = DataFrameToParquetTransformer(str(tmp_path))
+    transformer.save_dataframes_to_parquet(
+        [make_archive_rows(datetime(2024, 3, 1), 10, timedelta(minutes=5))])
+
+    metadata = pq.ParquetFile(tmp_path / "year=2024/month=03/day=01/articles.parquet").metadata
+    row_group = metadata.row_group(0)
+    columns = {row_group.column(i).path_in_schema: row_group.column(i)
+               for i in range(row_group.num_columns)}
+    assert "RLE_DICTIONARY" in columns["news_outlet_name"].encodings
+    assert "RLE_DICTIONARY" in columns["topic_name"].encodings
+    assert {column.compression for column in columns.values()} == {"ZSTD"}
+
+
+@patch("transformer.ROW_GROUP_SIZE", 4)
+def test_parquet_row_groups_hold_row_group_size_rows(tmp_path):
+    '''Test that chunks are buffered into row groups of the row group size.'''
+    df = make_archive_rows(datetime(2024, 3, 1), 10, timedelta(minutes=5))
+    transformer = DataFrameToParquetTransformer(str(tmp_path))
+    transformer.save_dataframes_to_parquet(df.iloc[i:i + 3] for i in range(0, 10, 3))
+
+    metadata = pq.ParquetFile(tmp_path / "year=2024/month=03/day=01/articles.parquet").metadata
+    assert [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)] == [4, 4, 2]
+
+
+def test_parquet_raises_if_not_in_date_order(tmp_path):
+    '''Test that a day's rows arriving after a later day's raise, rather than
+    overwriting its partition.'''
+    df = make_archive_rows(datetime(2024, 3, 1), 3, timedelta(days=1))
+    transformer = DataFrameToParquetTransformer(str(tmp_path))
+
+    with pytest.raises(ValueError, match="publication date order"):
+        transformer.save_dataframes_to_parquet([df, df.iloc[:1]])
+
+
+def test_parquet_without_data_writes_no_partitions(tmp_path):
+    '''Test that no partitions are written when there is no data.'''
+    transformer = DataFrameToParquetTransformer(str(tmp_path))
+    empty = make_archive_rows(datetime(2024, 3, 1), 0, timedelta(days=1))
+
+    assert not transformer.save_dataframes_to_parquet([empty])
+    assert transformer.get_partition_key(date(2024, 3, 1)) == \
+        "year=2024/month=03/day=01/articles.parquet"
@@ -1,19 +1,134 @@
 '''
-    Transform class that takes in a dataframe and turns it into a csv file.
+    Transform classes that take in dataframes and turn them into Parquet files
+    partitioned by publication day.
 '''
 
+import itertools
 import os
+from datetime import date
+from typing import BinaryIO, Callable, Iterable, Iterator
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
+# The columns of the archive query, typed so every partition has the same schema.
+ARCHIVE_SCHEMA = pa.schema([
+    ('article_id', pa.int64()),
+    ('article_headline', pa.string()),
+    ('article_url', pa.string()),
+    ('article_published_date', pa.timestamp('us')),
+    ('article_subjectivity', pa.float64()),
+    ('article_polarity', pa.float64()),
+    ('news_outlet_name', pa.string()),
+    ('topic_name', pa.string()),
+    ('article_topic_positive_sentiment', pa.float64()),
+    ('article_topic_negative_sentiment', pa.float64()),
+    ('article_topic_neutral_sentiment', pa.float64()),
+    ('article_topic_compound_sentiment', pa.float64()),
+])
+# Each article is repeated for each of its topics, and outlet and topic names for each
+# article, so the string columns are dictionary-encoded.
+DICTIONARY_COLUMNS = [field.name for field in ARCHIVE_SCHEMA if field.type == pa.string()]
+COMPRESSION = 'zstd'
+COMPRESSION_LEVEL = 9
+ROW_GROUP_SIZE = 250_000
+PARTITION_FILE_NAME = 'articles.parquet'
 
-class DataFrameToCSVTransformer:
-    # pylint: disable=too-few-public-methods
-    '''Handles transformation and local storage of data.'''
 
-    def __init__(self, output_path: str = '/tmp/data.csv') -> None:
-        '''Initializes the transformer class with'''
-        self.__output_path = os.path.abspath(output_path)
+class ParquetPartitionWriter:
+    '''Writes the rows of one archive partition to a Parquet file, buffering them so
+    each row group (but the last) holds ROW_GROUP_SIZE rows.'''
 
-    def save_dataframe_to_csv(self, df: pd.DataFrame) -> None:
-        '''Saves a dataframe to a CSV file locally with a timestamped filename'''
-        df.to_csv(self.__output_path, index=False)
+    def __init__(self, file: BinaryIO) -> None:
+        '''Initializes the writer on an open binary file, which the caller closes.'''
+        self.__writer = pq.ParquetWriter(
+            file, ARCHIVE_SCHEMA, compression=COMPRESSION,
+            compression_level=COMPRESSION_LEVEL, use_dictionary=DICTIONARY_COLUMNS)
+        self.__buffer = []
+        self.__buffered_rows = 0
+        self.__rows_written = 0
+        self.__first_published = None
+        self.__last_published = None
+
+    def _flush(self, final: bool = False) -> None:
+        '''Writes the buffered rows, as whole row groups unless it is the final flush.'''
+        if not self.__buffer:
+            return
+        table = pa.concat_tables(self.__buffer)
+        row_group_rows = len(table) if final else len(table) // ROW_GROUP_SIZE * ROW_GROUP_SIZE
+        self.__writer.write_table(table.slice(0, row_group_rows), row_group_size=ROW_GROUP_SIZE)
+        remainder = table.slice(row_group_rows)
+        self.__buffer = [remainder] if len(remainder) else []
+        self.__buffered_rows = len(remainder)
+        self.__rows_written += row_group_rows
+
+    def write(self, df: pd.DataFrame) -> None:
+        '''Adds the rows of a dataframe to the partition.'''
+        self.__buffer.append(pa.Table.from_pandas(df, schema=ARCHIVE_SCHEMA, preserve_index=False))
+        self.__buffered_rows += len(df)
+        published = pd.to_datetime(df['article_published_date'])
+        if self.__first_published is None or published.min() < self.__first_published:
+            self.__first_published = published.min()
+        if self.__last_published is None or published.max() > self.__last_published:
+            self.__last_published = published.max()
+        if self.__buffered_rows >= ROW_GROUP_SIZE:
+            self._flush()
+
+    def close(self) -> dict:
+        '''Writes the remaining rows and the footer. Returns the number of rows written
+        and the first and last publication dates of the rows.'''
+        self._flush(final=True)
+        self.__writer.close()
+        return {'rows': self.__rows_written,
+                'first_published': self.__first_published.isoformat(),
+                'last_published': self.__last_published.isoformat()}
+
+
+class DataFrameToParquetTransformer:
+    '''Handles transformation of the data into Parquet files, one per publication day,
+    under Hive-style year=/month=/day= keys. The files are written locally, or streamed
+    to wherever open_partition opens them (e.g. S3Manager.open_object_writer).'''
+
+    def __init__(self, output_dir: str = '/tmp/archive',
+                 open_partition: Callable[[str], BinaryIO] = None) -> None:
+        '''Initializes the transformer with the directory the partitions are written to,
+        or the function opening a partition's file by its key.'''
+        self.__output_dir = os.path.abspath(output_dir)
+        self.__open_partition = open_partition
+
+    @staticmethod
+    def get_partition_key(day: date) -> str:
+        '''Returns the key of the partition of a publication day.'''
+        return day.strftime('year=%Y/month=%m/day=%d/') + PARTITION_FILE_NAME
+
+    def _open_partition(self, key: str) -> BinaryIO:
+        '''Opens the file of a partition for writing.'''
+        if self.__open_partition is not None:
+            return self.__open_partition(key)
+        path = os.path.join(self.__output_dir, *key.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return open(path, 'wb')
+
+    @staticmethod
+    def _iter_days(chunks: Iterable[pd.DataFrame]) -> Iterator[tuple[date, pd.DataFrame]]:
+        '''Yields the rows of each chunk by publication day, in order.'''
+        for chunk in chunks:
+            days = pd.to_datetime(chunk['article_published_date']).dt.date
+            yield from chunk.groupby(days, sort=False)
+
+    def save_dataframes_to_parquet(self, chunks: Iterable[pd.DataFrame]) -> dict[str, dict]:
+        '''Saves dataframes, in order of publication date, to one Parquet file per
+        publication day. Only the partition of the current day is open, so only one chunk
+        and one row group are held in memory. Returns the number of rows and the first and
+        last publication dates of each partition, by its key.'''
+        partitions = {}
+        for day, day_chunks in itertools.groupby(self._iter_days(chunks), key=lambda item: item[0]):
+            key = self.get_partition_key(day)
+            if key in partitions:
+                raise ValueError("The data to archive is not in publication date order.")
+            with self._open_partition(key) as file:
+                writer = ParquetPartitionWriter(file)
+                for _, day_rows in day_chunks:
+                    writer.write(day_rows)
+                partitions[key] = writer.close()
+        return partitions
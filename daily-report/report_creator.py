@@ -12,81 +12,60 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
-import psycopg2.extras
 from psycopg2.extensions import connection
 from weasyprint import HTML
 from jinja2 import Environment, FileSystemLoader
 import boto3
 from newspaper import Article
+import db_pool
+from reference_data import REFERENCE_DATA
 
 
-# once we have historic data AND a.article_published_date: : DATE = %s
+# The topic queries read the daily topic rollup, which holds the sum and count of the
+# topic scores of each outlet, topic and day.
 SENTIMENT_BY_TOPIC_QUERY = '''
-                WITH guardian_topics_avg AS (SELECT t.topic_name,
-                    AVG(at.article_topic_compound_sentiment::numeric) AS compound
-                    FROM article_topic as at
-                    JOIN topic AS t ON t.topic_id = at.topic_id
-                    JOIN article AS a ON a.article_id = at.article_id
-                    JOIN news_outlet AS no ON no.news_outlet_id = a.news_outlet_id
-                    WHERE no.news_outlet_name = %s AND a.article_published_date:: DATE = %s
-                    GROUP BY t.topic_name),
-
-                express_topics_avg AS (SELECT t.topic_name,
-                    AVG(at.article_topic_compound_sentiment::numeric) AS compound
-                    FROM article_topic as at
-                    JOIN topic AS t ON t.topic_id = at.topic_id
-                    JOIN article AS a ON a.article_id = at.article_id
-                    JOIN news_outlet AS no ON no.news_outlet_id = a.news_outlet_id
-                    WHERE no.news_outlet_name = %s AND a.article_published_date:: DATE = %s
+                WITH topics_avg AS (SELECT t.topic_name,
+                    SUM(s.compound_sum) FILTER (WHERE s.news_outlet_id = %(guardian_id)s)
+                        / SUM(s.article_count) FILTER (WHERE s.news_outlet_id = %(guardian_id)s)
+                        AS guardian_compound,
+                    SUM(s.compound_sum) FILTER (WHERE s.news_outlet_id = %(express_id)s)
+                        / SUM(s.article_count) FILTER (WHERE s.news_outlet_id = %(express_id)s)
+                        AS express_compound
+                    FROM daily_topic_sentiment AS s
+                    JOIN topic AS t ON t.topic_id = s.topic_id
+                    WHERE s.day = %(day)s
                     GROUP BY t.topic_name)
 
-                    SELECT gta.topic_name, ROUND(gta.compound, 2):: float AS guardian_compound, ROUND(eta.compound, 2):: float AS express_compound, ROUND(ABS(gta.compound - eta.compound),2)::float AS compound_diff
-                    FROM guardian_topics_avg gta
-                    INNER JOIN express_topics_avg eta ON eta.topic_name = gta.topic_name
+                    SELECT topic_name, ROUND(guardian_compound::numeric, 2):: float AS guardian_compound, ROUND(express_compound::numeric, 2):: float AS express_compound, ROUND(ABS(guardian_compound - express_compound)::numeric, 2)::float AS compound_diff
+                    FROM topics_avg
+                    WHERE guardian_compound IS NOT NULL AND express_compound IS NOT NULL
                     ORDER BY compound_diff DESC
                     ;'''
 
 MOST_COVERED_TOPIC_QUERY = '''
-                    WITH topic_counts AS (
-                        SELECT t.topic_name, COUNT(*) AS topic_frequency
-                        FROM article_topic AS at
-                        JOIN topic AS t ON t.topic_id = at.topic_id
-                        JOIN article AS a ON a.article_id = at.article_id
-                        JOIN news_outlet AS no ON no.news_outlet_id = a.news_outlet_id
-                        WHERE no.news_outlet_name = %s AND a.article_published_date:: DATE = %s
-                        GROUP BY t.topic_name
-                    ),
-                    total_topics AS (
-                        SELECT COUNT(*) AS total_count
-                        FROM article_topic AS at
-                        JOIN article AS a ON a.article_id = at.article_id
-                        JOIN news_outlet AS no ON no.news_outlet_id = a.news_outlet_id
-                        WHERE no.news_outlet_name = %s AND a.article_published_date:: DATE = %s
-                    )
-
-                    SELECT tc.topic_name,
-                        ROUND((tc.topic_frequency * 100.0) / tt.total_count, 2) AS topic_percentage
-                    FROM topic_counts tc
-                    JOIN total_topics tt ON true
+                    SELECT t.topic_name,
+                        ROUND((s.article_count * 100.0) / SUM(s.article_count) OVER (), 2)
+                            AS topic_percentage
+                    FROM daily_topic_sentiment AS s
+                    JOIN topic AS t ON t.topic_id = s.topic_id
+                    WHERE s.news_outlet_id = %(outlet_id)s AND s.day = %(day)s
                     ORDER BY topic_percentage DESC;
 '''
 
 OUTLET_SENTIMENT_QUERY = '''
-                    SELECT no.news_outlet_name,
-                    ROUND(AVG(at.article_topic_compound_sentiment::numeric), 3)::float AS compound
-                    FROM article_topic as at
-                    JOIN topic AS t ON t.topic_id = at.topic_id
-                    JOIN article AS a ON a.article_id = at.article_id
-                    JOIN news_outlet AS no ON no.news_outlet_id = a.news_outlet_id
-                    WHERE a.article_published_date:: DATE = %s
-                    GROUP BY no.news_outlet_name;'''
+                    SELECT s.news_outlet_id,
+                    ROUND((SUM(s.compound_sum) / SUM(s.article_count))::numeric, 3)::float AS compound
+                    FROM daily_topic_sentiment AS s
+                    WHERE s.day = %(day)s
+                    GROUP BY s.news_outlet_id;'''
 
 TOP_NEGATIVE_ARTICLES = '''
                     SELECT a.article_headline, a.article_url,
                     a.article_compound_sentiment AS sentiment
                     FROM article as a
-                    JOIN news_outlet AS no ON no.news_outlet_id = a.news_outlet_id
-                    WHERE a.article_published_date:: DATE = %s AND no.news_outlet_name = %s
+                    WHERE a.news_outlet_id = %(outlet_id)s
+                        AND a.article_published_date >= %(day_start)s
+                        AND a.article_published_date < %(day_end)s
                     ORDER BY sentiment ASC
                     LIMIT 3;'''
 
@@ -94,14 +73,21 @@ TOP_POSITIVE_ARTICLES = '''
                     SELECT a.article_headline, a.article_url,
                     a.article_compound_sentiment AS sentiment
                     FROM article as a
-                    JOIN news_outlet AS no ON no.news_outlet_id = a.news_outlet_id
-                    WHERE a.article_published_date:: DATE = %s AND no.news_outlet_name = %s
+                    WHERE a.news_outlet_id = %(outlet_id)s
+                        AND a.article_published_date >= %(day_start)s
+                        AND a.article_published_date < %(day_end)s
                     ORDER BY sentiment DESC
                     LIMIT 3;'''
 
 YESTERDAYS_DATE = date.today() - timedelta(days=1)
 
 
+def get_day_range(day: date) -> dict[str, date]:
+    '''Returns the query parameters of the half-open range [day, day + 1) of a date, which
+    unlike casting the timestamp to a date can use the indexes and partitions.'''
+    return {'day_start': day, 'day_end': day + timedelta(days=1)}
+
+
 class ReportCreator:
     '''Class inserting article information and analysis into a rds postgres database '''
 
@@ -111,29 +97,31 @@ class ReportCreator:
         self.__connection = self._create_connection()
 
     def _create_connection(self) -> connection:
-        '''Gets a connection to the RDS database'''
-        return psycopg2.connect(
-            dbname=os.environ["DB_NAME"],
-            user=os.environ["DB_USERNAME"],
-            host=os.environ["DB_HOST"],
-            password=os.environ["DB_PASSWORD"],
-            port=os.environ["DB_PORT"],
-        )
+        '''Gets a connection to the RDS database from the process's pool, so warm
+        invocations reuse an open connection.'''
+        return db_pool.get_connection()
 
 # GET METHODS
+    def _get_news_outlet_id(self, outlet: str) -> int:
+        '''Returns the id of the given outlet, from the process's reference data cache'''
+        return REFERENCE_DATA.get_news_outlet_ids(self.__connection)[outlet]
+
     def _get_frequent_topic(self, outlet: str) -> list[dict]:
         '''Retrieves the percentage that each topic has been covered by the given outlet'''
-        with self.__connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        outlet_id = self._get_news_outlet_id(outlet)
+        with self.__connection.cursor(cursor_factory=db_pool.TimedRealDictCursor) as cur:
             cur.execute(MOST_COVERED_TOPIC_QUERY,
-                        (outlet, YESTERDAYS_DATE, outlet, YESTERDAYS_DATE))
+                        {'outlet_id': outlet_id, 'day': YESTERDAYS_DATE})
             topic_frequency = cur.fetchall()
             return topic_frequency
 
     def _get_difference_in_topic(self) -> list[dict]:
         '''Retrieves the difference in average topic sentiment between outlets'''
-        with self.__connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        with self.__connection.cursor(cursor_factory=db_pool.TimedRealDictCursor) as cur:
             cur.execute(SENTIMENT_BY_TOPIC_QUERY,
-                        ('The Guardian', YESTERDAYS_DATE, 'Daily Express', YESTERDAYS_DATE))
+                        {'guardian_id': self._get_news_outlet_id('The Guardian'),
+                         'express_id': self._get_news_outlet_id('Daily Express'),
+                         'day': YESTERDAYS_DATE})
             difference_in_topic = cur.fetchall()
         return difference_in_topic
 
@@ -148,10 +136,13 @@ class ReportCreator:
 
     def _get_outlet_sentiment(self, date_of_interest: date) -> dict[str:str]:
         '''Returns the average sentiment of each outlet for a given date'''
-        with self.__connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(OUTLET_SENTIMENT_QUERY, (date_of_interest,))
+        with self.__connection.cursor(cursor_factory=db_pool.TimedRealDictCursor) as cur:
+            cur.execute(OUTLET_SENTIMENT_QUERY, {'day': date_of_interest})
             sentiment_score = cur.fetchall()
-        return {score.get('news_outlet_name'): score.get('compound') for score in sentiment_score}
+        outlet_names = {outlet_id: outlet for outlet, outlet_id
+                        in REFERENCE_DATA.get_news_outlet_ids(self.__connection).items()}
+        return {outlet_names[score.get('news_outlet_id')]: score.get('compound')
+                for score in sentiment_score}
 
     def _get_difference_in_outlet(self) -> tuple[str:str]:
         '''Returns the average sentiment score for each day
@@ -162,8 +153,7 @@ class ReportCreator:
         express_change = equal
         guard_change = equal
 
-        previous_date = (YESTERDAYS_DATE - timedelta(days=1)
-                         ).strftime('%Y-%m-%d')
+        previous_date = YESTERDAYS_DATE - timedelta(days=1)
         yesterdays_sentiment_scores = self._get_outlet_sentiment(
             YESTERDAYS_DATE)
         two_days_sentiment_score = self._get_outlet_sentiment(previous_date)
@@ -198,12 +188,13 @@ class ReportCreator:
 
     def _get_top_polarising_articles(self, outlet: str) -> tuple[list[dict], list[dict]]:
         '''Finds the top polarising articles for the given outlet'''
-        with self.__connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        outlet_id = self._get_news_outlet_id(outlet)
+        with self.__connection.cursor(cursor_factory=db_pool.TimedRealDictCursor) as cur:
             cur.execute(TOP_NEGATIVE_ARTICLES,
-                        (YESTERDAYS_DATE, outlet))
+                        {'outlet_id': outlet_id, **get_day_range(YESTERDAYS_DATE)})
             positives = cur.fetchall()
             cur.execute(TOP_POSITIVE_ARTICLES,
-                        (YESTERDAYS_DATE, outlet))
+                        {'outlet_id': outlet_id, **get_day_range(YESTERDAYS_DATE)})
             negatives = cur.fetchall()
 
             positive_with_image = self._combine_image_to_articles(positives)
@@ -426,8 +417,8 @@ class ReportCreator:
         print("Email sent! Message ID:", response['MessageId'])
 
     def close_connection(self):
-        '''Closes the database connection'''
-        self.__connection.close()
+        '''Gives the database connection back to the pool'''
+        db_pool.release_connection(self.__connection)
 
 # pylint: disable=unused-argument
 # pylint: disable=broad-exception-caught
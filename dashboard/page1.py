@@ -24,13 +24,18 @@ def info() -> None:
 
 
 def retrieve_data() -> pd.DataFrame:
-    '''Method for querying data using the query_data method.'''
+    '''Method for querying data using the query_data method. The daily topic rollup holds
+    the sum and count of the topic scores of each outlet and day.'''
     query = """
-        SELECT article_topic_compound_sentiment, news_outlet_name, article_published_date, topic_name 
-        FROM article
-        JOIN news_outlet ON news_outlet.news_outlet_id = article.news_outlet_id
-        JOIN article_topic ON article_topic.article_id = article.article_id
-        JOIN topic ON topic.topic_id = article_topic.topic_id
+        SELECT
+            s.compound_sum,
+            s.article_count,
+            news_outlet_name,
+            s.day::TIMESTAMP AS article_published_date,
+            topic_name
+        FROM daily_topic_sentiment AS s
+        JOIN news_outlet ON news_outlet.news_outlet_id = s.news_outlet_id
+        JOIN topic ON topic.topic_id = s.topic_id
     """
     return query_data(query)
 
@@ -57,7 +62,9 @@ def transform_data(df: pd.DataFrame, inputs: dict) -> pd.DataFrame:
     df = df[(df['article_published_date'] >= pd.to_datetime(inputs['start_date'])) &
             (df['article_published_date'] <= pd.to_datetime(inputs['end_date']))]
     grouped = df.groupby(['topic_name', 'news_outlet_name'])[
-        'article_topic_compound_sentiment'].mean().reset_index()
+        ['compound_sum', 'article_count']].sum().reset_index()
+    grouped['article_topic_compound_sentiment'] = grouped['compound_sum'] / \
+        grouped['article_count']
     paper1_scores = grouped[grouped['news_outlet_name'] == 'The Guardian']
     paper2_scores = grouped[grouped['news_outlet_name'] == 'Daily Express']
     merged = pd.merge(
@@ -2,7 +2,7 @@
     Module containing code for a page. This page contains graphs...
 '''
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from newspaper import Article
 import streamlit as st
 import pandas as pd
@@ -17,6 +17,18 @@ METRIC_COLUMN_MAP = {
     "Subjectivity": "article_subjectivity",
     "Polarity": "article_polarity",
 }
+# The articles of a day, as the half-open range [day, day + 1), with the column of the
+# chosen metric.
+ARTICLES_OF_DAY_QUERY = '''
+    SELECT
+        news_outlet_name,
+        a.article_headline,
+        a.article_url,
+        {metric_column}
+    FROM article AS a
+    JOIN news_outlet AS no ON no.news_outlet_id = a.news_outlet_id
+    WHERE a.article_published_date >= %s AND a.article_published_date < %s
+'''
 
 
 def info() -> None:
@@ -50,17 +62,10 @@ def retrieve_data(inputs: dict) -> pd.DataFrame:
     # Convert the chosen metric into a column name
     metric_column = METRIC_COLUMN_MAP[inputs['metric']]
     # define the sql query with the chosen metric
-    query = f'''
-        SELECT
-            news_outlet_name,
-            a.article_headline,
-            a.article_url,
-            {metric_column}
-        FROM article AS a
-        JOIN news_outlet AS no ON no.news_outlet_id = a.news_outlet_id
-        WHERE a.article_published_date::date = %s
-    '''
-    return query_data(query=query, params=(inputs['day'],))
+    query = ARTICLES_OF_DAY_QUERY.format(metric_column=metric_column)
+    # a half-open range of the day, so the date indexes and partitions can be used
+    day_range = (inputs['day'], inputs['day'] + timedelta(days=1))
+    return query_data(query=query, params=day_range)
 
 
 def transform(df: pd.DataFrame, inputs: dict) -> tuple[pd.DataFrame, pd.DataFrame]:
@@ -25,15 +25,16 @@ def info() -> None:
 
 def average_subjectivity_line_graph() -> None:
     '''Line graph for average subjectivity by day per paper'''
-    query = """SELECT article_subjectivity, news_outlet_name, article_published_date FROM article
-    JOIN news_outlet ON news_outlet.news_outlet_id = article.news_outlet_id
+    query = """
+        SELECT
+            s.subjectivity_sum / s.article_count AS article_subjectivity,
+            news_outlet_name,
+            s.day::TIMESTAMP AS article_published_day
+        FROM daily_outlet_sentiment AS s
+        JOIN news_outlet ON news_outlet.news_outlet_id = s.news_outlet_id
+        ORDER BY s.day
     """
-    data = query_data(query)
-    data['article_published_day'] = data['article_published_date'].dt.floor(
-        'd')
-    avg_subjectivity = data.groupby(
-        ['article_published_day', 'news_outlet_name']
-    )['article_subjectivity'].mean().reset_index()
+    avg_subjectivity = query_data(query)
     fig = px.line(
         avg_subjectivity,
         x='article_published_day',
@@ -54,16 +55,16 @@ def average_subjectivity_line_graph() -> None:
 def average_polarity_line_graph() -> None:
     '''Line graph for average polarity by day per paper'''
 
-    query = """SELECT article_polarity, news_outlet_name, article_published_date FROM article
-    JOIN news_outlet ON news_outlet.news_outlet_id = article.news_outlet_id
+    query = """
+        SELECT
+            s.polarity_sum / s.article_count AS article_polarity,
+            news_outlet_name,
+            s.day::TIMESTAMP AS article_published_day
+        FROM daily_outlet_sentiment AS s
+        JOIN news_outlet ON news_outlet.news_outlet_id = s.news_outlet_id
+        ORDER BY s.day
     """
-    data = query_data(query)
-    data['article_published_day'] = data['article_published_date'].dt.floor(
-        'd')
-
-    avg_subjectivity = data.groupby(
-        ['article_published_day', 'news_outlet_name']
-    )['article_polarity'].mean().reset_index()
+    avg_subjectivity = query_data(query)
 
     fig = px.line(
         avg_subjectivity,
@@ -85,19 +86,15 @@ def average_polarity_line_graph() -> None:
 def average_compound_line_graph() -> None:
     '''Line graph for average compound by day per paper'''
     query = """
-        SELECT 
-            article_compound_sentiment, 
-            news_outlet_name, 
-            article_published_date 
-        FROM article
-        JOIN news_outlet ON news_outlet.news_outlet_id = article.news_outlet_id
+        SELECT
+            s.compound_sum / s.article_count AS article_compound_sentiment,
+            news_outlet_name,
+            s.day::TIMESTAMP AS article_published_day
+        FROM daily_outlet_sentiment AS s
+        JOIN news_outlet ON news_outlet.news_outlet_id = s.news_outlet_id
+        ORDER BY s.day
     """
-    data = query_data(query)
-    data['article_published_day'] = data['article_published_date'].dt.floor(
-        'd')
-    avg_subjectivity = data.groupby(
-        ['article_published_day', 'news_outlet_name']
-    )['article_compound_sentiment'].mean().reset_index()
+    avg_subjectivity = query_data(query)
     fig = px.line(
         avg_subjectivity,
         x='article_published_day',
@@ -6,6 +6,7 @@ import streamlit as st
 import plotly.express as px
 
 from database_manager import query_data
+from reference_data import REFERENCE_DATA
 from styling import top_bar, bottom_bar
 
 
@@ -23,11 +24,8 @@ def info() -> None:
 
 
 def get_all_topics() -> list[str]:
-    '''Get all the topics.'''
-    query = "SELECT DISTINCT topic_name FROM topic"
-    data = query_data(query)
-    unique_topics = sorted(data['topic_name'].dropna().unique().tolist())
-    return unique_topics
+    '''Get all the topics, from the process's reference data cache.'''
+    return REFERENCE_DATA.get_topic_names()
 
 
 def get_widget_inputs(all_topics: list[str]) -> str:
@@ -43,23 +41,17 @@ def get_widget_inputs(all_topics: list[str]) -> str:
 def average_compound_topic_line_graph(selected_topic: str) -> None:
     '''Line graph for average compound by day per paper'''
     query = """
-        SELECT 
-            article_topic_compound_sentiment, 
-            news_outlet_name, 
-            article_published_date,
-            topic_name 
-        FROM article
-        JOIN news_outlet ON news_outlet.news_outlet_id = article.news_outlet_id
-        JOIN article_topic on article_topic.article_id = article.article_id
-        JOIN topic on topic.topic_id = article_topic.topic_id
+        SELECT
+            s.compound_sum / s.article_count AS article_topic_compound_sentiment,
+            news_outlet_name,
+            s.day::TIMESTAMP AS article_published_day
+        FROM daily_topic_sentiment AS s
+        JOIN news_outlet ON news_outlet.news_outlet_id = s.news_outlet_id
+        JOIN topic ON topic.topic_id = s.topic_id
+        WHERE topic_name = %s
+        ORDER BY s.day
     """
-    data = query_data(query)
-    data['article_published_day'] = data['article_published_date'].dt.floor(
-        'd')
-    data = data[data['topic_name'] == selected_topic]
-    avg_subjectivity = data.groupby(
-        ['article_published_day', 'news_outlet_name']
-    )['article_topic_compound_sentiment'].mean().reset_index()
+    avg_subjectivity = query_data(query, (selected_topic,))
     fig = px.line(
         avg_subjectivity,
         x='article_published_day',
@@ -80,24 +72,17 @@ def average_compound_topic_line_graph(selected_topic: str) -> None:
 def average_positive_topic_line_graph(selected_topic: str) -> None:
     '''Line graph for average compound by day per paper'''
     query = """
-        SELECT 
-            article_topic_positive_sentiment, 
-            news_outlet_name, 
-            article_published_date,
-            topic_name 
-        FROM article
-        JOIN news_outlet ON news_outlet.news_outlet_id = article.news_outlet_id
-        JOIN article_topic on article_topic.article_id = article.article_id
-        JOIN topic on topic.topic_id = article_topic.topic_id
+        SELECT
+            s.positive_sum / s.article_count AS article_topic_positive_sentiment,
+            news_outlet_name,
+            s.day::TIMESTAMP AS article_published_day
+        FROM daily_topic_sentiment AS s
+        JOIN news_outlet ON news_outlet.news_outlet_id = s.news_outlet_id
+        JOIN topic ON topic.topic_id = s.topic_id
+        WHERE topic_name = %s
+        ORDER BY s.day
     """
-    data = query_data(query)
-    data['article_published_day'] = data['article_published_date'].dt.floor(
-        'd')
-    data = data[data['topic_name'] == selected_topic]
-
-    avg_subjectivity = data.groupby(
-        ['article_published_day', 'news_outlet_name']
-    )['article_topic_positive_sentiment'].mean().reset_index()
+    avg_subjectivity = query_data(query, (selected_topic,))
 
     fig = px.line(
         avg_subjectivity,
@@ -120,24 +105,17 @@ def average_negative_topic_line_graph(selected_topic: str) -> None:
     '''Line graph for average negative sentiment by day per paper'''
 
     query = """
-        SELECT 
-            article_topic_negative_sentiment, 
-            news_outlet_name, 
-            article_published_date,
-            topic_name 
-        FROM article
-        JOIN news_outlet ON news_outlet.news_outlet_id = article.news_outlet_id
-        JOIN article_topic on article_topic.article_id = article.article_id
-        JOIN topic on topic.topic_id = article_topic.topic_id
+        SELECT
+            s.negative_sum / s.article_count AS article_topic_negative_sentiment,
+            news_outlet_name,
+            s.day::TIMESTAMP AS article_published_day
+        FROM daily_topic_sentiment AS s
+        JOIN news_outlet ON news_outlet.news_outlet_id = s.news_outlet_id
+        JOIN topic ON topic.topic_id = s.topic_id
+        WHERE topic_name = %s
+        ORDER BY s.day
     """
-    data = query_data(query)
-    data['article_published_day'] = data['article_published_date'].dt.floor(
-        'd')
-    data = data[data['topic_name'] == selected_topic]
-
-    avg_subjectivity = data.groupby(
-        ['article_published_day', 'news_outlet_name']
-    )['article_topic_negative_sentiment'].mean().reset_index()
+    avg_subjectivity = query_data(query, (selected_topic,))
 
     fig = px.line(
         avg_subjectivity,
@@ -4,12 +4,14 @@
 '''
 
 import json
+import time
 from openai import OpenAI
-from textblob import TextBlob
-from nltk.sentiment import SentimentIntensityAnalyzer
-import nltk
 
-from models import Article, TopicAnalysis
+from models import Article, ArticleChunk, TopicAnalysis
+from chunking import BodyChunker, aggregate_chunk_scores
+from keyword_classifier import KeywordTopicClassifier, TopicClassification
+from routing import Route, TopicRouter
+from sentiment import SentimentAnalyser, ParallelSentimentAnalyser
 
 
 class TextAnalyser:
@@ -34,25 +36,41 @@ class TextAnalyser:
         {article_body}
     '''
 
-    def __init__(self, valid_topics: list[str]):
-        '''Instantiate the TextAnalyser object.'''
-        nltk_data_path = '/tmp/nltk_data'
-        nltk.download('punkt_tab', quiet=True, download_dir=nltk_data_path)
-        nltk.download('vader_lexicon', quiet=True, download_dir=nltk_data_path)
-        nltk.data.path.append(nltk_data_path)
-        self.__client = OpenAI()
-        self.__sentiment_analyser = SentimentIntensityAnalyzer()
+    def __init__(self, valid_topics: list[str], classifier: KeywordTopicClassifier = None,
+                 router: TopicRouter = None, sentence_scoring: bool = False,
+                 workers: int = 1, chunker: BodyChunker = None,
+                 store_sentence_scores: bool = False):
+        '''Instantiate the TextAnalyser object. If a keyword classifier is given, its
+        confidence is used by the router to decide whether topics are extracted locally
+        or by OpenAI. With sentence scoring, VADER runs once per sentence and the topic
+        and body scores are combined from the (cached) sentence results. With more than
+        one worker, the sentiment analysis is spread across a pool of processes. If a
+        chunker is given, live blogs and oversized articles are analysed in chunks. With
+        store_sentence_scores, the scores of each sentence are also kept on the articles,
+        so topic sentiment can be rebuilt for other key terms later. The OpenAI client is
+        created the first time it is needed.'''
+        # pylint: disable=too-many-arguments, too-many-positional-arguments
+        self.__client = None
+        self.__sentiment_analyser = SentimentAnalyser(sentence_scoring)
+        self.__parallel_analyser = (ParallelSentimentAnalyser(workers, sentence_scoring)
+                                    if workers > 1 else None)
         self.__valid_topics = valid_topics
-
-    def _ask_openai(self, article: Article) -> None:
-        '''For each of the articles, ask OpenAI's GPT to extract topic data.
-        Each article has a list of dictionaries (each representing a topic).'''
+        self.__chunker = chunker
+        self.__store_sentence_scores = store_sentence_scores
+        self.__classifier = classifier
+        self.__router = router if router is not None else TopicRouter()
+
+    def _ask_openai(self, text: str) -> list[dict]:
+        '''Ask OpenAI's GPT to extract topic data from the article text. The response is
+        a list of dictionaries (each representing a topic).'''
         # form prompt
         prompt = self.GPT_PROMPT.format(
             valid_topics=", ".join(self.__valid_topics),
-            article_body=article.get_body(),
+            article_body=text,
         )
         # ask openai (if formatted wrong, allow 3 tries)
+        if self.__client is None:
+            self.__client = OpenAI()
         response = self.__client.chat.completions.create(
             model=self.GPT_MODEL,
             messages=[{"role": "user", "content": prompt}],
@@ -61,6 +79,29 @@ class TextAnalyser:
         # extract the response content and convert to json obj
         return json.loads(response.choices[0].message.content)
 
+    def _classify_locally(self, article: Article) -> TopicClassification:
+        '''Classify the article with the keyword classifier. If there is no classifier,
+        an empty classification with zero confidence is returned.'''
+        if self.__classifier is None:
+            return TopicClassification([], 0.0)
+        return self.__classifier.classify(article.get_body(), self.__valid_topics)
+
+    def _extract_topic_data(self, article: Article) -> list[dict]:
+        '''Extract the topic data of an article along the route chosen by the router.'''
+        start = time.perf_counter()
+        headline, body = article.get_headline(), article.get_body()
+        classification = self._classify_locally(article)
+        route = self.__router.choose(
+            headline, body, classification.get_confidence())
+        if route == Route.LOCAL:
+            topic_data = classification.get_topic_data()
+        elif route == Route.LLM_LEAD:
+            topic_data = self._ask_openai(self.__router.get_lead(headline, body))
+        else:
+            topic_data = self._ask_openai(body)
+        self.__router.record(route, headline, body, time.perf_counter() - start)
+        return topic_data
+
     def _validate_topics(self, topic_data: list[dict]) -> None:
         '''Filter out any topic dictionaries with invalid topics. Changes are
         made in place.'''
@@ -68,13 +109,18 @@ class TextAnalyser:
 
     def _validate_key_terms(self, topic_data: list[dict], article: Article) -> list[dict]:
         '''Filter out any key terms which do not appear in the article body. If all key
-        terms end up being removed, the whole topic dictionary is removed. Changes are
-        made in place.'''
+        terms end up being removed, the whole topic dictionary is removed. Each distinct
+        key term is only searched for once. Changes are made in place.'''
+        body = article.get_body()
+        present = {}
         valid_topic_data = []
         for topic_dict in topic_data:
             key_terms = topic_dict['key_terms']
+            for key_term in key_terms:
+                if key_term not in present:
+                    present[key_term] = key_term in body
             valid_key_terms = [
-                key_term for key_term in key_terms if key_term in article.get_body()]
+                key_term for key_term in key_terms if present[key_term]]
             if len(valid_key_terms) > 0:
                 topic_dict['key_terms'] = valid_key_terms
                 valid_topic_data.append(topic_dict)
@@ -93,51 +139,109 @@ class TextAnalyser:
     def extract_topics(self, articles: list[Article]) -> None:
         '''For each article, extract the relevant topics and assign to the article's topics list.'''
         for article in articles:
-            topic_data = self._ask_openai(article)
+            topic_data = self._extract_topic_data(article)
             topic_data = self._validate_topics(topic_data)
             topic_data = self._validate_key_terms(topic_data, article)
             self._assign_topic_analysis_object(topic_data, article)
 
-    def _perform_single_topic_analysis(self, topic_analysis: TopicAnalysis, sentences):
-        '''Perform sentiment analysis for a single topic.'''
-        key_terms = topic_analysis.get_key_terms()
-        related_sentences = [
-            sentence for sentence in sentences
-            if any(term.lower() in sentence.lower() for term in key_terms)
-        ]
-        context_text = " ".join(related_sentences)
-        sentiment_scores = self.__sentiment_analyser.polarity_scores(
-            context_text)
-        topic_analysis.set_sentiments(
-            positive=sentiment_scores['pos'],
-            neutral=sentiment_scores['neu'],
-            negative=sentiment_scores['neg'],
-            compound=sentiment_scores['compound'],
+    def get_routing_summary(self) -> dict:
+        '''Summarise the routing decisions made while extracting topics.'''
+        return self.__router.get_summary()
+
+    def _split_body(self, article: Article) -> list[str]:
+        '''Split the article body into the chunks it is analysed in.'''
+        if self.__chunker is None:
+            return [article.get_body()]
+        return self.__chunker.split(article.get_url(), article.get_body())
+
+    def _analyse(self, articles: list[Article]) -> list[tuple[dict, list[dict]]]:
+        '''Score the body and topics of each article, in the worker processes if there
+        are any. Only the bodies (or chunks of them) and key terms are sent, and the scores
+        returned. The scores of articles analysed in chunks are aggregated, and the chunks
+        assigned to the article.'''
+        article_chunks = [self._split_body(article) for article in articles]
+        tasks = []
+        for article, chunks in zip(articles, article_chunks):
+            topic_key_terms = [topic_analysis.get_key_terms()
+                               for topic_analysis in article.get_topic_analyses()]
+            tasks.extend((chunk, topic_key_terms) for chunk in chunks)
+        if self.__parallel_analyser is not None:
+            results = self.__parallel_analyser.analyse(tasks)
+        else:
+            results = [self.__sentiment_analyser.analyse(*task) for task in tasks]
+        article_results = []
+        position = 0
+        for article, chunks in zip(articles, article_chunks):
+            chunk_results = results[position:position + len(chunks)]
+            position += len(chunks)
+            if len(chunks) == 1:
+                article_results.append(chunk_results[0])
+                continue
+            article.set_chunks([
+                ArticleChunk(chunk_index, len(chunk.split()), body_scores)
+                for chunk_index, (chunk, (body_scores, _)) in enumerate(zip(chunks, chunk_results))
+            ])
+            article_results.append(aggregate_chunk_scores(chunks, chunk_results))
+        return article_results
+
+    def _set_topic_sentiments(self, article: Article, topic_scores: list[dict]) -> None:
+        '''Assign the sentiment scores of each topic within the article.'''
+        for topic_analysis, sentiment_scores in zip(article.get_topic_analyses(), topic_scores):
+            topic_analysis.set_sentiments(
+                positive=sentiment_scores['pos'],
+                neutral=sentiment_scores['neu'],
+                negative=sentiment_scores['neg'],
+                compound=sentiment_scores['compound'],
+            )
+
+    def _set_body_sentiments(self, article: Article, body_scores: dict) -> None:
+        '''Assign the sentiment scores of the article body.'''
+        article.set_polarity(body_scores['polarity'])
+        article.set_subjectivity(body_scores['subjectivity'])
+        article.set_sentiments(
+            body_scores['pos'],
+            body_scores['neu'],
+            body_scores['neg'],
+            body_scores['compound']
         )
 
+    def perform_analyses(self, articles: list[Article]) -> None:
+        '''Perform the NLP sentiment analysis on each article body and the topics within
+        it, in a single pass over the articles.'''
+        for article, (body_scores, topic_scores) in zip(articles, self._analyse(articles)):
+            self._set_body_sentiments(article, body_scores)
+            self._set_topic_sentiments(article, topic_scores)
+        if self.__store_sentence_scores:
+            self._score_sentences(articles)
+
+    def _score_sentences(self, articles: list[Article]) -> None:
+        '''Score each sentence of each article, in the worker processes if there are any,
+        and assign the sentence scores to the articles.'''
+        bodies = [article.get_body() for article in articles]
+        if self.__parallel_analyser is not None:
+            sentence_scores = self.__parallel_analyser.score_sentences(bodies)
+        else:
+            sentence_scores = [self.__sentiment_analyser.score_sentences(body)
+                               for body in bodies]
+        for article, scores in zip(articles, sentence_scores):
+            article.set_sentence_scores(scores)
+
     def perform_topic_analyses(self, articles: list[Article]) -> None:
         '''For each article, iterate through it's topics and perform the NLP analysis on the
         sentiment of each topic within the article.'''
         for article in articles:
-            body = article.get_body()
-            sentences = nltk.sent_tokenize(body)
-            for topic_analysis in article.get_topic_analyses():
-                self._perform_single_topic_analysis(topic_analysis, sentences)
+            topic_key_terms = [topic_analysis.get_key_terms()
+                               for topic_analysis in article.get_topic_analyses()]
+            self._set_topic_sentiments(article, self.__sentiment_analyser.score_topics(
+                article.get_body(), topic_key_terms))
 
     def perform_body_analyses(self, articles: list[Article]) -> None:
         '''Performs the NLP sentiment analysis on the article body.'''
         for article in articles:
-            body = article.get_body()
-            blob = TextBlob(body)
-            subjectivity = blob.sentiment.subjectivity
-            polarity = blob.sentiment.polarity
-            sentiment_scores = self.__sentiment_analyser.polarity_scores(
-                body)
-            article.set_polarity(polarity)
-            article.set_subjectivity(subjectivity)
-            article.set_sentiments(
-                sentiment_scores['pos'],
-                sentiment_scores['neu'],
-                sentiment_scores['neg'],
-                sentiment_scores['compound']
-            )
+            self._set_body_sentiments(
+                article, self.__sentiment_analyser.score_body(article.get_body()))
+
+    def close(self) -> None:
+        '''Shut down any worker processes.'''
+        if self.__parallel_analyser is not None:
+            self.__parallel_analyser.close()
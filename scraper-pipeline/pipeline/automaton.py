@@ -0,0 +1,77 @@
+'''
+    Script defining an Aho-Corasick automaton, used for finding many terms within a text
+    in a single pass.
+'''
+
+from collections import deque
+from typing import Hashable, Iterator, Sequence
+
+
+class AhoCorasick:
+    '''Class representing an Aho-Corasick automaton. Patterns are sequences of hashable
+    symbols, so the automaton can match characters within a string or words within a
+    list of tokens.'''
+
+    def __init__(self, patterns: list[Sequence[Hashable]]):
+        '''Instantiate the automaton and build the failure links for the given patterns.'''
+        self.__patterns = list(patterns)
+        self.__goto = [{}]
+        self.__fail = [0]
+        self.__outputs = [[]]
+        for pattern_index, pattern in enumerate(self.__patterns):
+            self._add_pattern(pattern, pattern_index)
+        self._build_failure_links()
+
+    def _add_pattern(self, pattern: Sequence[Hashable], pattern_index: int) -> None:
+        '''Add a single pattern to the trie. Empty patterns are ignored.'''
+        if len(pattern) == 0:
+            return
+        state = 0
+        for symbol in pattern:
+            next_state = self.__goto[state].get(symbol)
+            if next_state is None:
+                next_state = len(self.__goto)
+                self.__goto[state][symbol] = next_state
+                self.__goto.append({})
+                self.__fail.append(0)
+                self.__outputs.append([])
+            state = next_state
+        self.__outputs[state].append(pattern_index)
+
+    def _build_failure_links(self) -> None:
+        '''Breadth-first pass over the trie, setting each state's failure link to the
+        longest proper suffix which is also in the trie. The outputs of the suffix state
+        are merged in, so matching never has to follow failure links to collect outputs.'''
+        queue = deque(self.__goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for symbol, next_state in self.__goto[state].items():
+                queue.append(next_state)
+                fail_state = self.__fail[state]
+                while fail_state and symbol not in self.__goto[fail_state]:
+                    fail_state = self.__fail[fail_state]
+                self.__fail[next_state] = self.__goto[fail_state].get(symbol, 0)
+                self.__outputs[next_state] = (
+                    self.__outputs[next_state] +
+                    self.__outputs[self.__fail[next_state]]
+                )
+
+    def get_patterns(self) -> list[Sequence[Hashable]]:
+        '''Getter for the patterns the automaton was built from.'''
+        return self.__patterns
+
+    def iter_matches(self, sequence: Sequence[Hashable]) -> Iterator[tuple[int, int]]:
+        '''Yield (end_position, pattern_index) for every occurrence of every pattern in
+        the sequence, including overlapping occurrences. end_position is exclusive.'''
+        goto, fail, outputs = self.__goto, self.__fail, self.__outputs
+        state = 0
+        for position, symbol in enumerate(sequence):
+            while state and symbol not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(symbol, 0)
+            for pattern_index in outputs[state]:
+                yield position + 1, pattern_index
+
+    def find_patterns(self, sequence: Sequence[Hashable]) -> set[int]:
+        '''Return the indices of the patterns which occur at least once in the sequence.'''
+        return {pattern_index for _, pattern_index in self.iter_matches(sequence)}
@@ -0,0 +1,346 @@
+'''
+    Script for re-analysing stored articles from the body store, e.g. after a change to
+    the sentiment analysis. The bodies are streamed a publication month at a time, oldest
+    first, re-analysed across a pool of processes, and the chosen scores bulk-updated in
+    batches, each committed on its own with the daily rollups of its days rebuilt. A
+    checkpoint is saved after each batch, so an interrupted run resumes where it stopped.
+
+        python backfill.py --stages body topics --workers 8
+        python backfill.py --stages sentences --since 2025-01-01 --checkpoint sentences.json
+'''
+
+import argparse
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+
+import psycopg2.extras
+from dotenv import load_dotenv
+
+import db_pool
+from analysis import TextAnalyser
+from body_store import SEGMENT_PREFIX, BodyStore
+from chunking import BodyChunker
+from keyword_classifier import KeywordTopicClassifier
+from models import Article, TopicAnalysis
+from reference_data import REFERENCE_DATA
+
+STAGES = ('body', 'topics', 'sentences')
+
+
+class BackfillCheckpoint:
+    '''Class recording the last segment of the body store (and the records of it) which
+    has been backfilled, in a JSON file.'''
+
+    def __init__(self, path: str):
+        self.__path = path
+
+    def load(self) -> tuple[str, int]:
+        '''Get the segment key and the number of its records done, or (None, 0) if the
+        backfill has not started.'''
+        if not os.path.exists(self.__path):
+            return None, 0
+        with open(self.__path, encoding='utf-8') as file:
+            checkpoint = json.load(file)
+        return checkpoint['segment'], checkpoint['records']
+
+    def save(self, segment_key: str, records: int) -> None:
+        '''Record that the first records of the segment (and every segment before it)
+        are done, replacing the file atomically.'''
+        with open(self.__path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump({'segment': segment_key, 'records': records,
+                       'saved_at': datetime.now().isoformat()}, file)
+        os.replace(self.__path + '.tmp', self.__path)
+
+
+class BackfillDatabaseManager:
+    '''Class managing the backfill's queries, on its own connection. The session yields
+    to the hourly scraper: it gives up on locks it cannot take quickly (the batch is then
+    retried) and does not wait for its commits to be flushed.'''
+
+    SESSION_QUERY = '''
+        SET application_name = 'backfill';
+        SET lock_timeout = '2s';
+        SET synchronous_commit = off;
+    '''
+    ARTICLES_QUERY = '''
+        SELECT a.article_id, a.article_published_date, no.news_outlet_name, a.article_headline,
+            a.article_url, COALESCE(
+                array_agg(t.topic_name) FILTER (WHERE t.topic_name IS NOT NULL), '{}')
+        FROM article AS a
+        JOIN news_outlet AS no ON no.news_outlet_id = a.news_outlet_id
+        LEFT JOIN article_topic AS at ON at.article_id = a.article_id
+            AND at.article_published_date = a.article_published_date
+        LEFT JOIN topic AS t ON t.topic_id = at.topic_id
+        WHERE a.article_id = ANY(%(article_ids)s)
+            AND a.article_published_date >= %(month_start)s
+            AND a.article_published_date < %(month_end)s
+        GROUP BY a.article_id, a.article_published_date, no.news_outlet_name,
+            a.article_headline, a.article_url;
+    '''
+    ARTICLE_UPDATE_QUERY = '''
+        UPDATE article AS a
+        SET article_subjectivity = v.subjectivity,
+            article_polarity = v.polarity,
+            article_positive_sentiment = v.positive,
+            article_neutral_sentiment = v.neutral,
+            article_negative_sentiment = v.negative,
+            article_compound_sentiment = v.compound
+        FROM (VALUES %s) AS v(article_id, published_date, subjectivity, polarity,
+                              positive, neutral, negative, compound)
+        WHERE a.article_id = v.article_id
+            AND a.article_published_date = v.published_date;
+    '''
+    ARTICLE_TOPIC_UPDATE_QUERY = '''
+        UPDATE article_topic AS at
+        SET article_topic_positive_sentiment = v.positive,
+            article_topic_negative_sentiment = v.negative,
+            article_topic_neutral_sentiment = v.neutral,
+            article_topic_compound_sentiment = v.compound
+        FROM (VALUES %s) AS v(article_id, published_date, topic_id,
+                              positive, negative, neutral, compound)
+        WHERE at.article_id = v.article_id
+            AND at.article_published_date = v.published_date
+            AND at.topic_id = v.topic_id;
+    '''
+    SENTENCE_SCORE_UPSERT_QUERY = '''
+        INSERT INTO article_sentence_score
+            (article_id, article_published_date, article_sentence_offsets,
+             article_sentence_scores)
+        VALUES %s
+        ON CONFLICT (article_id, article_published_date) DO UPDATE SET
+            article_sentence_offsets = EXCLUDED.article_sentence_offsets,
+            article_sentence_scores = EXCLUDED.article_sentence_scores;
+    '''
+    # The rollups of the updated days are rebuilt from the article tables.
+    DAILY_OUTLET_ROLLUP_REBUILD_QUERIES = (
+        'DELETE FROM daily_outlet_sentiment WHERE day = ANY(%(days)s);',
+        '''
+        INSERT INTO daily_outlet_sentiment
+        SELECT article_published_date::DATE, news_outlet_id, COUNT(*),
+            SUM(article_subjectivity), SUM(article_polarity), SUM(article_positive_sentiment),
+            SUM(article_neutral_sentiment), SUM(article_negative_sentiment),
+            SUM(article_compound_sentiment), SUM(article_compound_sentiment ^ 2)
+        FROM article
+        WHERE article_published_date >= %(first_day)s
+            AND article_published_date < %(last_day)s + 1
+            AND article_published_date::DATE = ANY(%(days)s)
+        GROUP BY 1, 2;
+        ''',
+    )
+    DAILY_TOPIC_ROLLUP_REBUILD_QUERIES = (
+        'DELETE FROM daily_topic_sentiment WHERE day = ANY(%(days)s);',
+        '''
+        INSERT INTO daily_topic_sentiment
+        SELECT a.article_published_date::DATE, a.news_outlet_id, at.topic_id, COUNT(*),
+            SUM(at.article_topic_positive_sentiment),
+            SUM(at.article_topic_negative_sentiment),
+            SUM(at.article_topic_neutral_sentiment),
+            SUM(at.article_topic_compound_sentiment),
+            SUM(at.article_topic_compound_sentiment ^ 2)
+        FROM article_topic AS at
+        JOIN article AS a ON a.article_id = at.article_id
+            AND a.article_published_date = at.article_published_date
+        WHERE a.article_published_date >= %(first_day)s
+            AND a.article_published_date < %(last_day)s + 1
+            AND a.article_published_date::DATE = ANY(%(days)s)
+        GROUP BY 1, 2, 3;
+        ''',
+    )
+
+    def __init__(self):
+        '''Get a connection from the pool and make it yield to the scraper.'''
+        self.__connection = None
+        self._connect()
+        self.__topic_id_map = REFERENCE_DATA.get_topic_ids(self.__connection)
+
+    def _connect(self) -> None:
+        '''Replace the connection with a new one from the pool, set up for the backfill.'''
+        if self.__connection is not None:
+            db_pool.release_connection(self.__connection, discard=True)
+        self.__connection = db_pool.get_connection()
+        with self.__connection.cursor() as cur:
+            cur.execute(self.SESSION_QUERY)
+        self.__connection.commit()
+
+    def get_valid_topics(self) -> list[str]:
+        '''Get the names of the topics.'''
+        return list(self.__topic_id_map.keys())
+
+    def get_articles(self, article_ids: list[int], month: date) -> dict[int, tuple]:
+        '''Get the (published date, news outlet name, headline, url, topic names) of the
+        stored articles with the ids, published in the month of their body store segment,
+        by id. Articles which have been archived are missing. Segments written before
+        published dates were converted to UTC are filed under the month of the feed's
+        local date, so a day either side of the month is searched too (only reading the
+        partitions of the neighbouring months by the index on article_id).'''
+        month_start = month - timedelta(days=1)
+        month_end = date(month.year + month.month // 12, month.month % 12 + 1, 1) \
+            + timedelta(days=1)
+        with self.__connection.cursor() as cur:
+            cur.execute(self.ARTICLES_QUERY, {'article_ids': article_ids,
+                                              'month_start': month_start,
+                                              'month_end': month_end})
+            rows = cur.fetchall()
+        self.__connection.commit()
+        return {row[0]: row[1:] for row in rows}
+
+    def update(self, articles: list[Article], stages: list[str]) -> None:
+        '''Bulk-update the scores of the chosen stages, and rebuild the rollups of the
+        days they change, in one transaction. The batch is retried on a new connection
+        after a transient error, such as a lock the scraper holds.'''
+        db_pool.retry(self._update_batch, articles, stages, on_retry=self._connect)
+
+    def _update_batch(self, articles: list[Article], stages: list[str]) -> None:
+        '''Update the batch in a single transaction.'''
+        days = sorted({article.get_published_date().date() for article in articles})
+        day_params = {'days': days, 'first_day': days[0], 'last_day': days[-1]}
+        with self.__connection, self.__connection.cursor() as cur:
+            if 'body' in stages:
+                psycopg2.extras.execute_values(cur, self.ARTICLE_UPDATE_QUERY, [
+                    (article.get_id(), *article.get_insert_values({})[3:])
+                    for article in articles], page_size=len(articles))
+                for query in self.DAILY_OUTLET_ROLLUP_REBUILD_QUERIES:
+                    cur.execute(query, day_params)
+            if 'topics' in stages:
+                topic_values = [values for article in articles
+                                for values in article.get_topic_analyses_insert_values(
+                                    self.__topic_id_map)]
+                if topic_values:
+                    psycopg2.extras.execute_values(
+                        cur, self.ARTICLE_TOPIC_UPDATE_QUERY, topic_values,
+                        page_size=len(topic_values))
+                    for query in self.DAILY_TOPIC_ROLLUP_REBUILD_QUERIES:
+                        cur.execute(query, day_params)
+            if 'sentences' in stages:
+                psycopg2.extras.execute_values(
+                    cur, self.SENTENCE_SCORE_UPSERT_QUERY,
+                    [article.get_sentence_score_insert_values() for article in articles])
+
+    def close_connection(self) -> None:
+        '''Give the connection back to the pool.'''
+        db_pool.release_connection(self.__connection)
+
+
+class Backfiller:
+    # pylint: disable=too-few-public-methods
+    '''Class re-analysing the articles of the body store and updating their scores.'''
+
+    def __init__(self, db_manager: BackfillDatabaseManager, body_store: BodyStore,
+                 text_analyser: TextAnalyser, classifier: KeywordTopicClassifier,
+                 checkpoint: BackfillCheckpoint, batch_size: int = 500):
+        '''Instantiate the backfiller. Articles are analysed, updated and committed in
+        batches of batch_size.'''
+        # pylint: disable=too-many-arguments, too-many-positional-arguments
+        self.__db_manager = db_manager
+        self.__body_store = body_store
+        self.__text_analyser = text_analyser
+        self.__classifier = classifier
+        self.__checkpoint = checkpoint
+        self.__batch_size = batch_size
+
+    def _create_articles(self, records: list[tuple[int, bytes, str]], month: date,
+                         stages: list[str]) -> list[Article]:
+        '''Create the articles of the body store records which are still stored. When
+        backfilling topics, each keeps the topics it was assigned, with the key terms the
+        keyword classifier finds for them in the body; topics it finds none for are not
+        re-scored.'''
+        stored = self.__db_manager.get_articles([record[0] for record in records], month)
+        articles = []
+        for article_id, _, body in records:
+            if article_id not in stored:
+                continue
+            published_date, news_outlet, headline, url, topic_names = stored[article_id]
+            article = Article(news_outlet, headline, url, published_date, body)
+            article.set_id(article_id)
+            topic_data = (self.__classifier.classify(body, topic_names).get_topic_data()
+                          if 'topics' in stages else [])
+            article.set_topics_analyses([TopicAnalysis(topic['topic_name'], topic['key_terms'])
+                                         for topic in topic_data])
+            articles.append(article)
+        return articles
+
+    def _run_batch(self, records: list[tuple[int, bytes, str]], month: date,
+                   stages: list[str]) -> int:
+        '''Re-analyse and update a batch of records, returning the articles updated.'''
+        articles = self._create_articles(records, month, stages)
+        if articles:
+            self.__text_analyser.perform_analyses(articles)
+            self.__db_manager.update(articles, stages)
+        return len(articles)
+
+    def run(self, stages: list[str], since: date = None) -> dict:
+        '''Backfill the chosen stages for the articles published since the given month
+        (or every article), resuming from the checkpoint. Returns a summary of the run.'''
+        summary = {'stages': stages, 'records': 0, 'updated': 0, 'seconds': 0.0}
+        done_segment, done_records = self.__checkpoint.load()
+        start = time.perf_counter()
+        for segment_key in self.__body_store.get_segment_keys():
+            month = datetime.strptime(
+                segment_key[len(SEGMENT_PREFIX):len(SEGMENT_PREFIX) + 7], '%Y/%m').date()
+            if (since is not None and month < since.replace(day=1)) or \
+                    (done_segment is not None and segment_key < done_segment):
+                continue
+            skip = done_records if segment_key == done_segment else 0
+            batch, position = [], 0
+            for record in self.__body_store.read_segment(segment_key):
+                position += 1
+                if position <= skip:
+                    continue
+                batch.append(record)
+                if len(batch) == self.__batch_size:
+                    summary['updated'] += self._run_batch(batch, month, stages)
+                    summary['records'] += len(batch)
+                    self.__checkpoint.save(segment_key, position)
+                    batch = []
+            if batch:
+                summary['updated'] += self._run_batch(batch, month, stages)
+                summary['records'] += len(batch)
+            self.__checkpoint.save(segment_key, position)
+            elapsed = time.perf_counter() - start
+            print(f"{segment_key}: {summary['updated']} articles updated, "
+                  f"{summary['records'] / elapsed:.1f} articles per second")
+        summary['seconds'] = time.perf_counter() - start
+        summary['articles_per_second'] = (summary['records'] / summary['seconds']
+                                          if summary['seconds'] else 0.0)
+        return summary
+
+
+def main() -> None:
+    '''Parse the command line arguments and run the backfill.'''
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=['body', 'topics'])
+    parser.add_argument('--since', type=date.fromisoformat,
+                        help='Only backfill articles published since this month.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--checkpoint', default='backfill_checkpoint.json',
+                        help='File recording progress; delete it to start again.')
+    args = parser.parse_args()
+
+    load_dotenv()
+    body_store = BodyStore.from_env()
+    if body_store is None:
+        parser.error('Set BODY_STORE_PATH or BODY_STORE_BUCKET.')
+    db_manager = BackfillDatabaseManager()
+    text_analyser = TextAnalyser(
+        valid_topics=db_manager.get_valid_topics(),
+        sentence_scoring=True,
+        workers=args.workers,
+        chunker=BodyChunker(),
+        store_sentence_scores='sentences' in args.stages,
+    )
+    try:
+        backfiller = Backfiller(db_manager, body_store, text_analyser,
+                                KeywordTopicClassifier.from_csv(min_strength=0.0),
+                                BackfillCheckpoint(args.checkpoint), args.batch_size)
+        print(backfiller.run(args.stages, args.since))
+    finally:
+        text_analyser.close()
+        db_manager.close_connection()
+
+
+if __name__ == "__main__":
+    main()
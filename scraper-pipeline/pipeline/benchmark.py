@@ -0,0 +1,382 @@
+'''
+    Script for benchmarking parts of the scraper pipeline locally, without calling OpenAI.
+    Only the load benchmark needs a database: a local Postgres, given by the DB_* variables,
+    where it creates (and drops) its own schema. Run `python benchmark.py --help` to list
+    the benchmarks.
+'''
+
+import argparse
+import csv
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+import nltk
+from textblob import TextBlob
+from nltk.sentiment import SentimentIntensityAnalyzer
+import db_pool
+from reference_data import REFERENCE_DATA
+
+from keyword_classifier import KeywordTopicClassifier, agreement_report, TOPIC_TERMS_PATH
+from sentence_index import SentenceIndex
+from sentence_scores import SentenceScorer, SentenceCache
+from sentiment import SentimentAnalyser, ParallelSentimentAnalyser
+from polarity import PolarityAnalyser
+from load import DatabaseManager
+from models import Article, TopicAnalysis
+
+SCHEMA_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', '..', 'architecture', 'schema')
+LOAD_BENCHMARK_SCHEMA = 'load_benchmark'
+# The article insert as it was before batching, one round-trip per article.
+ROW_ARTICLE_INSERT_QUERY = '''
+    INSERT INTO article
+        (news_outlet_id, article_headline, article_url, article_published_date,
+         article_subjectivity, article_polarity, article_positive_sentiment,
+         article_neutral_sentiment, article_negative_sentiment, article_compound_sentiment)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    RETURNING article_id;
+'''
+ROW_ARTICLE_TOPIC_INSERT_QUERY = '''
+    INSERT INTO article_topic
+        (article_id, article_published_date, topic_id, article_topic_positive_sentiment,
+         article_topic_negative_sentiment, article_topic_neutral_sentiment,
+         article_topic_compound_sentiment)
+    VALUES (%s, %s, %s, %s, %s, %s, %s);
+'''
+
+FILLER_WORDS = (
+    'the a of to and in said on for that with was is it by as at from has have but this '
+    'government minister people week year report told new after over plans could would '
+    'officials country members public support policy statement spokesperson announced'
+).split()
+
+
+def synthetic_articles(article_count: int, words_per_article: int = 800,
+                       seed: int = 0) -> list[str]:
+    '''Generate article-like bodies made of filler words and a few topic key terms.'''
+    rng = random.Random(seed)
+    key_terms = [term for terms in load_topic_terms() for term in terms]
+    articles = []
+    for _ in range(article_count):
+        words = []
+        for word_index in range(words_per_article):
+            if rng.random() < 0.02:
+                words.append(rng.choice(key_terms))
+            else:
+                words.append(rng.choice(FILLER_WORDS))
+            if word_index % 20 == 19:
+                words[-1] += '.'
+        articles.append(' '.join(words).capitalize())
+    return articles
+
+
+def load_topic_terms() -> list[list[str]]:
+    '''Load the key terms of each topic.'''
+    with open(TOPIC_TERMS_PATH, encoding='utf-8', newline='') as file:
+        return [row['key_terms'].split('|') for row in csv.DictReader(file)]
+
+
+def split_sentences(body: str) -> list[str]:
+    '''Split a synthetic body into sentences, without needing NLTK data.'''
+    return [sentence.strip() + '.' for sentence in body.split('.') if sentence.strip()]
+
+
+def load_samples(path: str) -> list[tuple[str, list[str]]]:
+    '''Load stored LLM topic assignments from a JSON lines file, where each line has the
+    keys "body" and "topics".'''
+    with open(path, encoding='utf-8') as file:
+        return [(row['body'], row['topics']) for row in map(json.loads, file)]
+
+
+def benchmark_classifier(args: argparse.Namespace) -> None:
+    '''Time the keyword classifier, and compare it against stored LLM assignments if a
+    samples file is given.'''
+    classifier = KeywordTopicClassifier.from_csv()
+    samples = load_samples(args.samples) if args.samples else None
+    bodies = ([body for body, _ in samples] if samples
+              else synthetic_articles(args.articles))
+    if args.idf:
+        classifier.fit_idf(bodies)
+    start = time.perf_counter()
+    for body in bodies:
+        classifier.classify(body)
+    elapsed = time.perf_counter() - start
+    print(f"Classified {len(bodies)} articles in {elapsed:.3f}s "
+          f"({elapsed / len(bodies) * 1e6:.0f} us/article).")
+    if samples:
+        report = agreement_report(classifier, samples, args.threshold)
+        print(json.dumps(report, indent=2))
+
+
+def _scan_sentences(sentences: list[str], topics: list[list[str]]) -> list[str]:
+    '''The previous topic context assembly, scanning every sentence for every topic.'''
+    return [
+        " ".join(sentence for sentence in sentences
+                 if any(term.lower() in sentence.lower() for term in key_terms))
+        for key_terms in topics
+    ]
+
+
+def _index_sentences(sentences: list[str], topics: list[list[str]]) -> list[str]:
+    '''Topic context assembly using a sentence index built once per article.'''
+    sentence_index = SentenceIndex(sentences)
+    return [sentence_index.get_context_text(key_terms) for key_terms in topics]
+
+
+def benchmark_topic_index(args: argparse.Namespace) -> None:
+    '''Time assembling the topic context text of long articles with many topics, with and
+    without the sentence index.'''
+    rng = random.Random(0)
+    all_topics = load_topic_terms()
+    articles = [
+        (split_sentences(body), rng.sample(all_topics, args.topics))
+        for body in synthetic_articles(args.articles, args.words)
+    ]
+    for name, method in (('scan', _scan_sentences), ('index', _index_sentences)):
+        start = time.perf_counter()
+        for sentences, topics in articles:
+            method(sentences, topics)
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {elapsed / len(articles) * 1e3:.3f} ms/article")
+
+
+def benchmark_sentiment(args: argparse.Namespace) -> None:
+    '''Time the topic and body sentiment of articles, scoring the text of each topic and
+    the body with VADER against scoring each sentence once and combining the results.'''
+    rng = random.Random(0)
+    all_topics = load_topic_terms()
+    analyser = SentimentIntensityAnalyzer()
+    articles = [
+        (body, SentenceIndex(split_sentences(body)), rng.sample(all_topics, args.topics))
+        for body in synthetic_articles(args.articles, args.words)
+    ]
+    start = time.perf_counter()
+    for body, sentence_index, topics in articles:
+        for key_terms in topics:
+            analyser.polarity_scores(sentence_index.get_context_text(key_terms))
+        analyser.polarity_scores(body)
+    elapsed = time.perf_counter() - start
+    print(f"document: {elapsed / len(articles) * 1e3:.3f} ms/article")
+    cache = SentenceCache()
+    scorer = SentenceScorer(analyser, cache)
+    start = time.perf_counter()
+    for body, sentence_index, topics in articles:
+        for key_terms in topics:
+            scorer.score_sentences(sentence_index.get_sentences(key_terms))
+        scorer.score_text(body, split_sentences(body))
+    elapsed = time.perf_counter() - start
+    print(f"sentence: {elapsed / len(articles) * 1e3:.3f} ms/article {cache.get_stats()}")
+
+
+def benchmark_polarity(args: argparse.Namespace) -> None:
+    '''Time TextBlob's polarity and subjectivity against the PolarityAnalyser, which reuses
+    the sentence split of the topic analysis, checking the scores are identical.'''
+    bodies = ([body for body, _ in load_samples(args.samples)] if args.samples
+              else synthetic_articles(args.articles, args.words))
+    sentences = [nltk.sent_tokenize(body) for body in bodies]
+    start = time.perf_counter()
+    expected = [tuple(TextBlob(body).sentiment) for body in bodies]
+    textblob_rate = len(bodies) / (time.perf_counter() - start)
+    polarity_analyser = PolarityAnalyser()
+    start = time.perf_counter()
+    scores = [polarity_analyser.score_text(body, body_sentences)
+              for body, body_sentences in zip(bodies, sentences)]
+    rate = len(bodies) / (time.perf_counter() - start)
+    mismatches = sum(score != expected_score for score, expected_score in zip(scores, expected))
+    print(f"textblob: {textblob_rate:.1f} articles/s")
+    print(f"polarity analyser: {rate:.1f} articles/s ({rate / textblob_rate:.2f}x), "
+          f"{mismatches} mismatches")
+
+
+def benchmark_scaling(args: argparse.Namespace) -> None:
+    '''Time the sentiment analysis of articles with their topics on one process, then
+    across pools of 1 up to max_workers processes.'''
+    rng = random.Random(0)
+    all_topics = load_topic_terms()
+    tasks = [(body, rng.sample(all_topics, args.topics))
+             for body in synthetic_articles(args.articles, args.words)]
+    analyser = SentimentAnalyser(args.sentence_scoring)
+    # load the lexicons before timing, as the workers do
+    analyser.score_body("")
+    start = time.perf_counter()
+    for task in tasks:
+        analyser.analyse(*task)
+    serial_rate = len(tasks) / (time.perf_counter() - start)
+    print(f"serial: {serial_rate:.1f} articles/s")
+    for workers in range(1, args.max_workers + 1):
+        parallel_analyser = ParallelSentimentAnalyser(workers, args.sentence_scoring)
+        # start the workers (and load the lexicons) before timing
+        parallel_analyser.analyse(tasks[:workers])
+        start = time.perf_counter()
+        parallel_analyser.analyse(tasks)
+        rate = len(tasks) / (time.perf_counter() - start)
+        parallel_analyser.close()
+        print(f"{workers} workers: {rate:.1f} articles/s ({rate / serial_rate:.2f}x)")
+
+
+def _create_load_benchmark_schema() -> list[str]:
+    '''Create the database schema in its own Postgres schema and seed the topics,
+    returning the topic names.'''
+    with open(os.path.join(SCHEMA_DIRECTORY, 'schema.sql'), encoding='utf-8') as file:
+        statements = [line for line in file if not line.startswith('\\copy')]
+    with open(os.path.join(SCHEMA_DIRECTORY, 'topics.csv'), encoding='utf-8') as file:
+        topics = [row[0] for row in list(csv.reader(file))[1:] if row]
+    connection = db_pool.get_connection()
+    with connection.cursor() as cur:
+        cur.execute(f'DROP SCHEMA IF EXISTS {LOAD_BENCHMARK_SCHEMA} CASCADE;')
+        cur.execute(f'CREATE SCHEMA {LOAD_BENCHMARK_SCHEMA};')
+        cur.execute(f'SET search_path TO {LOAD_BENCHMARK_SCHEMA};')
+        cur.execute(''.join(statements))
+        cur.executemany('INSERT INTO topic (topic_name) VALUES (%s);',
+                        [(topic,) for topic in topics])
+    connection.commit()
+    db_pool.release_connection(connection)
+    return topics
+
+
+def _synthetic_loaded_articles(article_count: int, topics: list[str],
+                               topics_per_article: int) -> list[Article]:
+    '''Generate analysed articles with unique URLs, ready to be loaded.'''
+    rng = random.Random(0)
+    published_date = datetime(2025, 1, 1)
+    articles = []
+    for index in range(article_count):
+        article = Article('The Guardian', f'Headline {index}',
+                          f'https://www.theguardian.com/benchmark/{index}',
+                          published_date + timedelta(minutes=index), '')
+        article.set_subjectivity(rng.random())
+        article.set_polarity(rng.uniform(-1, 1))
+        article.set_sentiments(rng.random(), rng.random(), rng.random(), rng.uniform(-1, 1))
+        topic_analyses = []
+        for topic in rng.sample(topics, topics_per_article):
+            topic_analysis = TopicAnalysis(topic, [])
+            topic_analysis.set_sentiments(rng.random(), rng.random(), rng.random(),
+                                          rng.uniform(-1, 1))
+            topic_analyses.append(topic_analysis)
+        article.set_topics_analyses(topic_analyses)
+        articles.append(article)
+    return articles
+
+
+def _load_row_by_row(connection, articles: list[Article], news_outlet_id_map: dict,
+                     topic_id_map: dict) -> None:
+    '''Load the articles one INSERT at a time, as the pipeline did before batching.'''
+    with connection.cursor() as cur:
+        for month in {article.get_published_date().date().replace(day=1)
+                      for article in articles}:
+            cur.execute(DatabaseManager.PARTITIONS_QUERY, (month,))
+        for article in articles:
+            cur.execute(ROW_ARTICLE_INSERT_QUERY, article.get_insert_values(news_outlet_id_map))
+            article.set_id(cur.fetchone()[0])
+        connection.commit()
+        cur.executemany(ROW_ARTICLE_TOPIC_INSERT_QUERY,
+                        [row for article in articles
+                         for row in article.get_topic_analyses_insert_values(topic_id_map)])
+    connection.commit()
+
+
+def benchmark_load(args: argparse.Namespace) -> None:
+    '''Time loading articles and their topics into a local Postgres row by row, with a
+    multi-row INSERT, and with COPY through a staging table.'''
+    os.environ['PGOPTIONS'] = f'-c search_path={LOAD_BENCHMARK_SCHEMA}'
+    topics = _create_load_benchmark_schema()
+    db_manager = DatabaseManager()
+    connection = db_pool.get_connection()
+    news_outlet_id_map = REFERENCE_DATA.get_news_outlet_ids(connection)
+    topic_id_map = REFERENCE_DATA.get_topic_ids(connection)
+    strategies = {
+        'row by row': lambda articles: _load_row_by_row(
+            connection, articles, news_outlet_id_map, topic_id_map),
+        'execute_values': lambda articles: _load_with_threshold(
+            db_manager, articles, len(articles) + 1),
+        'copy': lambda articles: _load_with_threshold(db_manager, articles, 0),
+    }
+    try:
+        baseline = None
+        for name, load in strategies.items():
+            with connection.cursor() as cur:
+                cur.execute('TRUNCATE article, article_topic, article_chunk, '
+                            'article_sentence_score, daily_outlet_sentiment, '
+                            'daily_topic_sentiment RESTART IDENTITY;')
+            connection.commit()
+            articles = _synthetic_loaded_articles(args.articles, topics, args.topics)
+            start = time.perf_counter()
+            load(articles)
+            rate = len(articles) / (time.perf_counter() - start)
+            baseline = baseline or rate
+            print(f"{name}: {rate:.1f} articles/s ({rate / baseline:.2f}x)")
+    finally:
+        with connection.cursor() as cur:
+            cur.execute(f'DROP SCHEMA {LOAD_BENCHMARK_SCHEMA} CASCADE;')
+        connection.commit()
+        db_pool.release_connection(connection)
+        db_manager.close_connection()
+
+
+def _load_with_threshold(db_manager: DatabaseManager, articles: list[Article],
+                         copy_threshold: int) -> None:
+    '''Load the articles with the manager, choosing the INSERT or COPY path.'''
+    db_manager.COPY_THRESHOLD = copy_threshold
+    db_manager.insert_into_database(articles)
+
+
+def main() -> None:
+    '''Parse the command line arguments and run the chosen benchmark.'''
+    parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = parser.add_subparsers(required=True)
+
+    classifier_parser = subparsers.add_parser(
+        'classifier', help='Keyword topic classifier speed and LLM agreement.')
+    classifier_parser.add_argument('--articles', type=int, default=1000)
+    classifier_parser.add_argument(
+        '--samples', help='JSON lines file of stored LLM topic assignments.')
+    classifier_parser.add_argument('--threshold', type=float, default=0.5)
+    classifier_parser.add_argument('--idf', action='store_true')
+    classifier_parser.set_defaults(func=benchmark_classifier)
+
+    index_parser = subparsers.add_parser(
+        'topic-index', help='Topic context assembly on long articles with many topics.')
+    index_parser.add_argument('--articles', type=int, default=200)
+    index_parser.add_argument('--words', type=int, default=5000)
+    index_parser.add_argument('--topics', type=int, default=15)
+    index_parser.set_defaults(func=benchmark_topic_index)
+
+    sentiment_parser = subparsers.add_parser(
+        'sentiment', help='Topic and body sentiment, per document or per cached sentence.')
+    sentiment_parser.add_argument('--articles', type=int, default=200)
+    sentiment_parser.add_argument('--words', type=int, default=1000)
+    sentiment_parser.add_argument('--topics', type=int, default=5)
+    sentiment_parser.set_defaults(func=benchmark_sentiment)
+
+    polarity_parser = subparsers.add_parser(
+        'polarity', help='Polarity and subjectivity throughput against TextBlob.')
+    polarity_parser.add_argument('--articles', type=int, default=200)
+    polarity_parser.add_argument('--words', type=int, default=1000)
+    polarity_parser.add_argument(
+        '--samples', help='JSON lines file of articles, as for the classifier benchmark.')
+    polarity_parser.set_defaults(func=benchmark_polarity)
+
+    scaling_parser = subparsers.add_parser(
+        'scaling', help='Sentiment analysis throughput from 1 to N worker processes.')
+    scaling_parser.add_argument('--articles', type=int, default=400)
+    scaling_parser.add_argument('--words', type=int, default=1000)
+    scaling_parser.add_argument('--topics', type=int, default=5)
+    scaling_parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    scaling_parser.add_argument('--sentence-scoring', action='store_true')
+    scaling_parser.set_defaults(func=benchmark_scaling)
+
+    load_parser = subparsers.add_parser(
+        'load', help='Article and topic inserts into a local Postgres, by strategy.')
+    load_parser.add_argument('--articles', type=int, default=5000)
+    load_parser.add_argument('--topics', type=int, default=3)
+    load_parser.set_defaults(func=benchmark_load)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
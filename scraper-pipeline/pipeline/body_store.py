@@ -0,0 +1,293 @@
+'''
+    Script defining the BodyStore class, a compressed, content-addressed store of article
+    bodies on local disk or S3, so stored articles can be re-analysed without re-fetching
+    them. Bodies are written in segments: one object per load batch and publication
+    month, holding each body as its own zstd frame (compressed with a dictionary trained on
+    past bodies) behind a small header. Segments are read sequentially for backfills, and
+    through the index written alongside each one for single bodies.
+
+        python body_store.py train --samples 2000
+'''
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import uuid
+from datetime import date, datetime
+from typing import BinaryIO, Iterator
+
+import boto3
+import zstandard
+
+SEGMENT_PREFIX = 'segments/'
+SEGMENT_SUFFIX = '.seg'
+INDEX_SUFFIX = '.idx'
+DICTIONARY_PREFIX = 'dictionaries/'
+CURRENT_DICTIONARY_KEY = DICTIONARY_PREFIX + 'current'
+# URL hash (SHA-256), article id and compressed length, before each frame of a segment
+RECORD_HEADER = struct.Struct('<32sQI')
+COMPRESSION_LEVEL = 9
+DICTIONARY_SIZE = 112 * 1024
+
+
+def hash_url(url: str) -> bytes:
+    '''Get the key a body is stored under: the SHA-256 digest of its article's url.'''
+    return hashlib.sha256(url.encode('utf-8')).digest()
+
+
+class LocalBlobStorage:
+    '''Class storing the objects of a body store as files under a directory.'''
+
+    def __init__(self, root: str):
+        self.__root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        '''Get the path of the file holding an object.'''
+        return os.path.join(self.__root, *key.split('/'))
+
+    def put(self, key: str, data: bytes) -> None:
+        '''Write an object, replacing it atomically if it exists.'''
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'wb') as file:
+            file.write(data)
+        os.replace(path + '.tmp', path)
+
+    def get(self, key: str) -> bytes:
+        '''Read a whole object, or None if it does not exist.'''
+        try:
+            with open(self._path(key), 'rb') as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def get_range(self, key: str, offset: int, length: int) -> bytes:
+        '''Read length bytes of an object from the offset.'''
+        with open(self._path(key), 'rb') as file:
+            file.seek(offset)
+            return file.read(length)
+
+    def open(self, key: str) -> BinaryIO:
+        '''Open an object for reading it sequentially.'''
+        return open(self._path(key), 'rb')
+
+    def list(self, prefix: str) -> list[str]:
+        '''Get the keys of the objects starting with the prefix, in order.'''
+        keys = []
+        for directory, _, files in os.walk(self.__root):
+            relative = os.path.relpath(directory, self.__root).replace(os.sep, '/')
+            for name in files:
+                key = name if relative == '.' else f'{relative}/{name}'
+                if key.startswith(prefix) and not key.endswith('.tmp'):
+                    keys.append(key)
+        return sorted(keys)
+
+
+class S3BlobStorage:
+    '''Class storing the objects of a body store in an S3 (or S3-compatible) bucket.'''
+
+    def __init__(self, bucket: str, prefix: str = '', client=None):
+        self.__bucket = bucket
+        self.__prefix = prefix
+        self.__client = client if client is not None else boto3.client('s3')
+
+    def put(self, key: str, data: bytes) -> None:
+        '''Write an object.'''
+        self.__client.put_object(Bucket=self.__bucket, Key=self.__prefix + key, Body=data)
+
+    def get(self, key: str) -> bytes:
+        '''Read a whole object, or None if it does not exist.'''
+        try:
+            response = self.__client.get_object(Bucket=self.__bucket, Key=self.__prefix + key)
+        except self.__client.exceptions.NoSuchKey:
+            return None
+        return response['Body'].read()
+
+    def get_range(self, key: str, offset: int, length: int) -> bytes:
+        '''Read length bytes of an object from the offset, with a ranged GET.'''
+        response = self.__client.get_object(
+            Bucket=self.__bucket, Key=self.__prefix + key,
+            Range=f'bytes={offset}-{offset + length - 1}')
+        return response['Body'].read()
+
+    def open(self, key: str) -> BinaryIO:
+        '''Open an object for reading it sequentially, streaming it from S3.'''
+        return self.__client.get_object(Bucket=self.__bucket, Key=self.__prefix + key)['Body']
+
+    def list(self, prefix: str) -> list[str]:
+        '''Get the keys of the objects starting with the prefix, in order.'''
+        keys = []
+        paginator = self.__client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.__bucket, Prefix=self.__prefix + prefix):
+            keys.extend(item['Key'][len(self.__prefix):] for item in page.get('Contents', []))
+        return sorted(keys)
+
+
+class BodyStore:
+    '''Class writing and reading article bodies in compressed segments. Each frame names
+    the dictionary it was compressed with, so bodies written before a new dictionary is
+    trained stay readable.'''
+
+    def __init__(self, storage):
+        '''Instantiate the store on a LocalBlobStorage or S3BlobStorage. The current
+        dictionary is read on first use.'''
+        self.__storage = storage
+        self.__dictionaries = {}
+        self.__decompressors = {}
+        self.__compressor = None
+        self.__index = None
+
+    @classmethod
+    def from_env(cls) -> 'BodyStore':
+        '''Create the store given by BODY_STORE_PATH (a directory) or BODY_STORE_BUCKET
+        (and BODY_STORE_PREFIX), or None if neither is set.'''
+        if os.environ.get('BODY_STORE_PATH'):
+            return cls(LocalBlobStorage(os.environ['BODY_STORE_PATH']))
+        if os.environ.get('BODY_STORE_BUCKET'):
+            return cls(S3BlobStorage(os.environ['BODY_STORE_BUCKET'],
+                                     os.environ.get('BODY_STORE_PREFIX', '')))
+        return None
+
+    def _get_dictionary(self, dict_id: int) -> zstandard.ZstdCompressionDict:
+        '''Get a stored dictionary by its id, or None for frames without a dictionary.'''
+        if dict_id == 0:
+            return None
+        if dict_id not in self.__dictionaries:
+            data = self.__storage.get(f'{DICTIONARY_PREFIX}{dict_id}.dict')
+            if data is None:
+                raise ValueError(f'Dictionary {dict_id} is missing from the body store.')
+            self.__dictionaries[dict_id] = zstandard.ZstdCompressionDict(data)
+        return self.__dictionaries[dict_id]
+
+    def _get_compressor(self) -> zstandard.ZstdCompressor:
+        '''Get the compressor, using the current dictionary if one has been trained.'''
+        if self.__compressor is None:
+            current = self.__storage.get(CURRENT_DICTIONARY_KEY)
+            dictionary = self._get_dictionary(int(current)) if current else None
+            self.__compressor = zstandard.ZstdCompressor(
+                level=COMPRESSION_LEVEL, dict_data=dictionary, write_content_size=True)
+        return self.__compressor
+
+    def _decompress(self, frame: bytes) -> str:
+        '''Decompress a frame with the dictionary it names.'''
+        dict_id = zstandard.get_frame_parameters(frame).dict_id
+        if dict_id not in self.__decompressors:
+            self.__decompressors[dict_id] = zstandard.ZstdDecompressor(
+                dict_data=self._get_dictionary(dict_id))
+        return self.__decompressors[dict_id].decompress(frame).decode('utf-8')
+
+    def train_dictionary(self, samples: list[str], size: int = DICTIONARY_SIZE) -> int:
+        '''Train a dictionary on sample bodies and make it the one new bodies are
+        compressed with. Returns the id of the dictionary.'''
+        dictionary = zstandard.train_dictionary(
+            size, [sample.encode('utf-8') for sample in samples])
+        dict_id = dictionary.dict_id()
+        self.__storage.put(f'{DICTIONARY_PREFIX}{dict_id}.dict', dictionary.as_bytes())
+        self.__storage.put(CURRENT_DICTIONARY_KEY, str(dict_id).encode())
+        self.__dictionaries[dict_id] = dictionary
+        self.__compressor = None
+        return dict_id
+
+    def _write_segment(self, key: str, articles: list[tuple[int, str, datetime, str]]) -> None:
+        '''Write the bodies of the articles in one segment, and the segment's index.'''
+        compressor = self._get_compressor()
+        segment, index = bytearray(), {}
+        for article_id, url, _, body in articles:
+            url_hash = hash_url(url)
+            frame = compressor.compress(body.encode('utf-8'))
+            segment += RECORD_HEADER.pack(url_hash, article_id, len(frame))
+            index[url_hash.hex()] = [len(segment), len(frame), article_id]
+            segment += frame
+        self.__storage.put(key + SEGMENT_SUFFIX, bytes(segment))
+        self.__storage.put(key + INDEX_SUFFIX, json.dumps(index).encode())
+
+    def write(self, articles: list[tuple[int, str, datetime, str]]) -> list[str]:
+        '''Write the bodies of (article id, url, published date, body) tuples, in one
+        segment per publication month. Returns the keys of the segments written.'''
+        months = {}
+        for article in articles:
+            months.setdefault(article[2].strftime('%Y/%m'), []).append(article)
+        written_at = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        segment_keys = []
+        for month, month_articles in sorted(months.items()):
+            key = f'{SEGMENT_PREFIX}{month}/{written_at}-{uuid.uuid4().hex[:8]}'
+            self._write_segment(key, month_articles)
+            segment_keys.append(key + SEGMENT_SUFFIX)
+        self.__index = None
+        return segment_keys
+
+    def get_segment_keys(self, month: date = None) -> list[str]:
+        '''Get the keys of the segments, of a publication month or of every month, in
+        order of month then time written.'''
+        prefix = SEGMENT_PREFIX + (month.strftime('%Y/%m/') if month else '')
+        return [key for key in self.__storage.list(prefix) if key.endswith(SEGMENT_SUFFIX)]
+
+    def read_segment(self, segment_key: str) -> Iterator[tuple[int, bytes, str]]:
+        '''Read the (article id, url hash, body) records of a segment sequentially.'''
+        with self.__storage.open(segment_key) as stream:
+            while True:
+                header = stream.read(RECORD_HEADER.size)
+                if not header:
+                    return
+                url_hash, article_id, length = RECORD_HEADER.unpack(header)
+                yield article_id, url_hash, self._decompress(stream.read(length))
+
+    def iter_bodies(self, month: date = None) -> Iterator[tuple[int, bytes, str]]:
+        '''Read the (article id, url hash, body) records of every segment, of a
+        publication month or of every month, sequentially. A body written more than once
+        is only read from its latest segment: a load writes its segment before it
+        commits, so an earlier copy may be from a batch which failed to commit, under
+        article ids which were never stored.'''
+        index = self._get_index()
+        for segment_key in self.get_segment_keys(month):
+            for article_id, url_hash, body in self.read_segment(segment_key):
+                location = index.get(url_hash.hex())
+                if location is not None and location[0] == segment_key:
+                    yield article_id, url_hash, body
+
+    def _get_index(self) -> dict[str, tuple[str, int, int]]:
+        '''Get the location (segment key, offset, length) of each body by its url hash,
+        from the indexes of every segment, the latest segment holding a body winning. It
+        is read once and cached.'''
+        if self.__index is None:
+            self.__index = {}
+            for key in self.__storage.list(SEGMENT_PREFIX):
+                if key.endswith(INDEX_SUFFIX):
+                    segment_key = key[:-len(INDEX_SUFFIX)] + SEGMENT_SUFFIX
+                    for url_hash, (offset, length, _) in json.loads(
+                            self.__storage.get(key)).items():
+                        self.__index[url_hash] = (segment_key, offset, length)
+        return self.__index
+
+    def get_body(self, url: str) -> str:
+        '''Get the body of the article with the url, or None if it is not stored.'''
+        location = self._get_index().get(hash_url(url).hex())
+        if location is None:
+            return None
+        return self._decompress(self.__storage.get_range(*location))
+
+
+def main() -> None:
+    '''Train a dictionary on bodies already in the store.'''
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['train'])
+    parser.add_argument('--samples', type=int, default=2000,
+                        help='Number of stored bodies to train the dictionary on.')
+    args = parser.parse_args()
+    body_store = BodyStore.from_env()
+    if body_store is None:
+        parser.error('Set BODY_STORE_PATH or BODY_STORE_BUCKET.')
+    samples = []
+    for _, _, body in body_store.iter_bodies():
+        samples.append(body)
+        if len(samples) == args.samples:
+            break
+    print(f"Trained dictionary {body_store.train_dictionary(samples)} "
+          f"on {len(samples)} bodies.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+'''
+    Script defining the BodyChunker, which detects live blogs and oversized articles and
+    splits their bodies into chunks analysed separately, and the functions aggregating the
+    chunk scores back into article and topic scores.
+'''
+
+import re
+
+from sentiment import split_sentences
+
+LIVE_BLOG_URL_PATTERN = re.compile(r"theguardian\.com/(?:[\w-]+/)+live/")
+# Live blog entries are headed by their time, e.g. "10.32 BST" or "9:05am GMT".
+ENTRY_TIMESTAMP_PATTERN = re.compile(
+    r"(?<![\d.:])(?:[01]?\d|2[0-3])[.:][0-5]\d ?(?:am|pm)? ?(?:BST|GMT|CEST|CET|EDT|EST|UTC)\b")
+BODY_SCORE_KEYS = ('polarity', 'subjectivity', 'pos', 'neu', 'neg', 'compound')
+TOPIC_SCORE_KEYS = ('pos', 'neu', 'neg', 'compound')
+
+
+class BodyChunker:
+    '''Class splitting the bodies of live blogs and oversized articles into chunks, so the
+    time to analyse any single article is bounded by the chunk size.'''
+
+    def __init__(self, max_words: int = 2000, chunk_words: int = 500, min_entries: int = 3):
+        '''Instantiate the chunker. Bodies longer than max_words, and live blogs (by URL,
+        or with at least min_entries timestamped entries), are split into chunks of about
+        chunk_words words.'''
+        self.__max_words = max_words
+        self.__chunk_words = chunk_words
+        self.__min_entries = min_entries
+
+    def is_live_blog(self, url: str, body: str) -> bool:
+        '''Check whether an article is a live blog.'''
+        if LIVE_BLOG_URL_PATTERN.search(url or ''):
+            return True
+        return len(ENTRY_TIMESTAMP_PATTERN.findall(body)) >= self.__min_entries
+
+    def should_chunk(self, url: str, body: str) -> bool:
+        '''Check whether an article body should be split into chunks.'''
+        return len(body.split()) > self.__max_words or self.is_live_blog(url, body)
+
+    def _split_entries(self, body: str) -> list[str]:
+        '''Split a live blog into its timestamped entries (and any summary before them).'''
+        starts = [match.start() for match in ENTRY_TIMESTAMP_PATTERN.finditer(body)]
+        boundaries = [0] + starts + [len(body)]
+        entries = [body[start:end].strip() for start, end in zip(boundaries, boundaries[1:])]
+        return [entry for entry in entries if entry]
+
+    def _split_sentences(self, text: str) -> list[str]:
+        '''Split a text into chunks of whole sentences of about chunk_words words.'''
+        chunks, sentences, word_count = [], [], 0
+        for sentence in split_sentences(text):
+            sentences.append(sentence)
+            word_count += len(sentence.split())
+            if word_count >= self.__chunk_words:
+                chunks.append(" ".join(sentences))
+                sentences, word_count = [], 0
+        if sentences:
+            chunks.append(" ".join(sentences))
+        return chunks
+
+    def split(self, url: str, body: str) -> list[str]:
+        '''Split a body into chunks. Live blog entries are kept whole where they fit, with
+        short consecutive entries merged; anything else is split at sentence boundaries.'''
+        if not self.should_chunk(url, body):
+            return [body]
+        entries = self._split_entries(body) if self.is_live_blog(url, body) else [body]
+        chunks, merged, merged_words = [], [], 0
+        for entry in entries:
+            entry_words = len(entry.split())
+            if merged and merged_words + entry_words > self.__chunk_words:
+                chunks.append(" ".join(merged))
+                merged, merged_words = [], 0
+            if entry_words > self.__chunk_words:
+                chunks.extend(self._split_sentences(entry))
+            else:
+                merged.append(entry)
+                merged_words += entry_words
+        if merged:
+            chunks.append(" ".join(merged))
+        return chunks or [body]
+
+
+def _weighted_mean(scores: list[dict], weights: list[int], keys: tuple[str]) -> dict:
+    '''Average the scores, weighting each by its weight. If all weights are zero, every
+    score is zero.'''
+    total = sum(weights)
+    if total == 0:
+        return {key: 0.0 for key in keys}
+    return {key: sum(score[key] * weight for score, weight in zip(scores, weights)) / total
+            for key in keys}
+
+
+def aggregate_chunk_scores(chunks: list[str],
+                           results: list[tuple[dict, list[dict]]]) -> tuple[dict, list[dict]]:
+    '''Aggregate the (body scores, topic scores) of each chunk into those of the article.
+    Body scores are weighted by the words in each chunk, and topic scores by the sentences
+    mentioning the topic in each chunk.'''
+    body_scores = _weighted_mean([body for body, _ in results],
+                                 [len(chunk.split()) for chunk in chunks], BODY_SCORE_KEYS)
+    topic_count = len(results[0][1]) if results else 0
+    topic_scores = []
+    for topic_index in range(topic_count):
+        scores = [topics[topic_index] for _, topics in results]
+        topic_score = _weighted_mean(
+            scores, [score['sentences'] for score in scores], TOPIC_SCORE_KEYS)
+        topic_score['sentences'] = sum(score['sentences'] for score in scores)
+        topic_scores.append(topic_score)
+    return body_scores, topic_scores
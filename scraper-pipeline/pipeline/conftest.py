@@ -0,0 +1,21 @@
+'''
+    Makes the shared modules (e.g. db_pool) importable in the tests, as they are in the
+    Docker image, and provides the fixtures shared by the tests.
+'''
+
+import os
+import sys
+import pytest
+import nltk
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'shared'))
+
+
+@pytest.fixture(scope="session")
+def nltk_data():
+    '''Skip the tests if the NLTK data is not installed.'''
+    try:
+        nltk.data.find('sentiment/vader_lexicon.zip')
+        nltk.data.find('tokenizers/punkt_tab')
+    except LookupError:
+        pytest.skip("NLTK data is not installed.")
@@ -48,6 +48,10 @@ class RSSFeedExtractor(ABC):
             print(f"Request failed: {e}")
             return None
 
+    def fetch_body(self, url: str) -> str:
+        '''Fetch the formatted body of a single article, or None if it cannot be retrieved.'''
+        return self._body_extractor(url)
+
     def _rss_parser(self, feed_url: str) -> list[dict]:
         '''Parses the given RSS feed, and returns complete raw data for each article.'''
         combined_article = []
@@ -0,0 +1,201 @@
+'''
+    Script defining the KeywordTopicClassifier, a local classifier which assigns topics to
+    articles by matching curated key terms. It is used as a cheap first pass before asking
+    OpenAI's GPT to extract topics.
+'''
+
+import csv
+import math
+import os
+import re
+from typing import Iterable
+
+from automaton import AhoCorasick
+
+TOPIC_TERMS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'topic_terms.csv')
+TOKEN_PATTERN = re.compile(r"[\w&]+")
+
+
+def normalise_token(token: str) -> str:
+    '''Lowercase a token, unless it is an acronym (e.g. US, EU, NHS), so that acronyms do
+    not match ordinary words such as "us".'''
+    if len(token) > 1 and token.isupper():
+        return token
+    return token.lower()
+
+
+class TopicClassification:
+    '''Class representing the result of classifying a single article.'''
+
+    def __init__(self, topic_data: list[dict], confidence: float):
+        self.__topic_data = topic_data
+        self.__confidence = confidence
+
+    def get_topic_data(self) -> list[dict]:
+        '''Getter for the topic data, in the same format as returned by OpenAI.'''
+        return self.__topic_data
+
+    def get_topic_names(self) -> list[str]:
+        '''Getter for the names of the assigned topics.'''
+        return [topic['topic_name'] for topic in self.__topic_data]
+
+    def get_confidence(self) -> float:
+        '''Getter for the confidence (0 to 1) that the assigned topics are correct.'''
+        return self.__confidence
+
+
+class KeywordTopicClassifier:
+    '''Class for assigning topics to articles using an Aho-Corasick automaton over the key
+    terms of each topic. Each topic is scored by the (optionally TF-IDF weighted) number of
+    key term occurrences in the article.'''
+
+    MAX_TOPICS = 5
+
+    def __init__(self, topic_terms: dict[str, list[str]],
+                 saturation: float = 3.0, min_strength: float = 0.5):
+        '''Instantiate the classifier with a mapping of topic names to key terms. A topic's
+        strength approaches 1 as its weighted hits grow past the saturation value, and only
+        topics with at least min_strength are assigned.'''
+        self.__saturation = saturation
+        self.__min_strength = min_strength
+        self.__pattern_topics = []
+        patterns = []
+        for topic_name, key_terms in topic_terms.items():
+            for key_term in key_terms:
+                pattern = tuple(normalise_token(token)
+                                for token in TOKEN_PATTERN.findall(key_term))
+                if pattern:
+                    patterns.append(pattern)
+                    self.__pattern_topics.append(topic_name)
+        self.__automaton = AhoCorasick(patterns)
+        self.__term_weights = [1.0] * len(patterns)
+
+    @classmethod
+    def from_csv(cls, path: str = TOPIC_TERMS_PATH, **kwargs) -> 'KeywordTopicClassifier':
+        '''Instantiate the classifier from a CSV file with topic_name and key_terms columns,
+        where the key terms are separated by "|".'''
+        topic_terms = {}
+        with open(path, encoding='utf-8', newline='') as file:
+            for row in csv.DictReader(file):
+                topic_terms[row['topic_name']] = [
+                    term.strip() for term in row['key_terms'].split('|') if term.strip()]
+        return cls(topic_terms, **kwargs)
+
+    def get_topic_names(self) -> list[str]:
+        '''Getter for the names of the topics with key terms.'''
+        return sorted(set(self.__pattern_topics))
+
+    def _tokenise(self, text: str) -> tuple[list[str], list[tuple[int, int]]]:
+        '''Split the text into normalised tokens, keeping the character span of each.'''
+        tokens, spans = [], []
+        for match in TOKEN_PATTERN.finditer(text):
+            tokens.append(normalise_token(match.group()))
+            spans.append(match.span())
+        return tokens, spans
+
+    def fit_idf(self, documents: Iterable[str]) -> None:
+        '''Weight each key term by its inverse document frequency across the documents, so
+        that terms found in most articles (e.g. "UK") count for less than rare terms.'''
+        document_count = 0
+        document_frequencies = [0] * len(self.__term_weights)
+        for document in documents:
+            document_count += 1
+            tokens, _ = self._tokenise(document)
+            for pattern_index in self.__automaton.find_patterns(tokens):
+                document_frequencies[pattern_index] += 1
+        self.__term_weights = [
+            math.log((1 + document_count) / (1 + frequency)) + 1
+            for frequency in document_frequencies
+        ]
+
+    def _score_topics(self, text: str, valid_topics: set[str] = None) -> dict[str, dict]:
+        '''Find every key term in the text, returning the weighted hits and the key terms
+        (as written in the text) of each matched topic.'''
+        tokens, spans = self._tokenise(text)
+        patterns = self.__automaton.get_patterns()
+        scores = {}
+        for end, pattern_index in self.__automaton.iter_matches(tokens):
+            topic_name = self.__pattern_topics[pattern_index]
+            if valid_topics is not None and topic_name not in valid_topics:
+                continue
+            start = end - len(patterns[pattern_index])
+            key_term = text[spans[start][0]:spans[end - 1][1]]
+            topic_score = scores.setdefault(
+                topic_name, {'hits': 0.0, 'key_terms': []})
+            topic_score['hits'] += self.__term_weights[pattern_index]
+            if key_term not in topic_score['key_terms']:
+                topic_score['key_terms'].append(key_term)
+        return scores
+
+    def classify(self, text: str, valid_topics: list[str] = None) -> TopicClassification:
+        '''Assign up to five topics to the text. The confidence is the margin between the
+        weakest assigned topic and the strongest topic which was not assigned, so it is
+        high only when the assigned topics are clearly separated from the rest.'''
+        if valid_topics is not None:
+            valid_topics = set(valid_topics)
+        scores = self._score_topics(text, valid_topics)
+        ranked = sorted(
+            ((1 - math.exp(-score['hits'] / self.__saturation), topic_name)
+             for topic_name, score in scores.items()),
+            reverse=True,
+        )
+        selected = [(strength, topic_name) for strength, topic_name in ranked[:self.MAX_TOPICS]
+                    if strength >= self.__min_strength]
+        rejected = ranked[len(selected):]
+        if not selected:
+            return TopicClassification([], 0.0)
+        confidence = selected[-1][0] - (rejected[0][0] if rejected else 0.0)
+        topic_data = [
+            {'topic_name': topic_name, 'key_terms': scores[topic_name]['key_terms']}
+            for _, topic_name in selected
+        ]
+        return TopicClassification(topic_data, max(confidence, 0.0))
+
+
+def agreement_report(classifier: KeywordTopicClassifier,
+                     samples: Iterable[tuple[str, list[str]]],
+                     confidence_threshold: float = 0.5) -> dict:
+    '''Compare the classifier against stored LLM topic assignments. Each sample is a tuple
+    of the article body and the topic names the LLM assigned to it.'''
+    # pylint: disable=too-many-locals
+    article_count, confident_count = 0, 0
+    jaccard_sum, confident_jaccard_sum = 0.0, 0.0
+    per_topic = {}
+    for body, llm_topics in samples:
+        classification = classifier.classify(body)
+        local_topics = set(classification.get_topic_names())
+        llm_topics = set(llm_topics)
+        union = local_topics | llm_topics
+        jaccard = len(local_topics & llm_topics) / len(union) if union else 1.0
+        article_count += 1
+        jaccard_sum += jaccard
+        if classification.get_confidence() >= confidence_threshold:
+            confident_count += 1
+            confident_jaccard_sum += jaccard
+        for topic_name in union:
+            counts = per_topic.setdefault(
+                topic_name, {'true_positives': 0, 'local': 0, 'llm': 0})
+            counts['true_positives'] += topic_name in local_topics and topic_name in llm_topics
+            counts['local'] += topic_name in local_topics
+            counts['llm'] += topic_name in llm_topics
+    true_positives = sum(c['true_positives'] for c in per_topic.values())
+    local_total = sum(c['local'] for c in per_topic.values())
+    llm_total = sum(c['llm'] for c in per_topic.values())
+    return {
+        'articles': article_count,
+        'mean_jaccard': jaccard_sum / article_count if article_count else 0.0,
+        'precision': true_positives / local_total if local_total else 0.0,
+        'recall': true_positives / llm_total if llm_total else 0.0,
+        'confident_share': confident_count / article_count if article_count else 0.0,
+        'confident_mean_jaccard': (confident_jaccard_sum / confident_count
+                                   if confident_count else 0.0),
+        'per_topic': {
+            topic_name: {
+                'precision': c['true_positives'] / c['local'] if c['local'] else 0.0,
+                'recall': c['true_positives'] / c['llm'] if c['llm'] else 0.0,
+                'support': c['llm'],
+            }
+            for topic_name, c in sorted(per_topic.items())
+        },
+    }
@@ -1,120 +1,464 @@
 '''
 Script for loading article information and analysis into the rds postgres database.
 '''
-import os
+import csv
+import io
+from datetime import datetime
 import psycopg2
+import psycopg2.extras
 from psycopg2.extensions import connection
-from models import Article
+import db_pool
+from reference_data import REFERENCE_DATA
+from models import Article, TopicAnalysis
+from body_store import BodyStore
+from sentence_store import SentenceScores
 
 
 class DatabaseManager:
     '''Class managing queries to the AWS RDS.'''
 
-    NEWS_OUTLETS_QUERY = 'SELECT news_outlet_name, news_outlet_id FROM news_outlet'
-    TOPICS_QUERY = 'SELECT topic_name, topic_id FROM topic'
-    ARTICLE_URLS_QUERY = 'SELECT article_url FROM article'
-    ARTICLE_INSERT_QUERY = '''
+    # Batches of at least this many articles are loaded through COPY into a staging table.
+    COPY_THRESHOLD = 1000
+
+    PARTITIONS_QUERY = 'SELECT create_article_partitions(%s)'
+    EXISTING_URLS_QUERY = 'SELECT article_url FROM article_url WHERE article_url = ANY(%s)'
+    ARTICLES_SINCE_QUERY = '''
+        SELECT article_id, article_url, news_outlet_name
+        FROM article
+        JOIN news_outlet USING (news_outlet_id)
+        WHERE article_published_date >= %s
+        ORDER BY article_id;
+    '''
+    SENTENCE_SCORES_SINCE_QUERY = '''
+        SELECT article_id, article_url, news_outlet_name,
+            article_sentence_offsets, article_sentence_scores
+        FROM article
+        JOIN news_outlet USING (news_outlet_id)
+        JOIN article_sentence_score USING (article_id, article_published_date)
+        WHERE article_published_date >= %s
+        ORDER BY article_id;
+    '''
+    UNASSIGNED_TOPICS_QUERY = '''
+        SELECT topic_name
+        FROM topic
+        WHERE NOT EXISTS (SELECT 1 FROM article_topic WHERE article_topic.topic_id = topic.topic_id);
+    '''
+    # The urls of the batch are claimed in article_url, each with a new article id, and
+    # only the articles whose url was claimed are inserted.
+    ARTICLE_CLAIM_INSERT = '''
+        claimed AS (
+            INSERT INTO article_url (article_url, article_id, article_published_date)
+            SELECT article_url, nextval('article_id_seq'), article_published_date
+            FROM batch
+            ON CONFLICT (article_url) DO NOTHING
+            RETURNING article_url, article_id
+        )
         INSERT INTO article
             (
-                news_outlet_id, 
-                article_headline, 
-                article_url, 
-                article_published_date, 
-                article_subjectivity, 
-                article_polarity, 
-                article_positive_sentiment, 
-                article_neutral_sentiment, 
+                article_id,
+                news_outlet_id,
+                article_headline,
+                article_url,
+                article_published_date,
+                article_subjectivity,
+                article_polarity,
+                article_positive_sentiment,
+                article_neutral_sentiment,
                 article_negative_sentiment,
                 article_compound_sentiment
-            ) 
-        VALUES 
-            (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        RETURNING article_id;
+            )
+        SELECT article_id, news_outlet_id, article_headline, article_url,
+            article_published_date, article_subjectivity, article_polarity,
+            article_positive_sentiment, article_neutral_sentiment, article_negative_sentiment,
+            article_compound_sentiment
+        FROM batch
+        JOIN claimed USING (article_url)
+        RETURNING article_id, article_url;
     '''
-    ARTICLE_TOPIC_INSERT_QUERY = '''
-        INSERT INTO article_topic
+    ARTICLE_INSERT_QUERY = '''
+        WITH batch
             (
-                article_id, 
-                topic_id, 
+                news_outlet_id,
+                article_headline,
+                article_url,
+                article_published_date,
+                article_subjectivity,
+                article_polarity,
+                article_positive_sentiment,
+                article_neutral_sentiment,
+                article_negative_sentiment,
+                article_compound_sentiment
+            )
+        AS (VALUES %s),
+    ''' + ARTICLE_CLAIM_INSERT
+    ARTICLE_STAGING_QUERY = '''
+        CREATE TEMPORARY TABLE article_staging
+            (
+                news_outlet_id SMALLINT,
+                article_headline VARCHAR(255),
+                article_url VARCHAR(400),
+                article_published_date TIMESTAMP,
+                article_subjectivity FLOAT,
+                article_polarity FLOAT,
+                article_positive_sentiment FLOAT,
+                article_neutral_sentiment FLOAT,
+                article_negative_sentiment FLOAT,
+                article_compound_sentiment FLOAT
+            )
+        ON COMMIT DROP;
+    '''
+    ARTICLE_STAGING_COPY_QUERY = 'COPY article_staging FROM STDIN WITH (FORMAT csv)'
+    ARTICLE_STAGING_INSERT_QUERY = '''
+        WITH batch AS (SELECT * FROM article_staging),
+    ''' + ARTICLE_CLAIM_INSERT
+    ARTICLE_TOPIC_COPY_QUERY = '''
+        COPY article_topic
+            (
+                article_id,
+                article_published_date,
+                topic_id,
                 article_topic_positive_sentiment,
-                article_topic_negative_sentiment, 
+                article_topic_negative_sentiment,
                 article_topic_neutral_sentiment,
                 article_topic_compound_sentiment
-            ) 
-        VALUES 
-            (%s, %s, %s, %s, %s, %s);
+            )
+        FROM STDIN WITH (FORMAT csv)
     '''
+    DAILY_TOPIC_ROLLUP_CONFLICT = '''
+        ON CONFLICT (day, news_outlet_id, topic_id) DO UPDATE SET
+            article_count = daily_topic_sentiment.article_count + EXCLUDED.article_count,
+            positive_sum = daily_topic_sentiment.positive_sum + EXCLUDED.positive_sum,
+            negative_sum = daily_topic_sentiment.negative_sum + EXCLUDED.negative_sum,
+            neutral_sum = daily_topic_sentiment.neutral_sum + EXCLUDED.neutral_sum,
+            compound_sum = daily_topic_sentiment.compound_sum + EXCLUDED.compound_sum,
+            compound_sum_squares =
+                daily_topic_sentiment.compound_sum_squares + EXCLUDED.compound_sum_squares;
+    '''
+    ARTICLE_TOPIC_BULK_INSERT_QUERY = '''
+        WITH inserted AS (
+            INSERT INTO article_topic
+                (
+                    article_id,
+                    article_published_date,
+                    topic_id,
+                    article_topic_positive_sentiment,
+                    article_topic_negative_sentiment,
+                    article_topic_neutral_sentiment,
+                    article_topic_compound_sentiment
+                )
+            SELECT v.article_id, a.article_published_date, v.topic_id, v.positive,
+                v.negative, v.neutral, v.compound
+            FROM (VALUES %s) AS v (article_id, topic_id, positive, negative, neutral, compound)
+            JOIN article AS a ON a.article_id = v.article_id
+            ON CONFLICT (article_id, topic_id, article_published_date) DO NOTHING
+            RETURNING *
+        )
+        INSERT INTO daily_topic_sentiment
+        SELECT i.article_published_date::DATE, a.news_outlet_id, i.topic_id, COUNT(*),
+            SUM(i.article_topic_positive_sentiment), SUM(i.article_topic_negative_sentiment),
+            SUM(i.article_topic_neutral_sentiment), SUM(i.article_topic_compound_sentiment),
+            SUM(i.article_topic_compound_sentiment ^ 2)
+        FROM inserted AS i
+        JOIN article AS a ON a.article_id = i.article_id
+            AND a.article_published_date = i.article_published_date
+        GROUP BY 1, 2, 3
+    ''' + DAILY_TOPIC_ROLLUP_CONFLICT
+    ARTICLE_CHUNK_INSERT_QUERY = '''
+        INSERT INTO article_chunk
+            (
+                article_id,
+                article_published_date,
+                article_chunk_index,
+                article_chunk_word_count,
+                article_chunk_polarity,
+                article_chunk_subjectivity,
+                article_chunk_positive_sentiment,
+                article_chunk_neutral_sentiment,
+                article_chunk_negative_sentiment,
+                article_chunk_compound_sentiment
+            )
+        VALUES
+            (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
+    '''
+    ARTICLE_SENTENCE_SCORE_INSERT_QUERY = '''
+        INSERT INTO article_sentence_score
+            (
+                article_id,
+                article_published_date,
+                article_sentence_offsets,
+                article_sentence_scores
+            )
+        VALUES %s;
+    '''
+
+    DAILY_OUTLET_ROLLUP_QUERY = '''
+        INSERT INTO daily_outlet_sentiment
+            (
+                day,
+                news_outlet_id,
+                article_count,
+                subjectivity_sum,
+                polarity_sum,
+                positive_sum,
+                neutral_sum,
+                negative_sum,
+                compound_sum,
+                compound_sum_squares
+            )
+        VALUES %s
+        ON CONFLICT (day, news_outlet_id) DO UPDATE SET
+            article_count = daily_outlet_sentiment.article_count + EXCLUDED.article_count,
+            subjectivity_sum = daily_outlet_sentiment.subjectivity_sum + EXCLUDED.subjectivity_sum,
+            polarity_sum = daily_outlet_sentiment.polarity_sum + EXCLUDED.polarity_sum,
+            positive_sum = daily_outlet_sentiment.positive_sum + EXCLUDED.positive_sum,
+            neutral_sum = daily_outlet_sentiment.neutral_sum + EXCLUDED.neutral_sum,
+            negative_sum = daily_outlet_sentiment.negative_sum + EXCLUDED.negative_sum,
+            compound_sum = daily_outlet_sentiment.compound_sum + EXCLUDED.compound_sum,
+            compound_sum_squares =
+                daily_outlet_sentiment.compound_sum_squares + EXCLUDED.compound_sum_squares;
+    '''
+    DAILY_TOPIC_ROLLUP_QUERY = '''
+        INSERT INTO daily_topic_sentiment
+            (
+                day,
+                news_outlet_id,
+                topic_id,
+                article_count,
+                positive_sum,
+                negative_sum,
+                neutral_sum,
+                compound_sum,
+                compound_sum_squares
+            )
+        VALUES %s
+    ''' + DAILY_TOPIC_ROLLUP_CONFLICT
 
-    def __init__(self) -> None:
-        '''Initializes the DatabaseManager by connecting to the RDS database.'''
+    def __init__(self, store_chunks: bool = False, body_store: BodyStore = None) -> None:
+        '''Initializes the DatabaseManager by connecting to the RDS database. If
+        store_chunks is set, the chunks of articles analysed in chunks are also stored. If
+        a body store is given, the bodies of the inserted articles are written to it.'''
+        self.__store_chunks = store_chunks
+        self.__body_store = body_store
         self.__connection = self._create_connection()
         self.__news_outlet_id_map = self._get_news_outlet_id_map()
         self.__topic_id_map = self._get_topic_id_map()
 
     def _create_connection(self) -> connection:
-        '''Gets a connection to the RDS database'''
-        return psycopg2.connect(
-            dbname=os.environ["DB_NAME"],
-            user=os.environ["DB_USERNAME"],
-            host=os.environ["DB_HOST"],
-            password=os.environ["DB_PASSWORD"],
-            port=os.environ["DB_PORT"],
-        )
+        '''Gets a connection to the RDS database from the process's pool, so warm
+        invocations reuse an open connection.'''
+        return db_pool.get_connection()
+
+    def _reconnect(self) -> None:
+        '''Replace a broken connection with a new one from the pool.'''
+        db_pool.release_connection(self.__connection, discard=True)
+        self.__connection = self._create_connection()
 
     def _get_news_outlet_id_map(self) -> dict[str:int]:
-        '''Retrieves a dictionary mapping news outlet names to ids.'''
-        with self.__connection.cursor() as cur:
-            cur.execute(self.NEWS_OUTLETS_QUERY)
-            news_outlet_map = cur.fetchall()
-        return dict(news_outlet_map)
+        '''Retrieves a dictionary mapping news outlet names to ids, from the process's
+        reference data cache.'''
+        return REFERENCE_DATA.get_news_outlet_ids(self.__connection)
 
     def _get_topic_id_map(self) -> dict[str:int]:
-        '''Retrieves a dictionary mapping topic names to ids.'''
-        with self.__connection.cursor() as cur:
-            cur.execute(self.TOPICS_QUERY)
-            topics_map = cur.fetchall()
-        return dict(topics_map)
+        '''Retrieves a dictionary mapping topic names to ids, from the process's
+        reference data cache.'''
+        return REFERENCE_DATA.get_topic_ids(self.__connection)
 
-    def get_article_urls(self) -> list[str]:
-        '''Retrieves the urls of the articles already in the database. These are
-        used to determine whether an article has already been analysed.'''
+    def get_existing_urls(self, urls: list[str]) -> list[str]:
+        '''Retrieves which of the given urls belong to articles already in the database.
+        These are used to skip analysing articles which have already been analysed.'''
         with self.__connection.cursor() as cur:
-            cur.execute(self.ARTICLE_URLS_QUERY)
+            cur.execute(self.EXISTING_URLS_QUERY, (list(urls),))
             existing_urls = [x[0] for x in cur.fetchall()]
         return existing_urls
 
+    def get_articles_since(self, since: datetime) -> list[tuple[int, str, str]]:
+        '''Retrieves the id, url and news outlet name of the articles published since the
+        given date.'''
+        with self.__connection.cursor() as cur:
+            cur.execute(self.ARTICLES_SINCE_QUERY, (since,))
+            return cur.fetchall()
+
+    def get_sentence_scores_since(
+            self, since: datetime) -> list[tuple[int, str, str, SentenceScores]]:
+        '''Retrieves the id, url, news outlet name and sentence scores of the articles
+        published since the given date whose sentence scores are stored.'''
+        with self.__connection.cursor() as cur:
+            cur.execute(self.SENTENCE_SCORES_SINCE_QUERY, (since,))
+            return [(article_id, url, news_outlet,
+                     SentenceScores.from_bytes(bytes(offsets), bytes(scores)))
+                    for article_id, url, news_outlet, offsets, scores in cur.fetchall()]
+
+    def get_unassigned_topics(self) -> list[str]:
+        '''Retrieves the names of the topics not assigned to any article, e.g. topics
+        which have just been added.'''
+        with self.__connection.cursor() as cur:
+            cur.execute(self.UNASSIGNED_TOPICS_QUERY)
+            return [x[0] for x in cur.fetchall()]
+
+    def insert_topic_analyses(self, topic_analyses: list[tuple[int, TopicAnalysis]]) -> None:
+        '''Bulk insert topic analyses of already stored articles, given as (article id,
+        topic analysis) pairs. Topics already assigned to an article are skipped. The
+        published date the rows are partitioned by is taken from the stored article, and
+        the inserted rows are added to the daily topic rollup in the same statement.'''
+        insert_values = [
+            (article_id, self.__topic_id_map[topic_analysis.get_topic_name()],
+             *topic_analysis.get_sentiments())
+            for article_id, topic_analysis in topic_analyses
+        ]
+        with self.__connection.cursor() as cur:
+            psycopg2.extras.execute_values(
+                cur, self.ARTICLE_TOPIC_BULK_INSERT_QUERY, insert_values)
+        self.__connection.commit()
+
     def get_valid_topics(self) -> list[str]:
         '''Extract a list of valid topics from the topic_id_map.'''
         return list(self.__topic_id_map.keys())
 
-    def _insert_articles(self, articles: list[Article]) -> None:
-        '''Insert articles into article table in the database. This method assigns
-        the primary keys auto generated by the databased upon insertion to the articles.'''
+    def _copy_rows(self, cur, query: str, rows: list[tuple]) -> None:
+        '''Load rows with COPY, from an in-memory CSV buffer.'''
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cur.copy_expert(query, buffer)
+
+    def _create_partitions(self, articles: list[Article]) -> None:
+        '''Create the monthly partitions the articles are stored in, if missing.'''
+        months = sorted({article.get_published_date().date().replace(day=1)
+                         for article in articles})
         with self.__connection.cursor() as cur:
-            for article in articles:
-                cur.execute(
-                    query=self.ARTICLE_INSERT_QUERY,
-                    vars=article.get_insert_values(self.__news_outlet_id_map)
-                )
-                article.set_id(cur.fetchone()[0])
-        self.__connection.commit()
+            for month in months:
+                cur.execute(self.PARTITIONS_QUERY, (month,))
+
+    def _insert_articles(self, articles: list[Article]) -> list[Article]:
+        '''Insert articles into article table in the database, in a single multi-row
+        INSERT (or through a COPY into a staging table for large batches). Articles whose
+        url is already stored (e.g. by a concurrent or retried run), under any published
+        date, are skipped, as are repeats of a url within the batch. This method assigns
+        the primary keys generated by the database upon insertion to the articles,
+        matching the returned rows to the articles by URL, and returns the articles which
+        were inserted.'''
+        first_articles = {}
+        for article in articles:
+            first_articles.setdefault(article.get_url(), article)
+        insert_values = [article.get_insert_values(self.__news_outlet_id_map)
+                         for article in first_articles.values()]
+        with self.__connection.cursor() as cur:
+            if len(articles) >= self.COPY_THRESHOLD:
+                cur.execute(self.ARTICLE_STAGING_QUERY)
+                self._copy_rows(cur, self.ARTICLE_STAGING_COPY_QUERY, insert_values)
+                cur.execute(self.ARTICLE_STAGING_INSERT_QUERY)
+                returned_rows = cur.fetchall()
+            else:
+                returned_rows = psycopg2.extras.execute_values(
+                    cur, self.ARTICLE_INSERT_QUERY, insert_values,
+                    page_size=max(len(insert_values), 1), fetch=True)
+        article_ids = {url: article_id for article_id, url in returned_rows}
+        inserted_articles = []
+        for article in articles:
+            # only the first article of a url repeated in the batch was inserted
+            is_first = first_articles[article.get_url()] is article
+            article.set_id(article_ids.get(article.get_url()) if is_first else None)
+            if article.get_id() is not None:
+                inserted_articles.append(article)
+        return inserted_articles
 
     def _insert_article_topic(self, articles: list[Article]):
-        '''Insert articles topics into article_topic table in the database.'''
+        '''Insert articles topics into article_topic table in the database, with COPY.'''
         insert_values = []
         for article in articles:
             insert_values.extend(
                 article.get_topic_analyses_insert_values(self.__topic_id_map))
         with self.__connection.cursor() as cur:
-            cur.executemany(self.ARTICLE_TOPIC_INSERT_QUERY,
-                            insert_values)
-        self.__connection.commit()
+            self._copy_rows(cur, self.ARTICLE_TOPIC_COPY_QUERY, insert_values)
+
+    def _insert_article_chunks(self, articles: list[Article]) -> None:
+        '''Insert the chunks of articles analysed in chunks into the article_chunk table.'''
+        insert_values = []
+        for article in articles:
+            insert_values.extend(article.get_chunk_insert_values())
+        if not insert_values:
+            return
+        with self.__connection.cursor() as cur:
+            cur.executemany(self.ARTICLE_CHUNK_INSERT_QUERY, insert_values)
+
+    def _insert_sentence_scores(self, articles: list[Article]) -> None:
+        '''Insert the sentence scores of the articles which have them into the
+        article_sentence_score table.'''
+        insert_values = [article.get_sentence_score_insert_values() for article in articles
+                         if article.get_sentence_scores() is not None]
+        if not insert_values:
+            return
+        with self.__connection.cursor() as cur:
+            psycopg2.extras.execute_values(
+                cur, self.ARTICLE_SENTENCE_SCORE_INSERT_QUERY, insert_values)
+
+    @staticmethod
+    def _add_to_rollup(rollup: dict, key: tuple, values: tuple) -> None:
+        '''Add one article's values to the count and sums of a rollup row.'''
+        count, sums = rollup.get(key, (0, (0.0,) * len(values)))
+        rollup[key] = (count + 1, tuple(total + value for total, value in zip(sums, values)))
+
+    def _update_rollups(self, articles: list[Article]) -> None:
+        '''Add the inserted articles and their topics to the daily outlet and topic
+        rollups, one upsert per rollup.'''
+        outlet_rollup, topic_rollup = {}, {}
+        for article in articles:
+            # subjectivity, polarity, then the positive, neutral, negative and compound scores
+            article_values = article.get_insert_values(self.__news_outlet_id_map)
+            news_outlet_id, day, scores = (
+                article_values[0], article_values[3].date(), article_values[4:])
+            self._add_to_rollup(outlet_rollup, (day, news_outlet_id),
+                                (*scores, scores[-1] ** 2))
+            # the positive, negative, neutral and compound scores
+            for topic_values in article.get_topic_analyses_insert_values(self.__topic_id_map):
+                topic_id, topic_scores = topic_values[2], topic_values[3:]
+                self._add_to_rollup(topic_rollup, (day, news_outlet_id, topic_id),
+                                    (*topic_scores, topic_scores[-1] ** 2))
+        with self.__connection.cursor() as cur:
+            for query, rollup in ((self.DAILY_OUTLET_ROLLUP_QUERY, outlet_rollup),
+                                  (self.DAILY_TOPIC_ROLLUP_QUERY, topic_rollup)):
+                if rollup:
+                    psycopg2.extras.execute_values(
+                        cur, query, [(*key, count, *sums) for key, (count, sums) in rollup.items()],
+                        page_size=len(rollup))
+
+    def insert_into_database(self, articles: list[Article]) -> int:
+        '''Inserts articles and topic analysis data into the database, in a single
+        transaction, so either the whole batch is stored or (on an error) none of it.
+        Only the topics, chunks and sentence scores of the articles actually inserted are
+        stored, and only they are added to the daily rollups. The batch is retried on a
+        new connection after a transient error. Returns the number of articles
+        inserted.'''
+        inserted_articles = db_pool.retry(
+            self._insert_batch, articles, on_retry=self._reconnect)
+        return len(inserted_articles)
+
+    def _write_bodies(self, articles: list[Article]) -> None:
+        '''Write the bodies of the inserted articles to the body store, if there is one.'''
+        if self.__body_store is not None and articles:
+            self.__body_store.write([
+                (article.get_id(), article.get_url(), article.get_published_date(),
+                 article.get_body())
+                for article in articles])
 
-    def insert_into_database(self, articles: list[Article]) -> None:
-        '''Inserts articles and topic analysis data into the database.'''
-        self._insert_articles(articles)
-        self._insert_article_topic(articles)
+    def _insert_batch(self, articles: list[Article]) -> list[Article]:
+        '''Insert the batch in a single transaction. The bodies are written to the body
+        store before it commits, so a failed write rolls the batch back and its urls are
+        scraped again by the next run, rather than being stored without their bodies. A
+        segment written for a batch which then fails to commit is superseded by the
+        segment written when its urls are loaded again, as the body store reads the
+        latest copy of a body.'''
+        with self.__connection:
+            self._create_partitions(articles)
+            inserted_articles = self._insert_articles(articles)
+            self._insert_article_topic(inserted_articles)
+            self._update_rollups(inserted_articles)
+            if self.__store_chunks:
+                self._insert_article_chunks(inserted_articles)
+            self._insert_sentence_scores(inserted_articles)
+            self._write_bodies(inserted_articles)
+        return inserted_articles
 
     def close_connection(self) -> None:
-        '''Closes the database connection.'''
-        self.__connection.close()
+        '''Gives the database connection back to the pool.'''
+        db_pool.release_connection(self.__connection)
@@ -4,6 +4,8 @@
 
 from datetime import datetime
 
+from sentence_store import SentenceScores
+
 
 class TopicAnalysis:
     '''Class representing an article's topic and corresponding analysis for the topic.'''
@@ -41,6 +43,32 @@ class TopicAnalysis:
         )
 
 
+class ArticleChunk:
+    # pylint: disable=too-few-public-methods
+    '''Class representing a chunk of a long article (e.g. a live blog entry), analysed
+    separately from the rest of the article.'''
+
+    SCORE_KEYS = ('polarity', 'subjectivity', 'pos', 'neu', 'neg', 'compound')
+
+    def __init__(self, chunk_index: int, word_count: int, scores: dict):
+        '''Instantiate the chunk from its position in the article, its length and its
+        body scores.'''
+        self.__chunk_index = chunk_index
+        self.__word_count = word_count
+        self.__scores = scores
+
+    def get_insert_values(self, article_id: int, published_date: datetime) -> tuple:
+        '''Get the chunk values required for inserting into the database. The article's
+        published date is part of its key, as the chunks are partitioned by it.'''
+        return (
+            article_id,
+            published_date,
+            self.__chunk_index,
+            self.__word_count,
+            *(self.__scores[key] for key in self.SCORE_KEYS),
+        )
+
+
 class Article:
     '''Class representing an article.'''
 
@@ -60,11 +88,41 @@ class Article:
         self.__negative_sentiment = None
         self.__compound_sentiment = None
         self.__article_id = None
+        self.__chunks = []
+        self.__sentence_scores = None
 
     def get_body(self):
         '''Getter for the article text body.'''
         return self.__body
 
+    def get_headline(self) -> str:
+        '''Getter for the article headline.'''
+        return self.__headline
+
+    def get_url(self) -> str:
+        '''Getter for the article url.'''
+        return self.__url
+
+    def get_published_date(self) -> datetime:
+        '''Getter for the article published date.'''
+        return self.__published_date
+
+    def set_chunks(self, chunks: list[ArticleChunk]) -> None:
+        '''Set the chunks the article was analysed in, if it was split.'''
+        self.__chunks = chunks
+
+    def get_chunks(self) -> list[ArticleChunk]:
+        '''Getter for the chunks the article was analysed in.'''
+        return self.__chunks
+
+    def set_sentence_scores(self, sentence_scores: SentenceScores) -> None:
+        '''Set the scores of each sentence of the article, if they are stored.'''
+        self.__sentence_scores = sentence_scores
+
+    def get_sentence_scores(self) -> SentenceScores:
+        '''Getter for the scores of each sentence, or None if they were not scored.'''
+        return self.__sentence_scores
+
     def set_topics_analyses(self, topics_analyses: list[TopicAnalysis]):
         '''Set the list of topics analyses objects related to the article.'''
         self.__topic_analyses = topics_analyses
@@ -92,6 +150,10 @@ class Article:
         '''Set the article's database primary id.'''
         self.__article_id = database_id
 
+    def get_id(self) -> int:
+        '''Getter for the article's database primary id, or None if it was not inserted.'''
+        return self.__article_id
+
     def get_insert_values(self, news_outlet_id_map: dict) -> tuple:
         '''Get the article values required for inserting into database.'''
         return [
@@ -113,7 +175,17 @@ class Article:
         for topic_analysis in self.__topic_analyses:
             insert_values.append((
                 self.__article_id,
+                self.__published_date,
                 topic_id_map[topic_analysis.get_topic_name()],
                 *topic_analysis.get_sentiments(),
             ))
         return insert_values
+
+    def get_chunk_insert_values(self) -> list[tuple]:
+        '''Get the chunk values required for inserting into the database.'''
+        return [chunk.get_insert_values(self.__article_id, self.__published_date)
+                for chunk in self.__chunks]
+
+    def get_sentence_score_insert_values(self) -> tuple:
+        '''Get the sentence score values required for inserting into the database.'''
+        return (self.__article_id, self.__published_date, *self.__sentence_scores.to_bytes())
@@ -0,0 +1,55 @@
+'''
+    Script for loading the NLTK data used in the analysis (the VADER lexicon and the punkt
+    sentence tokenizer) from the deployment artifact, without going to the network. Run it
+    to compile the VADER lexicon into a pickled dictionary, which loads faster than parsing
+    the lexicon text file:
+
+        python nltk_resources.py
+'''
+
+import os
+import pickle
+from functools import lru_cache
+
+import nltk
+from nltk.sentiment import SentimentIntensityAnalyzer
+from nltk.sentiment.vader import VaderConstants
+
+PIPELINE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+NLTK_DATA_PATH = os.environ.get(
+    'NLTK_DATA', os.path.join(PIPELINE_DIRECTORY, 'nltk_data'))
+COMPILED_LEXICON_PATH = os.path.join(PIPELINE_DIRECTORY, 'vader_lexicon.pickle')
+REQUIRED_PACKAGES = ('punkt_tab', 'vader_lexicon')
+
+if NLTK_DATA_PATH not in nltk.data.path:
+    nltk.data.path.insert(0, NLTK_DATA_PATH)
+
+
+class CompiledSentimentIntensityAnalyzer(SentimentIntensityAnalyzer):
+    # pylint: disable=super-init-not-called
+    '''VADER analyser built from an already parsed lexicon dictionary.'''
+
+    def __init__(self, lexicon: dict[str, float]):
+        self.lexicon = lexicon
+        self.constants = VaderConstants()
+
+
+def compile_lexicon(path: str = COMPILED_LEXICON_PATH) -> None:
+    '''Parse the VADER lexicon from the NLTK data and pickle the dictionary.'''
+    with open(path, 'wb') as file:
+        pickle.dump(SentimentIntensityAnalyzer().lexicon, file,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+
+
+@lru_cache(maxsize=None)
+def load_vader(path: str = COMPILED_LEXICON_PATH) -> SentimentIntensityAnalyzer:
+    '''Load the VADER analyser, from the compiled lexicon if there is one. The analyser is
+    only loaded the first time it is needed, then shared.'''
+    if os.path.exists(path):
+        with open(path, 'rb') as file:
+            return CompiledSentimentIntensityAnalyzer(pickle.load(file))
+    return SentimentIntensityAnalyzer()
+
+
+if __name__ == "__main__":
+    compile_lexicon()
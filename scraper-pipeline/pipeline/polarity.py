@@ -0,0 +1,171 @@
+'''
+    Script defining the PolarityAnalyser, a fast equivalent of TextBlob's PatternAnalyzer
+    which gives identical polarity and subjectivity scores.
+'''
+
+from array import array
+from functools import lru_cache
+
+from textblob import TextBlob
+from textblob.en import sentiment as pattern_sentiment
+from textblob._text import EMOTICONS, EOS, PUNCTUATION, RE_EMOTICONS, RE_SARCASM
+
+MODIFIER_TAGS = tuple(pattern_sentiment.modifiers)
+NEGATIONS = frozenset(pattern_sentiment.negations)
+# TextBlob's tokeniser ends a sentence at a run of these tokens, and continues the run over
+# any of the continuation tokens which follow (e.g. closing quotes and brackets).
+SENTENCE_TERMINATORS = frozenset(("...", ".", "!", "?"))
+SENTENCE_CONTINUATIONS = frozenset(("'", '"', "”", "’", "...", ".", "!", "?", ")"))
+
+
+@lru_cache(maxsize=100_000)
+def tokenise_word(word: str) -> tuple[str]:
+    '''Split a whitespace-separated word into tokens as TextBlob does (e.g. splitting off
+    punctuation). The result is cached, as most words recur across sentences.'''
+    return tuple(" ".join(pattern_sentiment.tokenizer(word)).split())
+
+
+@lru_cache(maxsize=100_000)
+def tokenise_sentence(sentence: str) -> tuple[str]:
+    '''Split a sentence (or any text) into lowercase tokens as TextBlob does. TextBlob
+    splits each word independently, then joins tokens forming emoticons or the sarcasm mark
+    "(!)"; if the tokens could form either, the sentence is tokenised by TextBlob as a whole.
+    The result is cached, so recurring sentences are only tokenised once.'''
+    if EOS not in sentence:
+        tokens = [token for word in sentence.split() for token in tokenise_word(word)]
+        joined = " ".join(tokens)
+        if RE_SARCASM.search(joined) is None and RE_EMOTICONS.search(joined) is None:
+            return tuple(token.lower() for token in tokens)
+    return tuple(token.lower()
+                 for token in " ".join(pattern_sentiment.tokenizer(sentence)).split())
+
+
+class PolarityAnalyser:
+    '''Class scoring polarity and subjectivity as TextBlob's PatternAnalyzer does, using
+    the same pattern lexicon. The lexicon is flattened once into arrays indexed by word,
+    and the text is tokenised one (cached) sentence at a time, reusing the sentence split
+    of the topic analysis, instead of re-tokenising the whole text for each call.'''
+
+    def __init__(self):
+        '''Load the pattern lexicon (the scores averaged over all parts of speech, as
+        TextBlob uses for plain text) into arrays.'''
+        self.__word_ids = {}
+        self.__polarity = array('d')
+        self.__subjectivity = array('d')
+        self.__intensity = array('d')
+        self.__is_modifier = bytearray()
+        for word, senses in pattern_sentiment.items():
+            polarity, subjectivity, intensity = senses[None]
+            self.__word_ids[word] = len(self.__word_ids)
+            self.__polarity.append(polarity)
+            self.__subjectivity.append(subjectivity)
+            self.__intensity.append(intensity)
+            self.__is_modifier.append(any(tag in senses for tag in MODIFIER_TAGS))
+        self.__emoticon_polarity = {}
+        for (_, polarity), emoticons in EMOTICONS.items():
+            for emoticon in emoticons:
+                self.__emoticon_polarity.setdefault(emoticon.lower(), polarity)
+
+    def _assess_unknown(self, token: str, assessments: list[list], modifier: str,
+                        negation: str) -> tuple[str, str]:
+        '''Handle a token which is not in the lexicon, returning the updated preceding
+        modifier and negation.'''
+        if token in NEGATIONS:
+            negation = token
+        elif negation and len(token.strip("'")) > 1:
+            negation = None
+        if negation is not None and modifier is not None and pattern_sentiment.modifier(modifier):
+            # a negation preceded by a modifier ("really not good")
+            assessments[-1][3] = True
+            negation = None
+        elif modifier and len(token) > 2:
+            modifier = None
+        if token == "!" and assessments:
+            assessments[-1][0] = max(-1.0, min(assessments[-1][0] * 1.25, 1.0))
+        if token == "(!)":
+            assessments.append([0.0, 1.0, 1.0, False])
+        if not token.isalpha() and len(token) <= 5 and token not in PUNCTUATION:
+            polarity = self.__emoticon_polarity.get(token)
+            if polarity is not None:
+                assessments.append([polarity, 1.0, 1.0, False])
+        return modifier, negation
+
+    def _assess(self, tokens: list[str]) -> list[list]:
+        '''Assess the tokens, returning [polarity, subjectivity, intensity, negated] for each
+        known word (together with any preceding modifier or negation), emoticon and
+        sarcasm mark.'''
+        assessments = []
+        modifier, negation = None, None
+        for token in tokens:
+            word_id = self.__word_ids.get(token)
+            if word_id is None:
+                modifier, negation = self._assess_unknown(
+                    token, assessments, modifier, negation)
+                continue
+            polarity = self.__polarity[word_id]
+            subjectivity = self.__subjectivity[word_id]
+            intensity = self.__intensity[word_id]
+            if modifier is None:
+                assessments.append([polarity, subjectivity, intensity, False])
+            else:
+                # a known word preceded by a modifier ("really good")
+                previous = assessments[-1]
+                previous[0] = max(-1.0, min(polarity * previous[2], 1.0))
+                previous[1] = max(-1.0, min(subjectivity * previous[2], 1.0))
+                previous[2] = intensity
+            if negation is not None:
+                # a known word preceded by a negation ("not good")
+                assessments[-1][2] = 1.0 / assessments[-1][2]
+                assessments[-1][3] = True
+            modifier = token if self.__is_modifier[word_id] else None
+            negation = token if token in NEGATIONS else None
+        return assessments
+
+    def score_tokens(self, tokens: list[str]) -> tuple[float, float]:
+        '''Get the polarity and subjectivity of TextBlob's tokens of a text.'''
+        assessments = self._assess(tokens)
+        count = float(len(assessments) or 1)
+        # "not good" is slightly bad, "not bad" is slightly good
+        polarity = sum(p * -0.5 if negated else p for p, _, _, negated in assessments)
+        subjectivity = sum(s for _, s, _, _ in assessments)
+        return polarity / count, subjectivity / count
+
+    def _segment(self, text: str, sentences: list[str]) -> list[str]:
+        '''Group the sentences into segments of the text which TextBlob tokenises the same
+        way alone as within the whole text. TextBlob tokenises sentence by sentence, and a
+        few of its rules (e.g. "( ! )" becoming the sarcasm token "(!)") apply within its
+        own sentences, so a sentence is only tokenised alone if TextBlob would also end a
+        sentence at its boundaries. Returns None if the sentences are not found in order
+        in the text, separated by whitespace: sentences which touch (e.g. "!..." and ":P"
+        split from "!...:P") may form tokens across their boundary, such as emoticons.'''
+        segments = []
+        start, end, previous_tokens = None, 0, ()
+        for sentence in sentences:
+            index = text.find(sentence, end)
+            if index == -1 or text[end:index].strip() or (start is not None and index == end):
+                return None
+            tokens = tokenise_sentence(sentence)
+            if start is None:
+                start = index
+            elif (previous_tokens and tokens and previous_tokens[-1] in SENTENCE_TERMINATORS
+                  and tokens[0] not in SENTENCE_CONTINUATIONS):
+                segments.append(text[start:end])
+                start = index
+            end = index + len(sentence)
+            previous_tokens = tokens
+        if text[end:].strip():
+            return None
+        if start is not None:
+            segments.append(text[start:end])
+        return segments
+
+    def score_text(self, text: str, sentences: list[str]) -> tuple[float, float]:
+        '''Get the polarity and subjectivity of a text from its sentences, which must be
+        found in order in the text (as returned by nltk.sent_tokenize), separated by
+        whitespace. If they are not, TextBlob scores the text directly instead.'''
+        segments = self._segment(text, sentences)
+        if segments is None:
+            sentiment = TextBlob(text).sentiment
+            return sentiment.polarity, sentiment.subjectivity
+        return self.score_tokens([token for segment in segments
+                                  for token in tokenise_sentence(segment)])
@@ -0,0 +1,191 @@
+'''
+    Script for assigning topics added to the topic table to the articles already stored,
+    without asking OpenAI. The bodies of past articles are searched for the new topics' key
+    terms with the keyword classifier, and only the matching articles are analysed and given
+    new article_topic rows. The new topics need key terms in topic_terms.csv. With
+    --sentence-scores, articles whose sentence scores and body are stored are scored from
+    them, without running VADER again.
+
+        python reassign.py --since 2025-01-01
+        python reassign.py --topics Housing "Climate Crisis" --since 2025-01-01
+        python reassign.py --since 2025-01-01 --sentence-scores
+'''
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from body_store import BodyStore
+from extract import GuardianRSSFeedExtractor, ExpressRSSFeedExtractor
+from keyword_classifier import KeywordTopicClassifier
+from load import DatabaseManager
+from models import TopicAnalysis
+from sentence_store import SentenceScores, SentenceScoreTable
+from sentiment import SentimentAnalyser
+
+
+class RefetchBodySource:
+    # pylint: disable=too-few-public-methods
+    '''Source of stored articles' bodies, read from the body store if it holds them, and
+    otherwise re-fetched from their URLs as the pipeline extracts them (article bodies are
+    not stored in the database).'''
+
+    def __init__(self, body_store: BodyStore = None):
+        self.__body_store = body_store
+        extractors = [GuardianRSSFeedExtractor([]), ExpressRSSFeedExtractor([])]
+        self.__extractors = {
+            "The Guardian": extractors[0],
+            "Daily Express": extractors[1],
+        }
+
+    def get_stored_body(self, url: str) -> str:
+        '''Get the body of an article from the body store, or None if it is not there.'''
+        if self.__body_store is None:
+            return None
+        return self.__body_store.get_body(url)
+
+    def get_body(self, url: str, news_outlet: str) -> str:
+        '''Get the body of an article, or None if it cannot be retrieved.'''
+        body = self.get_stored_body(url)
+        if body is not None:
+            return body
+        extractor = self.__extractors.get(news_outlet)
+        if extractor is None:
+            return None
+        return extractor.fetch_body(url)
+
+
+class TopicReassigner:
+    # pylint: disable=too-few-public-methods
+    '''Class assigning new topics to stored articles, using the keyword classifier to find
+    the articles which match them.'''
+
+    def __init__(self, db_manager: DatabaseManager, classifier: KeywordTopicClassifier,
+                 body_source: RefetchBodySource, fetch_workers: int = 8,
+                 batch_size: int = 500, sentence_scores: bool = False):
+        '''Instantiate the reassigner. Bodies are fetched by fetch_workers threads, and
+        the new article_topic rows are inserted in batches of batch_size. If
+        sentence_scores is set, the topics of articles whose sentence scores are stored,
+        and whose body is in the body store (the offsets only fit the body they were
+        scored from), are rebuilt from the sentence scores rather than scored by VADER.'''
+        # pylint: disable=too-many-arguments, too-many-positional-arguments
+        self.__db_manager = db_manager
+        self.__classifier = classifier
+        self.__body_source = body_source
+        self.__fetch_workers = fetch_workers
+        self.__batch_size = batch_size
+        self.__sentence_scores = sentence_scores
+        self.__sentiment_analyser = SentimentAnalyser(sentence_scoring=True)
+
+    @staticmethod
+    def _rebuild_topic_scores(body: str, sentence_scores: SentenceScores,
+                              key_terms_list: list[list[str]]) -> list[dict]:
+        '''Rebuild the scores of each topic's key terms from the stored sentence scores.'''
+        table = SentenceScoreTable([body], [sentence_scores])
+        return [{key: float(values[0]) for key, values in table.score_topic(key_terms).items()}
+                for key_terms in key_terms_list]
+
+    def _analyse(self, body: str, topics: list[str],
+                 sentence_scores: SentenceScores = None) -> list[TopicAnalysis]:
+        '''Classify the body against the given topics only, and score the sentiment of
+        each matching topic, from the sentence scores if they are given.'''
+        topic_data = self.__classifier.classify(body, topics).get_topic_data()
+        topic_analyses = [TopicAnalysis(topic['topic_name'], topic['key_terms'])
+                          for topic in topic_data]
+        key_terms_list = [topic_analysis.get_key_terms() for topic_analysis in topic_analyses]
+        if sentence_scores is not None:
+            topic_scores = self._rebuild_topic_scores(body, sentence_scores, key_terms_list)
+        else:
+            topic_scores = self.__sentiment_analyser.score_topics(body, key_terms_list)
+        for topic_analysis, scores in zip(topic_analyses, topic_scores):
+            topic_analysis.set_sentiments(
+                positive=scores['pos'],
+                neutral=scores['neu'],
+                negative=scores['neg'],
+                compound=scores['compound'],
+            )
+        return topic_analyses
+
+    def _get_body(self, article: tuple[int, str, str],
+                  stored_scores: dict[int, SentenceScores]) -> tuple[str, SentenceScores]:
+        '''Get the body of an article, with its sentence scores if they are stored and the
+        body is read from the body store.'''
+        article_id, url, news_outlet = article
+        if article_id in stored_scores:
+            body = self.__body_source.get_stored_body(url)
+            if body is not None:
+                return body, stored_scores[article_id]
+        return self.__body_source.get_body(url, news_outlet), None
+
+    def run(self, topics: list[str], since: datetime) -> dict:
+        '''Assign the topics to the articles published since the given date which match
+        them, returning a summary of the run.'''
+        summary = {'topics': topics, 'articles': 0, 'fetched': 0, 'matched': 0, 'rows': 0,
+                   'sentence_scored': 0}
+        if not topics:
+            return summary
+        articles = self.__db_manager.get_articles_since(since)
+        summary['articles'] = len(articles)
+        stored_scores = {}
+        if self.__sentence_scores:
+            stored_scores = {article_id: sentence_scores for article_id, _, _, sentence_scores
+                             in self.__db_manager.get_sentence_scores_since(since)}
+        pending = []
+        with ThreadPoolExecutor(max_workers=self.__fetch_workers) as executor:
+            bodies = executor.map(lambda article: self._get_body(article, stored_scores),
+                                  articles)
+            for (article_id, _, _), (body, sentence_scores) in zip(articles, bodies):
+                if body is None:
+                    continue
+                summary['fetched'] += 1
+                summary['sentence_scored'] += sentence_scores is not None
+                topic_analyses = self._analyse(body, topics, sentence_scores)
+                if topic_analyses:
+                    summary['matched'] += 1
+                    pending.extend((article_id, topic_analysis)
+                                   for topic_analysis in topic_analyses)
+                if len(pending) >= self.__batch_size:
+                    self.__db_manager.insert_topic_analyses(pending)
+                    summary['rows'] += len(pending)
+                    pending = []
+        if pending:
+            self.__db_manager.insert_topic_analyses(pending)
+            summary['rows'] += len(pending)
+        return summary
+
+
+def main() -> None:
+    '''Parse the command line arguments and assign the new topics.'''
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--topics', nargs='*',
+                        help='Topics to assign (default: topics not assigned to any article).')
+    parser.add_argument('--since', type=datetime.fromisoformat, required=True,
+                        help='Only consider articles published since this date.')
+    parser.add_argument('--fetch-workers', type=int, default=8)
+    parser.add_argument('--sentence-scores', action='store_true',
+                        help='Rebuild topic scores from stored sentence scores where possible.')
+    args = parser.parse_args()
+
+    load_dotenv()
+    db_manager = DatabaseManager()
+    classifier = KeywordTopicClassifier.from_csv()
+    topics = args.topics if args.topics else db_manager.get_unassigned_topics()
+    known_topics = set(classifier.get_topic_names())
+    for topic in topics:
+        if topic not in known_topics:
+            print(f"No key terms for {topic} in topic_terms.csv; it will not be assigned.")
+    try:
+        reassigner = TopicReassigner(db_manager, classifier,
+                                     RefetchBodySource(BodyStore.from_env()),
+                                     fetch_workers=args.fetch_workers,
+                                     sentence_scores=args.sentence_scores)
+        print(reassigner.run([topic for topic in topics if topic in known_topics], args.since))
+    finally:
+        db_manager.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+'''
+    Script defining the TopicRouter, which decides how the topics of each article are
+    extracted: locally by the keyword classifier, or by OpenAI's GPT on either the headline
+    and lead paragraph or the full body.
+'''
+
+
+class Route:
+    # pylint: disable=too-few-public-methods
+    '''The possible ways of extracting an article's topics.'''
+
+    LOCAL = 'local'
+    LLM_LEAD = 'llm_lead'
+    LLM_FULL = 'llm_full'
+
+
+class TopicRouter:
+    '''Class choosing the route for each article from its length, the local classifier's
+    confidence and the remaining budget, and recording the decisions made during a run.'''
+
+    # gpt-4o-mini pricing, in USD per token.
+    INPUT_TOKEN_COST = 0.15 / 1_000_000
+    OUTPUT_TOKEN_COST = 0.60 / 1_000_000
+    CHARS_PER_TOKEN = 4
+    PROMPT_OVERHEAD_TOKENS = 400
+    OUTPUT_TOKENS = 150
+    # Estimated latency of an OpenAI call, used for the latency saved by not calling it.
+    LLM_BASE_SECONDS = 1.0
+    LLM_SECONDS_PER_1K_INPUT_TOKENS = 0.2
+
+    def __init__(self, budget: float = None, high_confidence: float = 0.5,
+                 low_confidence: float = 0.2, long_article_words: int = 1200,
+                 lead_words: int = 150):
+        '''Instantiate the router. The budget is in USD for the run (None for unlimited).
+        Articles with confidence at or above high_confidence are handled locally, those
+        between the two thresholds or longer than long_article_words are sent to the LLM
+        with only their lead, and the rest are sent in full.'''
+        # pylint: disable=too-many-arguments, too-many-positional-arguments
+        self.__budget = budget
+        self.__high_confidence = high_confidence
+        self.__low_confidence = low_confidence
+        self.__long_article_words = long_article_words
+        self.__lead_words = lead_words
+        self.__spent = 0.0
+        self.__decisions = []
+
+    def estimate_cost(self, text: str) -> float:
+        '''Estimate the cost in USD of asking the LLM about the given text.'''
+        input_tokens = len(text) / self.CHARS_PER_TOKEN + self.PROMPT_OVERHEAD_TOKENS
+        return (input_tokens * self.INPUT_TOKEN_COST +
+                self.OUTPUT_TOKENS * self.OUTPUT_TOKEN_COST)
+
+    def estimate_latency(self, text: str) -> float:
+        '''Estimate the latency in seconds of asking the LLM about the given text.'''
+        input_tokens = len(text) / self.CHARS_PER_TOKEN + self.PROMPT_OVERHEAD_TOKENS
+        return self.LLM_BASE_SECONDS + input_tokens / 1000 * self.LLM_SECONDS_PER_1K_INPUT_TOKENS
+
+    def get_remaining_budget(self) -> float:
+        '''Getter for the remaining budget of the run, or None if it is unlimited.'''
+        if self.__budget is None:
+            return None
+        return self.__budget - self.__spent
+
+    def get_lead(self, headline: str, body: str) -> str:
+        '''Return the headline and the lead paragraph (first words) of an article.'''
+        lead = ' '.join(body.split()[:self.__lead_words])
+        return f"{headline}\n{lead}" if headline else lead
+
+    def _is_affordable(self, text: str) -> bool:
+        '''Check whether asking the LLM about the text fits in the remaining budget.'''
+        remaining = self.get_remaining_budget()
+        return remaining is None or self.estimate_cost(text) <= remaining
+
+    def choose(self, headline: str, body: str, confidence: float) -> str:
+        '''Choose the route for an article.'''
+        if confidence >= self.__high_confidence:
+            return Route.LOCAL
+        is_long = len(body.split()) > self.__long_article_words
+        if (confidence < self.__low_confidence and not is_long
+                and self._is_affordable(body)):
+            return Route.LLM_FULL
+        if self._is_affordable(self.get_lead(headline, body)):
+            return Route.LLM_LEAD
+        return Route.LOCAL
+
+    def record(self, route: str, headline: str, body: str, seconds: float) -> None:
+        '''Record the route taken for an article, and the cost and latency saved compared
+        with sending the full body to the LLM.'''
+        full_cost = self.estimate_cost(body)
+        full_latency = self.estimate_latency(body)
+        if route == Route.LLM_FULL:
+            cost = full_cost
+        elif route == Route.LLM_LEAD:
+            cost = self.estimate_cost(self.get_lead(headline, body))
+        else:
+            cost = 0.0
+        self.__spent += cost
+        self.__decisions.append({
+            'route': route,
+            'cost': cost,
+            'cost_saved': full_cost - cost,
+            'seconds': seconds,
+            'seconds_saved': max(full_latency - seconds, 0.0) if route != Route.LLM_FULL else 0.0,
+        })
+
+    def get_decisions(self) -> list[dict]:
+        '''Getter for the decisions recorded during the run.'''
+        return self.__decisions
+
+    def get_summary(self) -> dict:
+        '''Summarise the decisions recorded during the run.'''
+        return {
+            'articles': len(self.__decisions),
+            'routes': {route: sum(d['route'] == route for d in self.__decisions)
+                       for route in (Route.LOCAL, Route.LLM_LEAD, Route.LLM_FULL)},
+            'cost': sum(d['cost'] for d in self.__decisions),
+            'cost_saved': sum(d['cost_saved'] for d in self.__decisions),
+            'seconds': sum(d['seconds'] for d in self.__decisions),
+            'seconds_saved': sum(d['seconds_saved'] for d in self.__decisions),
+        }
@@ -3,11 +3,16 @@
     data pipeline. 
 '''
 
+import os
 import traceback
 from extract import GuardianRSSFeedExtractor, ExpressRSSFeedExtractor
 from transform import ArticleFactory
 from analysis import TextAnalyser
+from keyword_classifier import KeywordTopicClassifier
+from routing import TopicRouter
+from chunking import BodyChunker
 from load import DatabaseManager
+from body_store import BodyStore
 
 
 class NewsScraper:
@@ -24,11 +29,25 @@ class NewsScraper:
             GuardianRSSFeedExtractor(guardian_rss_feed_urls),
             ExpressRSSFeedExtractor(express_rss_feed_urls),
         ]
-        self.__db_manager = DatabaseManager()
+        self.__db_manager = DatabaseManager(
+            store_chunks=os.environ.get('STORE_ARTICLE_CHUNKS', '').lower() == 'true',
+            body_store=BodyStore.from_env())
         self.__text_analyser = TextAnalyser(
-            valid_topics=self.__db_manager.get_valid_topics()
+            valid_topics=self.__db_manager.get_valid_topics(),
+            classifier=KeywordTopicClassifier.from_csv(),
+            router=TopicRouter(budget=self._get_openai_budget()),
+            sentence_scoring=True,
+            workers=int(os.environ.get('ANALYSIS_WORKERS', '1')),
+            chunker=BodyChunker(),
+            store_sentence_scores=os.environ.get(
+                'STORE_SENTENCE_SCORES', '').lower() == 'true',
         )
 
+    def _get_openai_budget(self) -> float:
+        '''Get the OpenAI budget (USD) for a single run, if one is set.'''
+        budget = os.environ.get('OPENAI_BUDGET_PER_RUN')
+        return float(budget) if budget else None
+
     def run(self):
         '''Run entire news scraper pipeline.'''
         # EXTRACT
@@ -42,19 +61,22 @@ class NewsScraper:
             print("Transforming...")
             article_factory = ArticleFactory(
                 raw_data=all_articles,
-                existing_urls=self.__db_manager.get_article_urls()
+                existing_urls=self.__db_manager.get_existing_urls(
+                    [article_data['url'] for article_data in all_articles])
             )
             articles = article_factory.generate_articles()
             # ANALYSIS
             print("Analysing...")
             self.__text_analyser.extract_topics(articles)
-            self.__text_analyser.perform_topic_analyses(articles)
-            self.__text_analyser.perform_body_analyses(articles)
+            print(f"Routing: {self.__text_analyser.get_routing_summary()}")
+            self.__text_analyser.perform_analyses(articles)
             # LOAD
             print("Loading...")
-            self.__db_manager.insert_into_database(articles)
+            inserted = self.__db_manager.insert_into_database(articles)
+            print(f"Loaded {inserted} of {len(articles)} articles.")
         except Exception:
             traceback.format_exc()
         finally:
+            self.__text_analyser.close()
             self.__db_manager.close_connection()
             print("Finished.")
@@ -0,0 +1,64 @@
+'''
+    Script defining the SentenceIndex class, which maps key terms to the sentences of an
+    article containing them.
+'''
+
+from bisect import bisect_right
+
+SENTENCE_SEPARATOR = '\n'
+
+
+class SentenceIndex:
+    '''Class indexing an article's sentences by the key terms they contain. The sentences
+    are lowercased once, and each distinct key term (across all topics) is searched for
+    once over the whole article, rather than once per topic and sentence.'''
+
+    def __init__(self, sentences: list[str]):
+        '''Instantiate the index from the article's sentences.'''
+        self.__sentences = sentences
+        self.__lowered_sentences = [sentence.lower() for sentence in sentences]
+        self.__sentence_starts = []
+        position = 0
+        for sentence in self.__lowered_sentences:
+            self.__sentence_starts.append(position)
+            position += len(sentence) + len(SENTENCE_SEPARATOR)
+        self.__text = SENTENCE_SEPARATOR.join(self.__lowered_sentences)
+        self.__term_sentence_ids = {}
+
+    def _search(self, term: str) -> frozenset[int]:
+        '''Find the IDs of the sentences containing the (lowercase) term, jumping to the
+        next sentence after each hit.'''
+        if not term:
+            return frozenset(range(len(self.__sentences)))
+        if SENTENCE_SEPARATOR in term:
+            return frozenset(i for i, sentence in enumerate(self.__lowered_sentences)
+                             if term in sentence)
+        sentence_ids = set()
+        position = self.__text.find(term)
+        while position != -1:
+            sentence_id = bisect_right(self.__sentence_starts, position) - 1
+            sentence_ids.add(sentence_id)
+            if sentence_id + 1 == len(self.__sentence_starts):
+                break
+            position = self.__text.find(
+                term, self.__sentence_starts[sentence_id + 1])
+        return frozenset(sentence_ids)
+
+    def get_sentence_ids(self, key_terms: list[str]) -> list[int]:
+        '''Get the IDs, in order, of the sentences containing any of the key terms
+        (case-insensitive).'''
+        sentence_ids = set()
+        for key_term in key_terms:
+            term = key_term.lower()
+            if term not in self.__term_sentence_ids:
+                self.__term_sentence_ids[term] = self._search(term)
+            sentence_ids.update(self.__term_sentence_ids[term])
+        return sorted(sentence_ids)
+
+    def get_sentences(self, key_terms: list[str]) -> list[str]:
+        '''Get the sentences containing any of the key terms, in order.'''
+        return [self.__sentences[i] for i in self.get_sentence_ids(key_terms)]
+
+    def get_context_text(self, key_terms: list[str]) -> str:
+        '''Get the text made of the sentences containing any of the key terms.'''
+        return " ".join(self.get_sentences(key_terms))
@@ -0,0 +1,210 @@
+'''
+    Script defining the SentenceScorer, which runs VADER over each sentence once and derives
+    the document-level scores of any run of sentences from the cached sentence results.
+'''
+
+from collections import OrderedDict
+from functools import lru_cache
+from types import SimpleNamespace
+
+from nltk.sentiment import SentimentIntensityAnalyzer
+from nltk.sentiment.vader import VaderConstants
+
+PUNCTUATION = frozenset(VaderConstants.PUNC_LIST)
+
+
+@lru_cache(maxsize=100_000)
+def strip_token(token: str) -> str:
+    '''Strip a token as VADER's SentiText does: a word with one of VADER's punctuation
+    marks before or after it loses the punctuation. SentiText builds this mapping for every
+    word of the text, which dominates the cost of scoring short texts.'''
+    word = VaderConstants.REGEX_REMOVE_PUNCTUATION.sub("", token)
+    if len(word) > 1:
+        if token.startswith(word) and token[len(word):] in PUNCTUATION:
+            return word
+        if token.endswith(word) and token[:-len(word)] in PUNCTUATION:
+            return word
+    return token
+
+
+def vader_tokens(text: str) -> list[str]:
+    '''Split a text into VADER's words and emoticons, as SentiText does.'''
+    return [strip_token(token) for token in text.split() if len(token) > 1]
+
+
+class ScoredSentence:
+    '''Class holding VADER's token-level results for a single sentence, scored on its own.
+    Valences are kept per distinct token (at its first occurrence), since VADER scores
+    every repeat of a token as it scored the first occurrence.'''
+
+    def __init__(self, text: str, tokens: list[str]):
+        self.__text = text
+        self.__tokens = tokens
+        self.__caps_count = sum(1 for token in tokens if token.isupper())
+        self.__exclamation_count = text.count('!')
+        self.__question_count = text.count('?')
+        self.__valences = {}
+
+    def get_text(self) -> str:
+        '''Getter for the sentence text.'''
+        return self.__text
+
+    def get_tokens(self) -> list[str]:
+        '''Getter for VADER's words and emoticons of the sentence.'''
+        return self.__tokens
+
+    def get_caps_count(self) -> int:
+        '''Getter for the number of ALL CAPS tokens.'''
+        return self.__caps_count
+
+    def get_punctuation_counts(self) -> tuple[int, int]:
+        '''Getter for the number of exclamation and question marks.'''
+        return self.__exclamation_count, self.__question_count
+
+    def get_valences(self, is_cap_diff: bool) -> dict:
+        '''Getter for the (first position, valence) of each distinct token, computed when
+        first needed for the given ALL CAPS differential.'''
+        return self.__valences.get(is_cap_diff)
+
+    def set_valences(self, is_cap_diff: bool, valences: dict) -> None:
+        '''Set the (first position, valence) of each distinct token.'''
+        self.__valences[is_cap_diff] = valences
+
+
+class SentenceCache:
+    '''Least-recently-used cache of scored sentences, shared across articles so recurring
+    sentences (e.g. newsletter sign-ups) are only scored once.'''
+
+    def __init__(self, max_size: int = 50_000):
+        self.__max_size = max_size
+        self.__sentences = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+
+    def get(self, text: str) -> ScoredSentence:
+        '''Get a scored sentence, or None if it is not cached.'''
+        scored_sentence = self.__sentences.get(text)
+        if scored_sentence is None:
+            self.__misses += 1
+            return None
+        self.__hits += 1
+        self.__sentences.move_to_end(text)
+        return scored_sentence
+
+    def put(self, scored_sentence: ScoredSentence) -> None:
+        '''Add a scored sentence, evicting the least recently used if the cache is full.'''
+        self.__sentences[scored_sentence.get_text()] = scored_sentence
+        if len(self.__sentences) > self.__max_size:
+            self.__sentences.popitem(last=False)
+
+    def get_stats(self) -> dict:
+        '''Getter for the cache size, hits and misses.'''
+        return {'size': len(self.__sentences), 'hits': self.__hits, 'misses': self.__misses}
+
+
+SHARED_SENTENCE_CACHE = SentenceCache()
+
+
+class SentenceScorer:
+    '''Class scoring sentences once with VADER and combining them into the exact scores
+    VADER gives for the sentences joined with spaces.
+
+    VADER's document score is a function of the token valences, except for a few effects
+    which cross sentence boundaries: the ALL CAPS differential of the whole text, the first
+    "but", the exclamation and question mark counts, repeated tokens reusing the valence
+    of their first occurrence, and the three-word look-behind (and two-word look-ahead for
+    idioms) of tokens at the edges of a sentence. These are all recomputed when combining,
+    so the combined scores match polarity_scores exactly.'''
+
+    EDGE_LOOK_BEHIND = 3
+    EDGE_LOOK_AHEAD = 2
+
+    def __init__(self, sentiment_analyser: SentimentIntensityAnalyzer,
+                 cache: SentenceCache = SHARED_SENTENCE_CACHE):
+        self.__analyser = sentiment_analyser
+        self.__cache = cache
+
+    def _token_valence(self, tokens: list[str], i: int, is_cap_diff: bool) -> float:
+        '''The valence VADER gives the lexicon token at position i, as in polarity_scores.'''
+        item = tokens[i]
+        item_lowercase = item.lower()
+        if ((i < len(tokens) - 1 and item_lowercase == "kind" and tokens[i + 1].lower() == "of")
+                or item_lowercase in self.__analyser.constants.BOOSTER_DICT):
+            return 0
+        sentitext = SimpleNamespace(
+            words_and_emoticons=tokens, is_cap_diff=is_cap_diff)
+        return self.__analyser.sentiment_valence(0, sentitext, item, i, [])[-1]
+
+    def score_sentence(self, text: str) -> ScoredSentence:
+        '''Score a single sentence, using the cache if it has been seen before.'''
+        scored_sentence = self.__cache.get(text)
+        if scored_sentence is None:
+            scored_sentence = ScoredSentence(text, vader_tokens(text))
+            self.__cache.put(scored_sentence)
+        return scored_sentence
+
+    def _get_valences(self, scored_sentence: ScoredSentence, is_cap_diff: bool) -> dict:
+        '''Get the (first position, valence) of each distinct token of a sentence which is
+        in the lexicon. Any other token has a valence of zero wherever it occurs.'''
+        valences = scored_sentence.get_valences(is_cap_diff)
+        if valences is None:
+            lexicon = self.__analyser.lexicon
+            tokens = scored_sentence.get_tokens()
+            valences = {}
+            for i, token in enumerate(tokens):
+                if token not in valences and token.lower() in lexicon:
+                    valences[token] = (
+                        i, self._token_valence(tokens, i, is_cap_diff))
+            scored_sentence.set_valences(is_cap_diff, valences)
+        return valences
+
+    def _combine_valences(self, scored_sentences: list[ScoredSentence],
+                          tokens: list[str], is_cap_diff: bool) -> list[float]:
+        '''Get the valence of every token of the combined text. A token's valence comes
+        from its first sentence, unless it first occurs at the edge of a sentence and so
+        could be affected by the neighbouring sentences, in which case it is recomputed.'''
+        token_valences = {}
+        offset = 0
+        for scored_sentence in scored_sentences:
+            length = len(scored_sentence.get_tokens())
+            has_previous = offset > 0
+            has_next = offset + length < len(tokens)
+            for token, (position, valence) in self._get_valences(scored_sentence,
+                                                                 is_cap_diff).items():
+                if token in token_valences:
+                    continue
+                if ((has_previous and position < self.EDGE_LOOK_BEHIND) or
+                        (has_next and position >= length - self.EDGE_LOOK_AHEAD)):
+                    valence = self._token_valence(
+                        tokens, offset + position, is_cap_diff)
+                token_valences[token] = valence
+            offset += length
+        return [token_valences.get(token, 0) for token in tokens]
+
+    def combine(self, scored_sentences: list[ScoredSentence]) -> dict:
+        '''Get the VADER scores of the scored sentences joined with spaces.'''
+        tokens = [token for scored_sentence in scored_sentences
+                  for token in scored_sentence.get_tokens()]
+        caps_count = sum(s.get_caps_count() for s in scored_sentences)
+        is_cap_diff = 0 < len(tokens) - caps_count < len(tokens)
+        sentiments = self._combine_valences(
+            scored_sentences, tokens, is_cap_diff)
+        sentiments = self.__analyser._but_check(  # pylint: disable=protected-access
+            tokens, sentiments)
+        exclamation_count = sum(s.get_punctuation_counts()[0] for s in scored_sentences)
+        question_count = sum(s.get_punctuation_counts()[1] for s in scored_sentences)
+        # VADER only reads the punctuation counts of the text when scoring valences
+        return self.__analyser.score_valence(
+            sentiments, '!' * exclamation_count + '?' * question_count)
+
+    def score_sentences(self, sentences: list[str]) -> dict:
+        '''Get the VADER scores of the sentences joined with spaces.'''
+        return self.combine([self.score_sentence(sentence) for sentence in sentences])
+
+    def score_text(self, text: str, sentences: list[str]) -> dict:
+        '''Get the VADER scores of a text from its sentences. If the sentences do not
+        split the text at whitespace (so VADER would tokenise them differently), the text
+        is scored directly instead.'''
+        if text.split() != [word for sentence in sentences for word in sentence.split()]:
+            return self.__analyser.polarity_scores(text)
+        return self.score_sentences(sentences)
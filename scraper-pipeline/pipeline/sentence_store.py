@@ -0,0 +1,138 @@
+'''
+    Script defining the SentenceScores class, a compact record of the VADER scores of each
+    sentence of an article, and the SentenceScoreTable class, which rebuilds the sentiment
+    of any set of key terms across many articles from these records, without re-running
+    VADER.
+'''
+
+import numpy as np
+
+from sentence_index import SentenceIndex
+
+# Sentences are stored as (start, end) character offsets into the body, and their scores
+# as (pos, neu, neg, compound) half-precision floats: 16 bytes per sentence.
+OFFSET_DTYPE = np.dtype('<u4')
+SCORE_DTYPE = np.dtype('<f2')
+SCORE_KEYS = ('pos', 'neu', 'neg', 'compound')
+
+# VADER normalises the summed valence of a text into its compound score with
+# score / sqrt(score ** 2 + alpha). Compounds are clipped below 1 before inverting it, as
+# the largest ones round to 1 in half precision.
+VADER_ALPHA = 15
+MAX_COMPOUND = 0.9995
+
+
+class SentenceScores:
+    '''Class holding the character offsets and the VADER scores of each sentence of an
+    article body.'''
+
+    def __init__(self, offsets: np.ndarray, scores: np.ndarray):
+        '''Instantiate the record from an (n, 2) array of sentence offsets and an (n, 4)
+        array of the sentences' scores.'''
+        self.__offsets = np.asarray(offsets, dtype=OFFSET_DTYPE).reshape(-1, 2)
+        self.__scores = np.asarray(scores, dtype=SCORE_DTYPE).reshape(-1, len(SCORE_KEYS))
+
+    @classmethod
+    def from_sentences(cls, body: str, sentences: list[str],
+                       sentence_scores: list[dict]) -> 'SentenceScores':
+        '''Create the record from the sentences of the body (in order) and VADER's scores
+        of each of them.'''
+        offsets = []
+        position = 0
+        for sentence in sentences:
+            start = body.find(sentence, position)
+            if start == -1:
+                start = position
+            position = start + len(sentence)
+            offsets.append((start, position))
+        scores = [[scores[key] for key in SCORE_KEYS] for scores in sentence_scores]
+        return cls(np.array(offsets, dtype=OFFSET_DTYPE), np.array(scores, dtype=SCORE_DTYPE))
+
+    @classmethod
+    def from_bytes(cls, offsets: bytes, scores: bytes) -> 'SentenceScores':
+        '''Create the record from the bytes it is stored as.'''
+        return cls(np.frombuffer(offsets, dtype=OFFSET_DTYPE),
+                   np.frombuffer(scores, dtype=SCORE_DTYPE))
+
+    def to_bytes(self) -> tuple[bytes, bytes]:
+        '''Get the offsets and the scores as the bytes they are stored as.'''
+        return self.__offsets.tobytes(), self.__scores.tobytes()
+
+    def get_offsets(self) -> np.ndarray:
+        '''Getter for the (start, end) offsets of each sentence.'''
+        return self.__offsets
+
+    def get_scores(self) -> np.ndarray:
+        '''Getter for the (pos, neu, neg, compound) scores of each sentence.'''
+        return self.__scores
+
+    def get_sentences(self, body: str) -> list[str]:
+        '''Get the sentences of the body the record was made from.'''
+        return [body[start:end] for start, end in self.__offsets.tolist()]
+
+    def __len__(self) -> int:
+        return len(self.__offsets)
+
+
+class SentenceScoreTable:
+    '''Class rebuilding topic sentiment from the sentence scores of many articles. The
+    scores of every sentence are concatenated into flat arrays once, so scoring a set of
+    key terms is a search of each article's sentence index followed by a few vectorised
+    sums over all the articles.
+
+    The rebuilt scores approximate VADER's scores of the matching sentences joined: the
+    compound score sums the sentences' valences (by inverting VADER's normalisation), and
+    the pos, neu and neg proportions are averaged weighted by sentence length. Effects
+    which cross sentences (e.g. the ALL CAPS differential) are not recomputed.'''
+
+    def __init__(self, bodies: list[str], sentence_scores: list[SentenceScores]):
+        '''Instantiate the table from the bodies of the articles and their sentence
+        scores, in the same order.'''
+        self.__article_count = len(bodies)
+        self.__indexes = [SentenceIndex(scores.get_sentences(body))
+                          for body, scores in zip(bodies, sentence_scores)]
+        counts = [len(scores) for scores in sentence_scores]
+        self.__starts = np.concatenate(([0], np.cumsum(counts, dtype=np.int64)))
+        self.__article_ids = np.repeat(np.arange(self.__article_count), counts)
+        offsets = np.concatenate(
+            [scores.get_offsets() for scores in sentence_scores] + [np.empty((0, 2))])
+        scores = np.concatenate(
+            [scores.get_scores() for scores in sentence_scores]
+            + [np.empty((0, len(SCORE_KEYS)))]).astype(np.float64)
+        self.__lengths = offsets[:, 1] - offsets[:, 0]
+        self.__proportions = scores[:, :3]
+        compounds = np.clip(scores[:, 3], -MAX_COMPOUND, MAX_COMPOUND)
+        self.__valences = compounds * np.sqrt(VADER_ALPHA / (1 - compounds ** 2))
+
+    def get_matches(self, key_terms: list[str]) -> np.ndarray:
+        '''Get a mask of the sentences (across all articles) containing any of the key
+        terms (case-insensitive).'''
+        matches = np.zeros(len(self.__article_ids), dtype=bool)
+        for start, index in zip(self.__starts.tolist(), self.__indexes):
+            sentence_ids = index.get_sentence_ids(key_terms)
+            if sentence_ids:
+                matches[start + np.array(sentence_ids)] = True
+        return matches
+
+    def score_topic(self, key_terms: list[str]) -> dict[str, np.ndarray]:
+        '''Rebuild the sentiment of the sentences containing any of the key terms, for
+        each article. Returns an array of each of VADER's scores and of the number of
+        matching sentences, with one element per article. Articles without a matching
+        sentence score zero, as VADER scores empty text.'''
+        matches = self.get_matches(key_terms)
+        minlength = self.__article_count
+        weights = self.__lengths * matches
+        total_weights = np.bincount(self.__article_ids, weights=weights, minlength=minlength)
+        topic_scores = {}
+        for column, key in enumerate(SCORE_KEYS[:3]):
+            weighted_sums = np.bincount(self.__article_ids,
+                                        weights=weights * self.__proportions[:, column],
+                                        minlength=minlength)
+            topic_scores[key] = np.divide(weighted_sums, total_weights,
+                                          out=np.zeros(minlength), where=total_weights > 0)
+        valences = np.bincount(self.__article_ids, weights=self.__valences * matches,
+                               minlength=minlength)
+        topic_scores['compound'] = valences / np.sqrt(valences ** 2 + VADER_ALPHA)
+        topic_scores['sentences'] = np.bincount(self.__article_ids[matches],
+                                                minlength=minlength)
+        return topic_scores
@@ -0,0 +1,150 @@
+'''
+    Script defining the SentimentAnalyser, which scores the sentiment of article bodies and
+    the topics within them (and optionally each of their sentences), and the
+    ParallelSentimentAnalyser, which spreads this work across a pool of processes.
+'''
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import nltk
+
+from nltk_resources import load_vader
+from polarity import PolarityAnalyser
+from sentence_index import SentenceIndex
+from sentence_scores import SentenceScorer
+from sentence_store import SentenceScores
+
+
+@lru_cache(maxsize=256)
+def split_sentences(body: str) -> tuple[str]:
+    '''Split an article body into sentences. The result is cached, so the topic and body
+    analyses of an article share the same tokenisation.'''
+    return tuple(nltk.sent_tokenize(body))
+
+
+class SentimentAnalyser:
+    '''Class scoring the sentiment of an article body and its topics. Only strings go in
+    and dictionaries of scores come out, so the analysis can run in another process.'''
+
+    def __init__(self, sentence_scoring: bool = False):
+        '''Instantiate the analyser. With sentence scoring, VADER runs once per sentence
+        and the topic and body scores are combined from the (cached) sentence results.
+        The VADER lexicon is loaded the first time it is needed.'''
+        self.__sentence_scoring = sentence_scoring
+        self.__vader = None
+        self.__sentence_scorer = None
+        self.__polarity_analyser = None
+
+    def _load(self) -> None:
+        '''Load VADER (and the sentence scorer) and the polarity lexicon, if not loaded
+        already.'''
+        if self.__vader is None:
+            self.__vader = load_vader()
+            self.__polarity_analyser = PolarityAnalyser()
+            if self.__sentence_scoring:
+                self.__sentence_scorer = SentenceScorer(self.__vader)
+
+    def _vader_scores(self, sentences: list[str]) -> dict:
+        '''Get VADER's scores of the sentences joined with spaces.'''
+        self._load()
+        if self.__sentence_scorer is not None:
+            return self.__sentence_scorer.score_sentences(sentences)
+        return self.__vader.polarity_scores(" ".join(sentences))
+
+    def score_topics(self, body: str, topic_key_terms: list[list[str]]) -> list[dict]:
+        '''Score each topic from the sentences of the body containing its key terms. The
+        number of these sentences is included in the scores.'''
+        sentence_index = SentenceIndex(split_sentences(body))
+        topic_scores = []
+        for key_terms in topic_key_terms:
+            sentences = sentence_index.get_sentences(key_terms)
+            topic_scores.append({**self._vader_scores(sentences), 'sentences': len(sentences)})
+        return topic_scores
+
+    def score_body(self, body: str) -> dict:
+        '''Score the whole body, with TextBlob's polarity and subjectivity alongside
+        VADER's scores.'''
+        self._load()
+        sentences = split_sentences(body)
+        polarity, subjectivity = self.__polarity_analyser.score_text(body, sentences)
+        if self.__sentence_scorer is not None:
+            scores = self.__sentence_scorer.score_text(body, sentences)
+        else:
+            scores = self.__vader.polarity_scores(body)
+        return {'polarity': polarity, 'subjectivity': subjectivity, **scores}
+
+    def analyse(self, body: str, topic_key_terms: list[list[str]]) -> tuple[dict, list[dict]]:
+        '''Score the body and each of its topics.'''
+        return self.score_body(body), self.score_topics(body, topic_key_terms)
+
+    def score_sentences(self, body: str) -> SentenceScores:
+        '''Score each sentence of the body on its own, for re-aggregating later.'''
+        sentences = split_sentences(body)
+        return SentenceScores.from_sentences(
+            body, sentences, [self._vader_scores([sentence]) for sentence in sentences])
+
+
+_WORKER_ANALYSER = None
+
+
+def _initialise_worker(sentence_scoring: bool, nltk_data_path: list[str]) -> None:
+    '''Load the VADER lexicon and TextBlob's lexicon once in each worker process.'''
+    global _WORKER_ANALYSER  # pylint: disable=global-statement
+    nltk.data.path[:] = nltk_data_path
+    _WORKER_ANALYSER = SentimentAnalyser(sentence_scoring)
+    _WORKER_ANALYSER.score_body("")
+
+
+def _analyse_in_worker(task: tuple[str, list[list[str]]]) -> tuple[dict, list[dict]]:
+    '''Analyse a single (body, topic key terms) task in a worker process.'''
+    return _WORKER_ANALYSER.analyse(*task)
+
+
+def _score_sentences_in_worker(body: str) -> SentenceScores:
+    '''Score each sentence of a body in a worker process.'''
+    return _WORKER_ANALYSER.score_sentences(body)
+
+
+class ParallelSentimentAnalyser:
+    '''Class spreading sentiment analysis across a pool of worker processes. The pool is
+    started on first use and reused until closed. Note that AWS Lambda does not support the
+    shared memory a process pool needs, so this is for backfills and local runs.'''
+
+    def __init__(self, workers: int, sentence_scoring: bool = False, chunksize: int = 8):
+        '''Instantiate the analyser. Articles are sent to the workers in chunks of
+        chunksize to reduce the overhead of crossing the process boundary.'''
+        self.__workers = workers
+        self.__sentence_scoring = sentence_scoring
+        self.__chunksize = chunksize
+        self.__executor = None
+
+    def get_workers(self) -> int:
+        '''Getter for the number of worker processes.'''
+        return self.__workers
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        '''Get the pool of worker processes, starting it if needed.'''
+        if self.__executor is None:
+            self.__executor = ProcessPoolExecutor(
+                max_workers=self.__workers,
+                initializer=_initialise_worker,
+                initargs=(self.__sentence_scoring, list(nltk.data.path)),
+            )
+        return self.__executor
+
+    def analyse(self, tasks: list[tuple[str, list[list[str]]]]) -> list[tuple[dict, list[dict]]]:
+        '''Analyse each (body, topic key terms) task, returning the results in order.'''
+        return list(self._get_executor().map(
+            _analyse_in_worker, tasks, chunksize=self.__chunksize))
+
+    def score_sentences(self, bodies: list[str]) -> list[SentenceScores]:
+        '''Score each sentence of each body, returning the results in order.'''
+        return list(self._get_executor().map(
+            _score_sentences_in_worker, bodies, chunksize=self.__chunksize))
+
+    def close(self) -> None:
+        '''Shut down the worker processes.'''
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
@@ -0,0 +1,34 @@
+'''
+    Test the Aho-Corasick automaton.
+'''
+
+from automaton import AhoCorasick
+
+
+def test_iter_matches_finds_overlapping_patterns():
+    '''Test that every occurrence is found, including overlapping patterns.'''
+    automaton = AhoCorasick(["he", "she", "hers", "his"])
+    matches = sorted(automaton.iter_matches("ushers"))
+    assert matches == [(4, 0), (4, 1), (6, 2)]
+
+
+def test_find_patterns_matches_substring_semantics():
+    '''Test that find_patterns agrees with the in operator for every pattern.'''
+    patterns = ["trump", "tariff", "tariffs", "us", "china", "a"]
+    text = "us tariffs on chinese goods were announced"
+    automaton = AhoCorasick(patterns)
+    expected = {i for i, pattern in enumerate(patterns) if pattern in text}
+    assert automaton.find_patterns(text) == expected
+
+
+def test_word_level_patterns():
+    '''Test that the automaton matches sequences of words as well as characters.'''
+    automaton = AhoCorasick([("donald", "trump"), ("trump",)])
+    tokens = ["president", "donald", "trump", "said"]
+    assert sorted(automaton.iter_matches(tokens)) == [(3, 0), (3, 1)]
+
+
+def test_empty_patterns_are_ignored():
+    '''Test that empty patterns never match.'''
+    automaton = AhoCorasick(["", "abc"])
+    assert automaton.find_patterns("abc") == {1}
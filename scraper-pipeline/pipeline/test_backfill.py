@@ -0,0 +1,172 @@
+'''
+    Test the backfill of stored articles from the body store.
+'''
+
+from datetime import date, datetime
+from unittest.mock import MagicMock, patch
+import pytest
+from backfill import Backfiller, BackfillCheckpoint, BackfillDatabaseManager
+from body_store import BodyStore, LocalBlobStorage
+from keyword_classifier import KeywordTopicClassifier
+from models import Article, TopicAnalysis
+
+# pylint: disable=redefined-outer-name, protected-access
+
+JANUARY = datetime(2025, 1, 10, 9, 0)
+FEBRUARY = datetime(2025, 2, 3, 18, 0)
+
+
+@pytest.fixture
+def body_store(tmp_path):
+    '''Body store holding three January articles and two February articles.'''
+    store = BodyStore(LocalBlobStorage(tmp_path / 'bodies'))
+    store.write([(i, f"https://example.com/{i}", JANUARY, f"Body {i} about the NHS.")
+                 for i in range(1, 4)])
+    store.write([(i, f"https://example.com/{i}", FEBRUARY, f"Body {i} about tariffs.")
+                 for i in range(4, 6)])
+    return store
+
+
+@pytest.fixture
+def db_manager():
+    '''Mock database manager, for which article 2 has been archived.'''
+    manager = MagicMock()
+    manager.get_articles.side_effect = lambda article_ids, month: {
+        article_id: (JANUARY if month.month == 1 else FEBRUARY, "The Guardian",
+                     "Headline", f"https://example.com/{article_id}", ["Health"])
+        for article_id in article_ids if article_id != 2}
+    return manager
+
+
+@pytest.fixture
+def text_analyser():
+    '''Mock text analyser, scoring every article and topic.'''
+    def perform_analyses(articles):
+        for article in articles:
+            article.set_sentiments(0.1, 0.2, 0.3, 0.4)
+            for topic_analysis in article.get_topic_analyses():
+                topic_analysis.set_sentiments(0.5, 0.3, 0.2, 0.6)
+    analyser = MagicMock()
+    analyser.perform_analyses.side_effect = perform_analyses
+    return analyser
+
+
+def make_backfiller(db_manager, body_store, text_analyser, tmp_path, batch_size=2):
+    '''Backfiller checkpointing to a temporary file.'''
+    classifier = KeywordTopicClassifier({"Health": ["NHS"], "Trade": ["tariffs"]},
+                                        min_strength=0.0)
+    return Backfiller(db_manager, body_store, text_analyser, classifier,
+                      BackfillCheckpoint(str(tmp_path / 'checkpoint.json')), batch_size)
+
+
+def updated_ids(db_manager) -> list[int]:
+    '''The ids of the articles updated, in order.'''
+    return [article.get_id() for call in db_manager.update.call_args_list
+            for article in call.args[0]]
+
+
+def test_stored_articles_updated_in_date_order(db_manager, body_store, text_analyser,
+                                               tmp_path):
+    '''Test every stored article is re-analysed and updated in batches, oldest month
+    first, skipping archived articles, and the throughput is reported.'''
+    backfiller = make_backfiller(db_manager, body_store, text_analyser, tmp_path)
+    summary = backfiller.run(['body', 'topics'])
+    assert updated_ids(db_manager) == [1, 3, 4, 5]
+    assert [len(call.args[0]) for call in db_manager.update.call_args_list] == [1, 1, 2]
+    assert summary['records'] == 5 and summary['updated'] == 4
+    assert summary['articles_per_second'] > 0
+    january_article = db_manager.update.call_args_list[0].args[0][0]
+    assert [topic.get_key_terms() for topic in january_article.get_topic_analyses()] == \
+        [["NHS"]]
+
+
+def test_only_topics_of_topic_stage_are_rescored(db_manager, body_store, text_analyser,
+                                                 tmp_path):
+    '''Test topics are only re-scored when backfilling the topics stage.'''
+    backfiller = make_backfiller(db_manager, body_store, text_analyser, tmp_path)
+    backfiller.run(['body'])
+    assert all(article.get_topic_analyses() == []
+               for call in db_manager.update.call_args_list for article in call.args[0])
+
+
+def test_interrupted_backfill_resumes_from_checkpoint(db_manager, body_store,
+                                                      text_analyser, tmp_path):
+    '''Test a backfill failing part way resumes after the last committed batch.'''
+    db_manager.update.side_effect = [None, RuntimeError("connection lost")]
+    backfiller = make_backfiller(db_manager, body_store, text_analyser, tmp_path)
+    with pytest.raises(RuntimeError):
+        backfiller.run(['body'])
+    assert updated_ids(db_manager) == [1, 3]
+
+    db_manager.update.reset_mock(side_effect=True)
+    backfiller.run(['body'])
+    assert updated_ids(db_manager) == [3, 4, 5]
+
+
+def test_since_skips_earlier_months(db_manager, body_store, text_analyser, tmp_path):
+    '''Test only the articles published since the given month are backfilled.'''
+    backfiller = make_backfiller(db_manager, body_store, text_analyser, tmp_path)
+    backfiller.run(['body'], since=date(2025, 2, 14))
+    assert updated_ids(db_manager) == [4, 5]
+
+
+def make_scored_article(article_id: int) -> Article:
+    '''A January article with its body and Health topic scored.'''
+    article = Article("The Guardian", "Headline", f"https://example.com/{article_id}",
+                      JANUARY, "Body about the NHS.")
+    article.set_id(article_id)
+    article.set_subjectivity(0.5)
+    article.set_polarity(0.1)
+    article.set_sentiments(0.1, 0.2, 0.3, 0.4)
+    topic_analysis = TopicAnalysis("Health", ["NHS"])
+    topic_analysis.set_sentiments(0.5, 0.3, 0.2, 0.6)
+    article.set_topics_analyses([topic_analysis])
+    return article
+
+
+@patch("backfill.REFERENCE_DATA")
+@patch("backfill.db_pool.get_connection")
+def test_update_is_one_transaction_rebuilding_rollups(mock_get_connection, mock_reference):
+    '''Test the batch's scores are bulk-updated, and the rollups of its days rebuilt, in
+    one transaction on a connection set up to yield to the scraper.'''
+    mock_reference.get_topic_ids.return_value = {"Health": 1, "Trade": 2}
+    mock_conn = MagicMock()
+    mock_get_connection.return_value = mock_conn
+    mock_cursor = mock_conn.cursor.return_value.__enter__.return_value
+    backfill_db = BackfillDatabaseManager()
+    mock_cursor.execute.assert_called_with(BackfillDatabaseManager.SESSION_QUERY)
+
+    with patch("backfill.psycopg2.extras.execute_values") as mock_execute:
+        backfill_db.update([make_scored_article(1), make_scored_article(3)],
+                           ['body', 'topics'])
+    (_, article_query, article_rows), _ = mock_execute.call_args_list[0]
+    assert article_query == BackfillDatabaseManager.ARTICLE_UPDATE_QUERY
+    assert article_rows[0] == (1, JANUARY, 0.5, 0.1, 0.1, 0.2, 0.3, 0.4)
+    (_, topic_query, topic_rows), _ = mock_execute.call_args_list[1]
+    assert topic_query == BackfillDatabaseManager.ARTICLE_TOPIC_UPDATE_QUERY
+    assert topic_rows == [(article_id, JANUARY, 1, 0.5, 0.3, 0.2, 0.6) for article_id in (1, 3)]
+    day_params = {'days': [JANUARY.date()], 'first_day': JANUARY.date(),
+                  'last_day': JANUARY.date()}
+    assert [call.args for call in mock_cursor.execute.call_args_list[1:]] == [
+        (query, day_params) for query in (
+            *BackfillDatabaseManager.DAILY_OUTLET_ROLLUP_REBUILD_QUERIES,
+            *BackfillDatabaseManager.DAILY_TOPIC_ROLLUP_REBUILD_QUERIES)]
+    mock_conn.__exit__.assert_called_once()
+
+
+@patch("backfill.REFERENCE_DATA")
+@patch("backfill.db_pool.get_connection")
+def test_get_articles_searches_a_day_either_side_of_month(mock_get_connection, _):
+    '''Test articles of a segment are also found if they are stored a day outside its
+    month, as segments written from local feed dates may be.'''
+    mock_conn = MagicMock()
+    mock_get_connection.return_value = mock_conn
+    mock_cursor = mock_conn.cursor.return_value.__enter__.return_value
+    mock_cursor.fetchall.return_value = [(7, datetime(2025, 3, 31, 23, 15), "BBC", "H",
+                                          "https://example.com/7", [])]
+
+    articles = BackfillDatabaseManager().get_articles([7], date(2025, 4, 1))
+
+    assert mock_cursor.execute.call_args.args == (BackfillDatabaseManager.ARTICLES_QUERY, {
+        'article_ids': [7], 'month_start': date(2025, 3, 31), 'month_end': date(2025, 5, 2)})
+    assert articles[7][0] == datetime(2025, 3, 31, 23, 15)
@@ -0,0 +1,104 @@
+'''
+    Test the compressed article body store.
+'''
+
+from datetime import date, datetime
+from unittest.mock import MagicMock
+import pytest
+from body_store import (BodyStore, LocalBlobStorage, S3BlobStorage, RECORD_HEADER,
+                        hash_url)
+
+# pylint: disable=redefined-outer-name
+
+SAMPLE_BODIES = [
+    f"The Prime Minister said on day {i} that the economy grew by {i % 7} percent, "
+    f"while the opposition said waiting lists had risen for the {i}th month running."
+    for i in range(200)
+]
+
+
+def make_articles(count: int, published_date: datetime, start: int = 0) -> list[tuple]:
+    '''Articles to write, as (article id, url, published date, body) tuples.'''
+    return [(i, f"https://example.com/{i}", published_date, SAMPLE_BODIES[i])
+            for i in range(start, start + count)]
+
+
+@pytest.fixture
+def body_store(tmp_path):
+    '''Body store on a temporary directory.'''
+    return BodyStore(LocalBlobStorage(tmp_path))
+
+
+def test_bodies_read_back_in_order(body_store):
+    '''Test the bodies of a batch are read back sequentially, in the order written.'''
+    articles = make_articles(5, datetime(2025, 1, 2))
+    body_store.write(articles)
+    assert list(body_store.iter_bodies()) == [
+        (article_id, hash_url(url), body) for article_id, url, _, body in articles]
+
+
+def test_one_segment_per_publication_month(body_store):
+    '''Test a batch spanning months is written in one segment per month, which can be
+    read on their own.'''
+    body_store.write(make_articles(2, datetime(2025, 1, 31))
+                     + make_articles(3, datetime(2025, 2, 1), start=2))
+    assert [key.split('/')[1:3] for key in body_store.get_segment_keys()] == \
+        [['2025', '01'], ['2025', '02']]
+    assert [article_id for article_id, _, _ in body_store.iter_bodies(date(2025, 2, 1))] == \
+        [2, 3, 4]
+
+
+def test_get_body_by_url(body_store):
+    '''Test a single body is read through the segment indexes, including bodies written
+    after the indexes were first read.'''
+    body_store.write(make_articles(3, datetime(2025, 1, 2)))
+    assert body_store.get_body("https://example.com/1") == SAMPLE_BODIES[1]
+    assert body_store.get_body("https://example.com/missing") is None
+    body_store.write(make_articles(1, datetime(2025, 1, 3), start=3))
+    assert body_store.get_body("https://example.com/3") == SAMPLE_BODIES[3]
+
+
+def test_bodies_written_twice_are_read_from_latest_segment(body_store):
+    '''Test a body written again (e.g. by a retried load) is only read once, from the
+    latest segment, with the article id it was written with last.'''
+    articles = make_articles(2, datetime(2025, 1, 2))
+    body_store.write(articles)
+    body_store.get_body("https://example.com/0")
+    body_store.write([(article_id + 10, *rest) for article_id, *rest in articles])
+    assert [article_id for article_id, _, _ in body_store.iter_bodies()] == [10, 11]
+    assert body_store.get_body("https://example.com/0") == SAMPLE_BODIES[0]
+
+
+def test_dictionary_shrinks_frames_and_old_frames_stay_readable(body_store, tmp_path):
+    '''Test bodies compressed with a trained dictionary are smaller, and bodies written
+    before it (and by a new store instance) are still read back.'''
+    [plain_key] = body_store.write(make_articles(1, datetime(2025, 1, 2), start=150))
+    body_store.train_dictionary(SAMPLE_BODIES[:100], size=4096)
+    [dictionary_key] = body_store.write(make_articles(1, datetime(2025, 1, 3), start=151))
+
+    def frame_size(key):
+        return RECORD_HEADER.unpack((tmp_path / key).read_bytes()[:RECORD_HEADER.size])[2]
+    assert frame_size(dictionary_key) < frame_size(plain_key)
+    reopened = BodyStore(LocalBlobStorage(tmp_path))
+    assert [body for _, _, body in reopened.iter_bodies()] == SAMPLE_BODIES[150:152]
+
+
+def test_s3_storage_prefixes_keys():
+    '''Test the S3 storage writes under its prefix and lists keys without it.'''
+    client = MagicMock()
+    client.get_paginator.return_value.paginate.return_value = [
+        {'Contents': [{'Key': 'bodies/segments/b.seg'}, {'Key': 'bodies/segments/a.seg'}]}]
+    storage = S3BlobStorage('bucket', 'bodies/', client)
+    storage.put('segments/a.seg', b'data')
+    client.put_object.assert_called_once_with(
+        Bucket='bucket', Key='bodies/segments/a.seg', Body=b'data')
+    assert storage.list('segments/') == ['segments/a.seg', 'segments/b.seg']
+
+
+def test_from_env(monkeypatch, tmp_path):
+    '''Test the store is only created when a path or bucket is configured.'''
+    monkeypatch.delenv('BODY_STORE_PATH', raising=False)
+    monkeypatch.delenv('BODY_STORE_BUCKET', raising=False)
+    assert BodyStore.from_env() is None
+    monkeypatch.setenv('BODY_STORE_PATH', str(tmp_path))
+    assert isinstance(BodyStore.from_env(), BodyStore)
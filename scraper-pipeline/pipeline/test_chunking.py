@@ -0,0 +1,66 @@
+'''
+    Test the detection and chunking of live blogs and oversized articles.
+'''
+
+import pytest
+from chunking import BodyChunker, aggregate_chunk_scores
+
+LIVE_URL = "https://www.theguardian.com/politics/live/2025/apr/10/uk-politics-live"
+LIVE_BODY = ("Key events summary. 10.32 BST The minister spoke. 10.45 BST MPs voted. "
+             "11.02 BST The debate ended.")
+
+
+def test_live_blog_detected_by_url_or_timestamps():
+    '''Test live blogs are detected from their URL or their timestamped entries.'''
+    chunker = BodyChunker()
+    assert chunker.is_live_blog(LIVE_URL, "Short body.")
+    assert chunker.is_live_blog("https://example.com/article", LIVE_BODY)
+    assert not chunker.is_live_blog("https://example.com/article", "At 10.30 the vote began.")
+
+
+def test_short_articles_not_chunked():
+    '''Test ordinary articles are analysed whole.'''
+    body = "An ordinary article. It is short."
+    assert BodyChunker().split("https://example.com/article", body) == [body]
+
+
+def test_live_blog_split_into_entries():
+    '''Test live blog entries become chunks, merging short entries.'''
+    assert BodyChunker(chunk_words=4).split(LIVE_URL, LIVE_BODY) == [
+        "Key events summary.",
+        "10.32 BST The minister spoke.",
+        "10.45 BST MPs voted.",
+        "11.02 BST The debate ended.",
+    ]
+    assert BodyChunker(chunk_words=10).split(LIVE_URL, LIVE_BODY) == [
+        "Key events summary. 10.32 BST The minister spoke.",
+        "10.45 BST MPs voted. 11.02 BST The debate ended.",
+    ]
+
+
+@pytest.mark.usefixtures("nltk_data")
+def test_oversized_article_split_at_sentences():
+    '''Test oversized articles are split into chunks of whole sentences.'''
+    body = " ".join(f"Sentence number {i} is here." for i in range(100))
+    chunks = BodyChunker(max_words=200, chunk_words=50).split("https://example.com/a", body)
+    assert " ".join(chunks) == body
+    assert all(len(chunk.split()) == 50 for chunk in chunks)
+
+
+def test_aggregate_chunk_scores_weights_chunks():
+    '''Test body scores are weighted by words and topic scores by matching sentences.'''
+    body_keys = ('polarity', 'subjectivity', 'pos', 'neu', 'neg', 'compound')
+    results = [
+        (dict.fromkeys(body_keys, 1.0),
+         [{'pos': 1.0, 'neu': 0.0, 'neg': 0.0, 'compound': 1.0, 'sentences': 1},
+          {'pos': 0.0, 'neu': 0.0, 'neg': 0.0, 'compound': 0.0, 'sentences': 0}]),
+        (dict.fromkeys(body_keys, 0.0),
+         [{'pos': 0.0, 'neu': 1.0, 'neg': 0.0, 'compound': 0.0, 'sentences': 3},
+          {'pos': 0.0, 'neu': 0.0, 'neg': 0.0, 'compound': 0.0, 'sentences': 0}]),
+    ]
+    body_scores, topic_scores = aggregate_chunk_scores(["one two three", "four"], results)
+    assert body_scores['polarity'] == 0.75
+    assert topic_scores[0] == {'pos': 0.25, 'neu': 0.75, 'neg': 0.0, 'compound': 0.25,
+                               'sentences': 4}
+    assert topic_scores[1] == {'pos': 0.0, 'neu': 0.0, 'neg': 0.0, 'compound': 0.0,
+                               'sentences': 0}
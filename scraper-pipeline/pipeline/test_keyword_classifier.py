@@ -0,0 +1,77 @@
+'''
+    Test the keyword topic classifier.
+'''
+
+from keyword_classifier import KeywordTopicClassifier, agreement_report, normalise_token
+
+TOPIC_TERMS = {
+    "Donald Trump": ["Donald Trump", "Trump"],
+    "Tariffs": ["tariff", "tariffs"],
+    "China": ["China", "Beijing"],
+    "US": ["US", "United States"],
+}
+
+ARTICLE = (
+    "Donald Trump announced new tariffs on China. Trump said tariffs would hurt Beijing. "
+    "Trump repeated that the tariffs were necessary, and China said it would respond."
+)
+
+
+def test_normalise_token_keeps_acronyms():
+    '''Test that acronyms keep their case, while other words are lowercased.'''
+    assert normalise_token("US") == "US"
+    assert normalise_token("Trump") == "trump"
+    assert normalise_token("I") == "i"
+
+
+def test_classify_assigns_topics_with_key_terms_from_text():
+    '''Test that topics are assigned, with key terms written as they appear in the text.'''
+    classifier = KeywordTopicClassifier(TOPIC_TERMS)
+    classification = classifier.classify(ARTICLE)
+    topic_data = {topic['topic_name']: topic['key_terms']
+                  for topic in classification.get_topic_data()}
+    assert set(topic_data) == {"Donald Trump", "Tariffs", "China"}
+    assert all(term in ARTICLE for terms in topic_data.values() for term in terms)
+    assert classification.get_confidence() > 0.5
+
+
+def test_classify_does_not_match_pronoun_us():
+    '''Test that the acronym US does not match the word "us".'''
+    classifier = KeywordTopicClassifier(TOPIC_TERMS, min_strength=0.0)
+    assert classifier.classify("He told us about it.").get_topic_data() == []
+
+
+def test_classify_respects_valid_topics():
+    '''Test that only valid topics are assigned.'''
+    classifier = KeywordTopicClassifier(TOPIC_TERMS)
+    classification = classifier.classify(ARTICLE, valid_topics=["China"])
+    assert classification.get_topic_names() == ["China"]
+
+
+def test_classify_without_matches_has_no_confidence():
+    '''Test that an article without key terms has zero confidence.'''
+    classifier = KeywordTopicClassifier(TOPIC_TERMS)
+    classification = classifier.classify("Nothing relevant happened today.")
+    assert classification.get_topic_data() == []
+    assert classification.get_confidence() == 0.0
+
+
+def test_fit_idf_down_weights_common_terms():
+    '''Test that a term found in every document counts for less than a rare term.'''
+    classifier = KeywordTopicClassifier(TOPIC_TERMS, min_strength=0.0)
+    classifier.fit_idf(["Trump spoke.", "Trump left.", "Trump and China."])
+    scores = classifier._score_topics("Trump China")  # pylint: disable=protected-access
+    assert scores["Donald Trump"]["hits"] < scores["China"]["hits"]
+
+
+def test_agreement_report():
+    '''Test the agreement report against stored LLM topics.'''
+    classifier = KeywordTopicClassifier(TOPIC_TERMS)
+    report = agreement_report(classifier, [
+        (ARTICLE, ["Donald Trump", "Tariffs", "China"]),
+        (ARTICLE, ["Donald Trump", "US"]),
+    ])
+    assert report['articles'] == 2
+    assert report['precision'] == 4 / 6
+    assert report['recall'] == 4 / 5
+    assert report['per_topic']['US']['recall'] == 0.0
@@ -2,24 +2,46 @@
     Script for testing the DatabaseManager
 '''
 
-from datetime import datetime
+from datetime import date, datetime
 from unittest.mock import MagicMock, patch
+import psycopg2
 import pytest
-from models import Article, TopicAnalysis
+from models import Article, ArticleChunk, TopicAnalysis
 from load import DatabaseManager
+from body_store import BodyStore, LocalBlobStorage, hash_url
+from sentence_store import SentenceScores
 
-# pylint: disable=redefined-outer-name, protected-access
+# pylint: disable=redefined-outer-name, protected-access, unused-argument
+
+PUBLISHED_DATE = datetime(2025, 1, 2, 12, 30)
+
+
+def set_scores(article: Article) -> Article:
+    '''Set the article scores, as the analysis would.'''
+    article.set_subjectivity(0.5)
+    article.set_polarity(0.1)
+    article.set_sentiments(0.1, 0.2, 0.3, 0.4)
+    return article
 
 
 @pytest.fixture
 def mock_connection():
     '''Mock connection.'''
-    with patch("load.psycopg2.connect") as mock_connect:
+    with patch("load.db_pool.get_connection") as mock_get_connection:
         mock_conn = MagicMock()
-        mock_connect.return_value = mock_conn
+        mock_get_connection.return_value = mock_conn
         yield mock_conn
 
 
+@pytest.fixture
+def mock_reference_data():
+    '''Mock reference data cache.'''
+    with patch("load.REFERENCE_DATA") as reference_data:
+        reference_data.get_news_outlet_ids.return_value = {"Guardian": 1, "Express": 2}
+        reference_data.get_topic_ids.return_value = {"Politics": 10, "Economy": 20}
+        yield reference_data
+
+
 @pytest.fixture
 @patch.dict("os.environ", {
     "DB_NAME": "test_db",
@@ -28,14 +50,10 @@ def mock_connection():
     "DB_HOST": "localhost",
     "DB_PORT": "5432",
 })
-def db_manager(mock_connection):
+def db_manager(mock_connection, mock_reference_data):
     '''Mock database manager.'''
     mock_cursor = MagicMock()
     mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
-    mock_cursor.fetchall.side_effect = [
-        [("Guardian", 1), ("Express", 2)],
-        [("Politics", 10), ("Economy", 20)]
-    ]
     return DatabaseManager()
 
 
@@ -47,7 +65,17 @@ def test_get_valid_topics(db_manager):
     assert sorted(db_manager.get_valid_topics()) == ["Economy", "Politics"]
 
 
-def test_insert_articles_assigns_ids(db_manager, mock_connection):
+def test_reference_data_read_on_own_connection(db_manager, mock_connection,
+                                               mock_reference_data):
+    """
+    Test that the outlet and topic maps come from the reference data cache, querying (if
+    needed) on the manager's connection.
+    """
+    mock_reference_data.get_news_outlet_ids.assert_called_once_with(mock_connection)
+    mock_reference_data.get_topic_ids.assert_called_once_with(mock_connection)
+
+
+def test_insert_articles_assigns_ids(db_manager):
     """
     Test that `_insert_articles` correctly assigns an article ID after inserting into the database.
 
@@ -55,22 +83,21 @@ def test_insert_articles_assigns_ids(db_manager, mock_connection):
     - That the news outlet is correctly mapped to its ID.
     - That the private __article_id attribute is set based on the returned ID.
     """
-    mock_cursor = mock_connection.cursor.return_value.__enter__.return_value
-
     article = Article(
         news_outlet="Guardian",
         headline="Test Headline",
         url="http://test.com",
-        published_date=datetime.now(),
+        published_date=PUBLISHED_DATE,
         body="Test body"
     )
     article.set_subjectivity(0.5)
     article.set_polarity(0.3)
     article.set_sentiments(0.1, 0.7, 0.2, 0.4)
 
-    mock_cursor.fetchone.return_value = [123]
-
-    db_manager._insert_articles([article])
+    with patch("load.psycopg2.extras.execute_values",
+               return_value=[(123, "http://test.com")]) as mock_execute_values:
+        db_manager._insert_articles([article])
+    mock_execute_values.assert_called_once()
     assert article.get_insert_values({"Guardian": 1})[0] == 1
     assert article._Article__article_id == 123
 
@@ -85,28 +112,339 @@ def test_insert_into_database_combines_inserts(db_manager, mock_connection):
     - The function coordinates all insert operations correctly.
     """
     mock_cursor = mock_connection.cursor.return_value.__enter__.return_value
-
     topic = TopicAnalysis("Economy", ["inflation"])
     topic.set_sentiments(0.1, 0.2, 0.3, 0.4)
 
-    article = Article("Express", "Test", "http://url", datetime.now(), "Body")
+    article = Article("Express", "Test", "http://url", PUBLISHED_DATE, "Body")
     article.set_subjectivity(0.4)
     article.set_polarity(0.2)
     article.set_sentiments(0.1, 0.2, 0.3, 0.4)
     article.set_topics_analyses([topic])
 
-    mock_cursor.fetchone.return_value = [42]
-
-    db_manager.insert_into_database([article])
+    with patch("load.psycopg2.extras.execute_values", return_value=[(42, "http://url")]):
+        db_manager.insert_into_database([article])
     assert article._Article__article_id == 42
+    query, buffer = mock_cursor.copy_expert.call_args.args
+    assert query == DatabaseManager.ARTICLE_TOPIC_COPY_QUERY
+    assert buffer.getvalue() == f"42,{PUBLISHED_DATE},20,0.1,0.2,0.3,0.4\r\n"
+
+
+def test_insert_articles_maps_ids_by_url(db_manager):
+    """
+    Test that the returned IDs are assigned to the articles by URL, whatever order the
+    rows come back in.
+    """
+    articles = [Article("Express", "Test", f"http://url/{i}", PUBLISHED_DATE, "Body")
+                for i in range(3)]
+    for article in articles:
+        article.set_sentiments(0.1, 0.2, 0.3, 0.4)
+
+    with patch("load.psycopg2.extras.execute_values",
+               return_value=[(7, "http://url/2"), (5, "http://url/0"), (6, "http://url/1")]):
+        db_manager._insert_articles(articles)
+    assert [article.get_id() for article in articles] == [5, 6, 7]
+
+
+def test_large_batches_copied_through_staging_table(db_manager, mock_connection):
+    """
+    Test that batches of at least COPY_THRESHOLD articles are loaded with COPY into a
+    staging table, and inserted into the article table from it.
+    """
+    mock_cursor = mock_connection.cursor.return_value.__enter__.return_value
+    articles = [Article("Express", "Test", f"http://url/{i}", PUBLISHED_DATE, "Body")
+                for i in range(2)]
+    for article in articles:
+        article.set_sentiments(0.1, 0.2, 0.3, 0.4)
+    mock_cursor.fetchall.side_effect = [[(1, "http://url/0"), (2, "http://url/1")]]
+    db_manager.COPY_THRESHOLD = 2
+
+    with patch("load.psycopg2.extras.execute_values") as mock_execute_values:
+        db_manager._insert_articles(articles)
+    mock_execute_values.assert_not_called()
+    executed = [call.args[0] for call in mock_cursor.execute.call_args_list]
+    assert DatabaseManager.ARTICLE_STAGING_QUERY in executed
+    assert DatabaseManager.ARTICLE_STAGING_INSERT_QUERY in executed
+    assert mock_cursor.copy_expert.call_args.args[0] == DatabaseManager.ARTICLE_STAGING_COPY_QUERY
+    assert [article.get_id() for article in articles] == [1, 2]
+
+
+def test_chunks_only_inserted_when_stored(db_manager, mock_connection):
+    """
+    Test that article chunks are only inserted if the manager stores chunks.
+    """
+    mock_cursor = mock_connection.cursor.return_value.__enter__.return_value
+    article = set_scores(Article("Express", "Test", "http://url", PUBLISHED_DATE, "Body"))
+    article.set_topics_analyses([])
+    article.set_chunks([ArticleChunk(0, 10, dict.fromkeys(ArticleChunk.SCORE_KEYS, 0.0))])
+    with patch("load.psycopg2.extras.execute_values", return_value=[(42, "http://url")]):
+        db_manager.insert_into_database([article])
+    assert all(call.args[0] != DatabaseManager.ARTICLE_CHUNK_INSERT_QUERY
+               for call in mock_cursor.executemany.call_args_list)
+
+    db_manager._DatabaseManager__store_chunks = True
+    with patch("load.psycopg2.extras.execute_values", return_value=[(42, "http://url")]):
+        db_manager.insert_into_database([article])
+    mock_cursor.executemany.assert_called_with(
+        DatabaseManager.ARTICLE_CHUNK_INSERT_QUERY,
+        [(42, PUBLISHED_DATE, 0, 10, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)])
+
+
+def test_sentence_scores_inserted_for_articles_with_them(db_manager):
+    """
+    Test that the sentence scores of the inserted articles which have them are stored as
+    bytes, keyed by the article's id and published date.
+    """
+    articles = []
+    for url in ("http://scored", "http://unscored"):
+        article = set_scores(Article("Express", "Test", url, PUBLISHED_DATE, "Body."))
+        article.set_topics_analyses([])
+        articles.append(article)
+    sentence_scores = SentenceScores([[0, 5]], [[0.0, 1.0, 0.0, 0.0]])
+    articles[0].set_sentence_scores(sentence_scores)
+
+    with patch("load.psycopg2.extras.execute_values",
+               side_effect=[[(1, "http://scored"), (2, "http://unscored")], None, None]
+               ) as mock_execute:
+        db_manager.insert_into_database(articles)
+    (_, query, rows), _ = mock_execute.call_args_list[-1]
+    assert query == DatabaseManager.ARTICLE_SENTENCE_SCORE_INSERT_QUERY
+    assert rows == [(1, PUBLISHED_DATE, *sentence_scores.to_bytes())]
+
+
+def test_inserted_bodies_written_to_body_store(mock_connection, mock_reference_data):
+    """
+    Test that the bodies of the inserted articles, and only they, are written to the body
+    store before the batch is committed.
+    """
+    body_store = MagicMock()
+    mock_connection.cursor.return_value.__enter__.return_value = MagicMock()
+    db_manager = DatabaseManager(body_store=body_store)
+    body_store.write.side_effect = lambda _: mock_connection.__exit__.assert_not_called()
+    articles = []
+    for url in ("http://new", "http://stored"):
+        article = set_scores(Article("Express", "Test", url, PUBLISHED_DATE, "Body"))
+        article.set_topics_analyses([])
+        articles.append(article)
+
+    with patch("load.psycopg2.extras.execute_values", return_value=[(1, "http://new")]):
+        db_manager.insert_into_database(articles)
+    body_store.write.assert_called_once_with([(1, "http://new", PUBLISHED_DATE, "Body")])
+
+
+def test_failed_body_store_write_rolls_back_batch(mock_connection, mock_reference_data):
+    """
+    Test that an error writing the bodies leaves the transaction with the error, so the
+    batch is rolled back and its urls are not stored without their bodies.
+    """
+    body_store = MagicMock()
+    body_store.write.side_effect = OSError("Bucket unavailable")
+    mock_connection.cursor.return_value.__enter__.return_value = MagicMock()
+    db_manager = DatabaseManager(body_store=body_store)
+    article = set_scores(Article("Express", "Test", "http://new", PUBLISHED_DATE, "Body"))
+    article.set_topics_analyses([])
+
+    with patch("load.psycopg2.extras.execute_values", return_value=[(1, "http://new")]):
+        with pytest.raises(OSError, match="Bucket unavailable"):
+            db_manager.insert_into_database([article])
+    assert mock_connection.__exit__.call_args.args[0] is OSError
+
+
+def test_retried_batch_bodies_read_from_committed_segment(mock_connection, mock_reference_data,
+                                                          tmp_path):
+    """
+    Test that when a batch's commit fails and the batch is retried, the body store reads
+    the bodies written by the retry, under the article ids which were stored, rather than
+    those of the segment written before the failed commit.
+    """
+    body_store = BodyStore(LocalBlobStorage(tmp_path))
+    new_connection = MagicMock()
+    for connection in (mock_connection, new_connection):
+        connection.cursor.return_value.__enter__.return_value = MagicMock()
+    mock_connection.__exit__.side_effect = psycopg2.OperationalError("Commit failed")
+    db_manager = DatabaseManager(body_store=body_store)
+    article = set_scores(Article("Express", "Test", "http://new", PUBLISHED_DATE, "Body"))
+    article.set_topics_analyses([])
+
+    with patch("load.psycopg2.extras.execute_values",
+               side_effect=[[(1, "http://new")], None, [(2, "http://new")], None]), \
+            patch("load.db_pool.time.sleep"), \
+            patch("load.db_pool.release_connection"), \
+            patch("load.db_pool.get_connection", return_value=new_connection):
+        assert db_manager.insert_into_database([article]) == 1
+    assert article.get_id() == 2
+    assert len(body_store.get_segment_keys()) == 2
+    assert list(body_store.iter_bodies()) == [(2, hash_url("http://new"), "Body")]
+    assert body_store.get_body("http://new") == "Body"
+
+
+def test_articles_already_stored_are_skipped(db_manager, mock_connection):
+    """
+    Test that articles not returned by the insert (their url was already stored) are not
+    given an id, and that only the topics of the inserted articles are stored.
+    """
+    mock_cursor = mock_connection.cursor.return_value.__enter__.return_value
+    articles = []
+    for url in ("http://new", "http://stored"):
+        topic = TopicAnalysis("Economy", ["inflation"])
+        topic.set_sentiments(0.1, 0.2, 0.3, 0.4)
+        article = set_scores(Article("Express", "Test", url, PUBLISHED_DATE, "Body"))
+        article.set_topics_analyses([topic])
+        articles.append(article)
+
+    with patch("load.psycopg2.extras.execute_values", return_value=[(1, "http://new")]):
+        assert db_manager.insert_into_database(articles) == 1
+    assert [article.get_id() for article in articles] == [1, None]
+    assert mock_cursor.copy_expert.call_args.args[1].getvalue() == \
+        f"1,{PUBLISHED_DATE},20,0.1,0.2,0.3,0.4\r\n"
+
+
+def test_rollups_updated_with_inserted_articles(db_manager):
+    """
+    Test that the articles inserted, and only they, are added to the daily outlet and
+    topic rollups, one row per day and outlet (and topic).
+    """
+    articles = []
+    for url, compound in (("http://a", 0.5), ("http://b", -0.5), ("http://stored", 0.9)):
+        topic = TopicAnalysis("Economy", ["inflation"])
+        topic.set_sentiments(0.1, 0.2, 0.3, compound)
+        article = set_scores(Article("Express", "Test", url, PUBLISHED_DATE, "Body"))
+        article.set_topics_analyses([topic])
+        articles.append(article)
+
+    with patch("load.psycopg2.extras.execute_values",
+               side_effect=[[(1, "http://a"), (2, "http://b")], None, None]) as mock_execute:
+        assert db_manager.insert_into_database(articles) == 2
+    (_, outlet_query, outlet_rows), _ = mock_execute.call_args_list[1]
+    (_, topic_query, topic_rows), _ = mock_execute.call_args_list[2]
+    assert outlet_query == DatabaseManager.DAILY_OUTLET_ROLLUP_QUERY
+    [outlet_row] = outlet_rows
+    assert outlet_row[:3] == (PUBLISHED_DATE.date(), 2, 2)
+    assert outlet_row[3:] == pytest.approx((1.0, 0.2, 0.2, 0.4, 0.6, 0.8, 0.32))
+    assert topic_query == DatabaseManager.DAILY_TOPIC_ROLLUP_QUERY
+    [topic_row] = topic_rows
+    assert topic_row[:4] == (PUBLISHED_DATE.date(), 2, 20, 2)
+    assert topic_row[4:] == pytest.approx((0.2, 0.4, 0.6, 0.0, 0.5))
+
+
+def test_repeated_url_only_inserted_once(db_manager):
+    """
+    Test that only the first article with a url repeated in the batch is inserted and
+    given its id, even if the feed gave the repeat another published date.
+    """
+    articles = [set_scores(Article("Express", "Test", "http://url", published_date, "Body"))
+                for published_date in (PUBLISHED_DATE, datetime(2025, 1, 3))]
+    for article in articles:
+        article.set_topics_analyses([])
+
+    with patch("load.psycopg2.extras.execute_values",
+               return_value=[(3, "http://url")]) as mock_execute:
+        assert db_manager.insert_into_database(articles) == 1
+    assert [article.get_id() for article in articles] == [3, None]
+    (_, query, [insert_values]), _ = mock_execute.call_args_list[0]
+    assert query == DatabaseManager.ARTICLE_INSERT_QUERY
+    assert insert_values[2:4] == ["http://url", PUBLISHED_DATE]
+    assert "ON CONFLICT (article_url) DO NOTHING" in query
+
+
+def test_partitions_created_for_each_month_of_batch(db_manager, mock_connection):
+    """
+    Test that the monthly partitions of the batch are created once per month, in the
+    batch's transaction, before the articles are inserted.
+    """
+    mock_cursor = mock_connection.cursor.return_value.__enter__.return_value
+    dates = [datetime(2025, 1, 31, 23), datetime(2025, 2, 1), datetime(2025, 1, 2)]
+    articles = [Article("Express", "Test", f"http://url/{i}", published, "Body")
+                for i, published in enumerate(dates)]
+    for article in articles:
+        article.set_topics_analyses([])
+
+    with patch("load.psycopg2.extras.execute_values", return_value=[]):
+        db_manager.insert_into_database(articles)
+    partition_calls = [call.args for call in mock_cursor.execute.call_args_list
+                       if call.args[0] == DatabaseManager.PARTITIONS_QUERY]
+    assert partition_calls == [
+        (DatabaseManager.PARTITIONS_QUERY, (date(2025, 1, 1),)),
+        (DatabaseManager.PARTITIONS_QUERY, (date(2025, 2, 1),)),
+    ]
+
+
+def test_insert_into_database_is_one_transaction(db_manager, mock_connection):
+    """
+    Test that the batch is loaded in one transaction, which is rolled back (not
+    committed) if storing the topics fails.
+    """
+    mock_cursor = mock_connection.cursor.return_value.__enter__.return_value
+    mock_cursor.copy_expert.side_effect = psycopg2.DataError
+    article = Article("Express", "Test", "http://url", PUBLISHED_DATE, "Body")
+    article.set_topics_analyses([])
+
+    with patch("load.psycopg2.extras.execute_values", return_value=[(42, "http://url")]):
+        with pytest.raises(psycopg2.DataError):
+            db_manager.insert_into_database([article])
+    mock_connection.__enter__.assert_called_once()
+    assert mock_connection.__exit__.call_args.args[0] is psycopg2.DataError
+    mock_connection.commit.assert_not_called()
+
+
+def test_get_existing_urls_only_queries_given_urls(db_manager, mock_connection):
+    """
+    Test that `get_existing_urls` looks up the given urls, rather than fetching every url.
+    """
+    mock_cursor = mock_connection.cursor.return_value.__enter__.return_value
+    mock_cursor.fetchall.side_effect = [[("http://a",)]]
+
+    assert db_manager.get_existing_urls(("http://a", "http://b")) == ["http://a"]
+    mock_cursor.execute.assert_called_with(
+        DatabaseManager.EXISTING_URLS_QUERY, (["http://a", "http://b"],))
+
+
+def test_get_sentence_scores_since_restores_stored_bytes(db_manager, mock_connection):
+    """
+    Test that the stored sentence scores are read back as SentenceScores, from the
+    buffers psycopg2 returns BYTEA columns as.
+    """
+    mock_cursor = mock_connection.cursor.return_value.__enter__.return_value
+    sentence_scores = SentenceScores([[0, 5], [6, 10]], [[0.5, 0.5, 0.0, 0.4], [0, 1, 0, 0]])
+    offsets, scores = sentence_scores.to_bytes()
+    mock_cursor.fetchall.side_effect = [
+        [(1, "http://url", "Express", memoryview(offsets), memoryview(scores))]]
+
+    [(article_id, url, news_outlet, restored)] = \
+        db_manager.get_sentence_scores_since(datetime(2025, 1, 1))
+    mock_cursor.execute.assert_called_with(
+        DatabaseManager.SENTENCE_SCORES_SINCE_QUERY, (datetime(2025, 1, 1),))
+    assert (article_id, url, news_outlet) == (1, "http://url", "Express")
+    assert restored.to_bytes() == (offsets, scores)
+
+
+def test_insert_into_database_retries_on_new_connection(db_manager, mock_connection):
+    """
+    Test that a batch failing with a transient error is retried on a new connection
+    from the pool, the broken one being discarded.
+    """
+    new_connection = MagicMock()
+    new_connection.cursor.return_value.__enter__.return_value = MagicMock()
+    article = set_scores(Article("Express", "Test", "http://url", PUBLISHED_DATE, "Body"))
+    article.set_topics_analyses([])
+
+    with patch("load.psycopg2.extras.execute_values",
+               side_effect=[psycopg2.OperationalError, [(42, "http://url")], None]), \
+            patch("load.db_pool.time.sleep"), \
+            patch("load.db_pool.release_connection") as mock_release, \
+            patch("load.db_pool.get_connection", return_value=new_connection):
+        assert db_manager.insert_into_database([article]) == 1
+    mock_release.assert_called_once_with(mock_connection, discard=True)
+    new_connection.__exit__.assert_called_once()
+    assert article.get_id() == 42
 
 
 def test_close_connection(db_manager, mock_connection):
     """
-    Test that `close_connection` calls close() on the internal database connection.
+    Test that `close_connection` gives the connection back to the pool.
     """
-    db_manager.close_connection()
-    mock_connection.close.assert_called_once()
+    with patch("load.db_pool.release_connection") as mock_release:
+        db_manager.close_connection()
+    mock_release.assert_called_once_with(mock_connection)
 
 
 # def test_get_article_urls(db_manager, mock_connection):
@@ -3,7 +3,7 @@
 '''
 
 from datetime import datetime
-from models import TopicAnalysis, Article
+from models import TopicAnalysis, Article, ArticleChunk
 
 
 def test_topic_analysis_initialization():
@@ -32,6 +32,7 @@ def test_article_initialization_and_getters():
         body="Full article text here."
     )
     assert article.get_body() == "Full article text here."
+    assert article.get_published_date() == pub_date
     assert article.get_topic_analyses() is None
 
 
@@ -61,8 +62,8 @@ def test_article_setters_and_getters():
 
 def test_article_topic_analysis_insert_values():
     '''Test the topic analysis insert values method.'''
-    article = Article("Guardian", "Headline",
-                      "http://url", datetime.now(), "Body")
+    pub_date = datetime(2025, 1, 2)
+    article = Article("Guardian", "Headline", "http://url", pub_date, "Body")
     article.set_id(99)
 
     topic1 = TopicAnalysis("Climate", ["warming", "ice"])
@@ -77,6 +78,20 @@ def test_article_topic_analysis_insert_values():
     values = article.get_topic_analyses_insert_values(topic_id_map)
 
     assert values == [
-        (99, 1, 0.2, 0.3, 0.1, 0.05),
-        (99, 2, 0.4, 0.4, 0.1, 0.2),
+        (99, pub_date, 1, 0.2, 0.3, 0.1, 0.05),
+        (99, pub_date, 2, 0.4, 0.4, 0.1, 0.2),
+    ]
+
+
+def test_article_chunk_insert_values():
+    '''Test the chunk insert values of an article analysed in chunks.'''
+    pub_date = datetime(2025, 1, 2)
+    article = Article("Guardian", "Live", "http://url", pub_date, "Body")
+    article.set_id(7)
+    scores = {'polarity': 0.1, 'subjectivity': 0.2, 'pos': 0.3,
+              'neu': 0.4, 'neg': 0.5, 'compound': 0.6}
+    article.set_chunks([ArticleChunk(0, 120, scores), ArticleChunk(1, 80, scores)])
+    assert article.get_chunk_insert_values() == [
+        (7, pub_date, 0, 120, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6),
+        (7, pub_date, 1, 80, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6),
     ]
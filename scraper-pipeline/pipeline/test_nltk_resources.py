@@ -0,0 +1,61 @@
+'''
+    Test that the analysis starts without going to the network, within a time budget, and
+    that the compiled VADER lexicon gives the same scores.
+'''
+
+import subprocess
+import sys
+import pytest
+from nltk.sentiment import SentimentIntensityAnalyzer
+from nltk_resources import compile_lexicon, load_vader, CompiledSentimentIntensityAnalyzer
+
+STARTUP_BUDGET_SECONDS = 5.0
+
+STARTUP_SCRIPT = '''
+import os
+import socket
+import time
+
+def refuse(*args, **kwargs):
+    raise RuntimeError("startup tried to use the network")
+
+socket.socket.connect = refuse
+socket.create_connection = refuse
+socket.getaddrinfo = refuse
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+start = time.perf_counter()
+import nltk
+nltk.download = refuse
+from analysis import TextAnalyser
+analyser = TextAnalyser(valid_topics=["UK Politics"])
+print(time.perf_counter() - start)
+'''
+
+
+def test_startup_does_not_use_network_and_is_fast():
+    '''Test importing and instantiating the TextAnalyser in a fresh process.'''
+    result = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT],
+                            capture_output=True, text=True, check=False)
+    assert result.returncode == 0, result.stderr
+    assert float(result.stdout.strip()) < STARTUP_BUDGET_SECONDS
+
+
+@pytest.mark.usefixtures("nltk_data")
+def test_compiled_lexicon_gives_same_scores(tmp_path):
+    '''Test the pickled lexicon loads into an equivalent analyser.'''
+    path = str(tmp_path / 'vader_lexicon.pickle')
+    compile_lexicon(path)
+    compiled = load_vader(path)
+    original = SentimentIntensityAnalyzer()
+    assert isinstance(compiled, CompiledSentimentIntensityAnalyzer)
+    assert compiled.lexicon == original.lexicon
+    text = "The NHS is doing a GREAT job, but waiting lists are terrible!"
+    assert compiled.polarity_scores(text) == original.polarity_scores(text)
+
+
+@pytest.mark.usefixtures("nltk_data")
+def test_load_vader_is_shared(tmp_path):
+    '''Test the analyser is only loaded once.'''
+    path = str(tmp_path / 'missing.pickle')
+    assert load_vader(path) is load_vader(path)
@@ -0,0 +1,63 @@
+'''
+    Test the PolarityAnalyser gives identical scores to TextBlob.
+'''
+
+import random
+import pytest
+import nltk
+from textblob import TextBlob
+from polarity import PolarityAnalyser, tokenise_sentence
+
+# pylint: disable=redefined-outer-name,unused-argument
+
+CORPUS = [
+    "The Prime Minister said the plan was not good enough. Critics called it truly awful!",
+    "It's a really, really great day for the NHS :) Waiting lists aren't terrible (!)",
+    "Ministers were never happy. \"Not bad,\" said Mr. Smith, \"but hardly brilliant.\"",
+    "Prices rose 5% in the U.S. last year... Markets fell sharply :-( Analysts were sad.",
+    "What a wonderful result! Is it? No. It is extremely disappointing, e.g. for farmers.",
+    "Nothing happened.\n\nThe end",
+    "!...:P",
+    "!)...:D",
+    "It was awful.:( Then it was great!:)",
+    "",
+]
+WORDS = ("good bad not never no n't very really extremely terribly happily is a the great "
+         "terrible nice don't isn't I'm it's Mr. e.g. U.S. :) :-( <3 :D ;) (!) ( ! ) ! ?? "
+         "... “quoted” 'tis \"x\" sad happy love hate boring well-known").split()
+SEPARATORS = [" ", "\n", "\n\n", ". ", "! ", "? ", ", ", "", ".", "!", "..."]
+
+
+@pytest.fixture(scope="module")
+def analyser(nltk_data):
+    '''Polarity analyser, skipping the tests if the NLTK data is not installed.'''
+    return PolarityAnalyser()
+
+
+def random_texts(count: int) -> list[str]:
+    '''Random texts made of words which trigger TextBlob's special cases.'''
+    rng = random.Random(0)
+    return ["".join(rng.choice(WORDS) + rng.choice(SEPARATORS)
+                    for _ in range(rng.randint(1, 30)))
+            for _ in range(count)]
+
+
+@pytest.mark.parametrize("text", CORPUS + random_texts(500))
+def test_scores_identical_to_textblob(analyser, text):
+    '''Test the scores match TextBlob exactly, given the sentences found by NLTK.'''
+    sentiment = TextBlob(text).sentiment
+    assert analyser.score_text(text, nltk.sent_tokenize(text)) == \
+        (sentiment.polarity, sentiment.subjectivity)
+
+
+def test_sentences_not_in_text_fall_back_to_textblob(analyser):
+    '''Test sentences which do not tile the text are not used.'''
+    text = "It was not good. It was great!"
+    sentiment = TextBlob(text).sentiment
+    assert analyser.score_text(text, ["Something else."]) == \
+        (sentiment.polarity, sentiment.subjectivity)
+
+
+def test_tokenise_sentence_joins_sarcasm_mark():
+    '''Test tokens forming the sarcasm mark are joined, as in TextBlob.'''
+    assert tokenise_sentence("Great ( ! ) news") == ("great", "(!)", "news")
@@ -0,0 +1,113 @@
+'''
+    Test the re-assignment of new topics to stored articles.
+'''
+
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+import pytest
+from keyword_classifier import KeywordTopicClassifier
+from reassign import RefetchBodySource, TopicReassigner
+from sentence_store import SentenceScoreTable
+from sentiment import SentimentAnalyser
+
+# pylint: disable=redefined-outer-name
+
+pytestmark = pytest.mark.usefixtures("nltk_data")
+
+ARTICLES = [
+    (1, "https://example.com/1", "The Guardian"),
+    (2, "https://example.com/2", "Daily Express"),
+    (3, "https://example.com/3", "The Guardian"),
+]
+BODIES = {
+    "https://example.com/1": "Rents rose again. The housing crisis is terrible for renters.",
+    "https://example.com/2": "The football season ended with a great final.",
+}
+
+
+@pytest.fixture
+def db_manager():
+    '''Mock database manager with three stored articles.'''
+    manager = MagicMock()
+    manager.get_articles_since.return_value = ARTICLES
+    return manager
+
+
+@pytest.fixture
+def body_source():
+    '''Body source which cannot retrieve the third article.'''
+    source = MagicMock()
+    source.get_body.side_effect = lambda url, news_outlet: BODIES.get(url)
+    return source
+
+
+def test_only_matching_articles_get_new_topics(db_manager, body_source):
+    '''Test new topic rows are only inserted for the articles matching the new topics.'''
+    classifier = KeywordTopicClassifier({'Housing': ['housing', 'rents', 'renters']})
+    reassigner = TopicReassigner(db_manager, classifier, body_source)
+    summary = reassigner.run(['Housing'], datetime(2025, 1, 1))
+    assert summary == {'topics': ['Housing'], 'articles': 3, 'fetched': 2,
+                       'matched': 1, 'rows': 1, 'sentence_scored': 0}
+    (rows,), _ = db_manager.insert_topic_analyses.call_args
+    article_id, topic_analysis = rows[0]
+    assert article_id == 1
+    assert topic_analysis.get_topic_name() == 'Housing'
+    assert topic_analysis.get_sentiments()[3] < 0
+
+
+def test_inserts_are_batched(db_manager, body_source):
+    '''Test rows are inserted in batches.'''
+    classifier = KeywordTopicClassifier({'Housing': ['housing', 'rents', 'renters'],
+                                         'Sport': ['football', 'season', 'final']})
+    reassigner = TopicReassigner(db_manager, classifier, body_source, batch_size=1)
+    summary = reassigner.run(['Housing', 'Sport'], datetime(2025, 1, 1))
+    assert summary['rows'] == 2
+    assert db_manager.insert_topic_analyses.call_count == 2
+
+
+def test_no_topics_does_nothing(db_manager, body_source):
+    '''Test nothing is fetched when there are no new topics.'''
+    reassigner = TopicReassigner(db_manager, KeywordTopicClassifier({}), body_source)
+    assert reassigner.run([], datetime(2025, 1, 1))['articles'] == 0
+    body_source.get_body.assert_not_called()
+
+
+def test_topics_rebuilt_from_stored_sentence_scores(db_manager, body_source):
+    '''Test articles whose sentence scores and body are stored are scored from them,
+    without VADER, and the others are scored by VADER.'''
+    url = "https://example.com/1"
+    sentence_scores = SentimentAnalyser(sentence_scoring=True).score_sentences(BODIES[url])
+    db_manager.get_sentence_scores_since.return_value = [
+        (1, url, "The Guardian", sentence_scores)]
+    body_source.get_stored_body.side_effect = BODIES.get
+    classifier = KeywordTopicClassifier({'Housing': ['housing', 'rents', 'renters'],
+                                         'Sport': ['football', 'season', 'final']})
+    reassigner = TopicReassigner(db_manager, classifier, body_source, sentence_scores=True)
+
+    with patch("reassign.SentimentAnalyser.score_topics",
+               side_effect=SentimentAnalyser.score_topics, autospec=True) as mock_score:
+        summary = reassigner.run(['Housing', 'Sport'], datetime(2025, 1, 1))
+
+    db_manager.get_sentence_scores_since.assert_called_once_with(datetime(2025, 1, 1))
+    assert summary['sentence_scored'] == 1
+    assert [call.args[1] for call in mock_score.call_args_list] == \
+        [BODIES["https://example.com/2"]]
+    (rows,), _ = db_manager.insert_topic_analyses.call_args
+    topic_analyses = dict(rows)
+    key_terms = topic_analyses[1].get_key_terms()
+    rebuilt = SentenceScoreTable([BODIES[url]], [sentence_scores]).score_topic(key_terms)
+    assert topic_analyses[1].get_sentiments() == tuple(
+        float(rebuilt[key][0]) for key in ('pos', 'neu', 'neg', 'compound'))
+
+
+def test_bodies_read_from_body_store_before_fetching():
+    '''Test bodies held by the body store are not re-fetched, and the others are.'''
+    body_store = MagicMock()
+    body_store.get_body.side_effect = BODIES.get
+    source = RefetchBodySource(body_store)
+    with patch("reassign.GuardianRSSFeedExtractor.fetch_body",
+               return_value="Fetched body.") as mock_fetch:
+        assert source.get_body("https://example.com/1", "The Guardian") == \
+            BODIES["https://example.com/1"]
+        assert source.get_body("https://example.com/3", "The Guardian") == "Fetched body."
+    mock_fetch.assert_called_once_with("https://example.com/3")
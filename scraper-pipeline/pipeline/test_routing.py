@@ -0,0 +1,58 @@
+'''
+    Test the topic router.
+'''
+
+from routing import Route, TopicRouter
+
+SHORT_BODY = "word " * 300
+LONG_BODY = "word " * 2000
+
+
+def test_confident_articles_are_handled_locally():
+    '''Test that confident articles never go to the LLM.'''
+    router = TopicRouter()
+    assert router.choose("Headline", LONG_BODY, 0.9) == Route.LOCAL
+
+
+def test_unconfident_short_articles_go_to_llm_in_full():
+    '''Test that short articles without a confident local result are sent in full.'''
+    router = TopicRouter()
+    assert router.choose("Headline", SHORT_BODY, 0.0) == Route.LLM_FULL
+
+
+def test_long_or_partially_confident_articles_send_lead():
+    '''Test that long articles, and those with some local confidence, send only the lead.'''
+    router = TopicRouter()
+    assert router.choose("Headline", LONG_BODY, 0.0) == Route.LLM_LEAD
+    assert router.choose("Headline", SHORT_BODY, 0.3) == Route.LLM_LEAD
+
+
+def test_lead_is_headline_and_first_words():
+    '''Test the lead contains the headline and the first words of the body.'''
+    router = TopicRouter(lead_words=3)
+    assert router.get_lead("Headline", "one two three four") == "Headline\none two three"
+
+
+def test_exhausted_budget_falls_back_to_local():
+    '''Test that once the budget is spent, articles are handled locally.'''
+    router = TopicRouter(budget=router_cost(SHORT_BODY))
+    assert router.choose("Headline", SHORT_BODY, 0.0) == Route.LLM_FULL
+    router.record(Route.LLM_FULL, "Headline", SHORT_BODY, 1.0)
+    assert router.choose("Headline", SHORT_BODY, 0.0) == Route.LOCAL
+
+
+def test_summary_records_cost_saved():
+    '''Test that the summary counts routes and the cost saved against full LLM calls.'''
+    router = TopicRouter()
+    router.record(Route.LOCAL, "Headline", SHORT_BODY, 0.001)
+    router.record(Route.LLM_FULL, "Headline", SHORT_BODY, 1.5)
+    summary = router.get_summary()
+    assert summary['articles'] == 2
+    assert summary['routes'] == {Route.LOCAL: 1, Route.LLM_LEAD: 0, Route.LLM_FULL: 1}
+    assert summary['cost_saved'] == router_cost(SHORT_BODY)
+    assert summary['seconds_saved'] > 0
+
+
+def router_cost(body: str) -> float:
+    '''The estimated cost of sending a body to the LLM.'''
+    return TopicRouter().estimate_cost(body)
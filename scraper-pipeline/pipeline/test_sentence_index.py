@@ -0,0 +1,51 @@
+'''
+    Test the sentence index.
+'''
+
+import pytest
+from sentence_index import SentenceIndex
+
+SENTENCES = [
+    "Donald Trump announced tariffs.",
+    "China responded on Monday.",
+    "The TRUMP administration said the tariffs\nwould stay.",
+    "Nothing else happened.",
+]
+
+
+def scan(sentences: list[str], key_terms: list[str]) -> list[str]:
+    '''The reference behaviour: scan every sentence for every key term.'''
+    return [sentence for sentence in sentences
+            if any(term.lower() in sentence.lower() for term in key_terms)]
+
+
+@pytest.mark.parametrize("key_terms", [
+    ["Trump"],
+    ["tariffs", "China"],
+    ["trump administration", "monday"],
+    ["tariffs\nwould"],
+    ["missing"],
+    [""],
+    [],
+])
+def test_get_sentences_matches_scanning(key_terms):
+    '''Test that the index returns the same sentences as scanning each sentence.'''
+    assert SentenceIndex(SENTENCES).get_sentences(key_terms) == scan(SENTENCES, key_terms)
+
+
+def test_sentence_ids_are_ordered_and_unique():
+    '''Test that a sentence matched by several terms is only returned once.'''
+    sentence_index = SentenceIndex(SENTENCES)
+    assert sentence_index.get_sentence_ids(["tariffs", "trump", "Trump"]) == [0, 2]
+
+
+def test_get_context_text():
+    '''Test the context text joins the related sentences.'''
+    sentence_index = SentenceIndex(SENTENCES)
+    assert sentence_index.get_context_text(["china", "nothing"]) == \
+        "China responded on Monday. Nothing else happened."
+
+
+def test_empty_article():
+    '''Test an article without sentences.'''
+    assert SentenceIndex([]).get_sentences(["Trump", ""]) == []
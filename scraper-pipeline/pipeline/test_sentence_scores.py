@@ -0,0 +1,80 @@
+'''
+    Test the sentence scorer against VADER's document-level scores.
+'''
+
+import random
+import pytest
+from nltk.sentiment import SentimentIntensityAnalyzer
+from nltk.sentiment.vader import SentiText, VaderConstants
+from sentence_scores import SentenceScorer, SentenceCache, vader_tokens
+
+# pylint: disable=redefined-outer-name,unused-argument
+
+VOCABULARY = (
+    "good bad not never so this very extremely kind of sort least at but BUT GREAT terrible "
+    "happy sad the a UK US NHS love hate isn't don't cut the mustard yeah right kiss of death "
+    "no :) :( ! ? !! ?? great! bad. good, 'good' amazing HORRIBLE barely Trump said tariffs"
+).split()
+
+
+@pytest.fixture(scope="module")
+def analyser(nltk_data):
+    '''VADER analyser, skipping the tests if the NLTK data is not installed.'''
+    return SentimentIntensityAnalyzer()
+
+
+def random_sentences(rng: random.Random) -> list[str]:
+    '''Random sentences drawn from words which trigger VADER's special cases.'''
+    pool = [" ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(1, 8)))
+            for _ in range(6)]
+    return [rng.choice(pool) for _ in range(rng.randint(0, 8))]
+
+
+def test_combined_scores_match_vader_exactly(analyser):
+    '''Test that combining sentence scores gives exactly VADER's scores of the joined text.'''
+    scorer = SentenceScorer(analyser, SentenceCache())
+    rng = random.Random(0)
+    for _ in range(2000):
+        sentences = random_sentences(rng)
+        assert scorer.score_sentences(sentences) == \
+            analyser.polarity_scores(" ".join(sentences))
+
+
+def test_score_text_matches_vader(analyser):
+    '''Test scoring a body from its sentences, including a split VADER would not make.'''
+    scorer = SentenceScorer(analyser, SentenceCache())
+    body = "It was not good.  But the NHS was GREAT!"
+    assert scorer.score_text(body, ["It was not good.", "But the NHS was GREAT!"]) == \
+        analyser.polarity_scores(body)
+    assert scorer.score_text(body, ["It was not go", "od. But the NHS was GREAT!"]) == \
+        analyser.polarity_scores(body)
+
+
+def test_recurring_sentences_hit_the_cache(analyser):
+    '''Test that a sentence is only scored once across calls.'''
+    cache = SentenceCache()
+    scorer = SentenceScorer(analyser, cache)
+    scorer.score_sentences(["Sign up to our newsletter.", "It was good."])
+    scorer.score_sentences(["Sign up to our newsletter.", "It was bad."])
+    assert cache.get_stats() == {'size': 3, 'hits': 1, 'misses': 3}
+
+
+def test_cache_evicts_least_recently_used(analyser):
+    '''Test the cache size is bounded.'''
+    cache = SentenceCache(max_size=2)
+    scorer = SentenceScorer(analyser, cache)
+    scorer.score_sentences(["One.", "Two.", "Three."])
+    assert cache.get_stats()['size'] == 2
+    assert cache.get("One.") is None
+
+
+def test_vader_tokens_match_sentitext():
+    '''Test the tokeniser against VADER's own.'''
+    rng = random.Random(1)
+    marks = ['', '.', '!', '?!?', ',', "'", '(', '-', ':)']
+    for _ in range(2000):
+        text = " ".join(rng.choice(marks) + rng.choice(VOCABULARY) + rng.choice(marks)
+                        for _ in range(rng.randint(0, 10)))
+        sentitext = SentiText(text, VaderConstants.PUNC_LIST,
+                              VaderConstants.REGEX_REMOVE_PUNCTUATION)
+        assert vader_tokens(text) == sentitext.words_and_emoticons
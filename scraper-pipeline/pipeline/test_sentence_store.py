@@ -0,0 +1,83 @@
+'''
+    Test the sentence score store, and the topic sentiment rebuilt from it.
+'''
+
+import numpy as np
+import pytest
+from sentence_store import SentenceScores, SentenceScoreTable
+from sentiment import SentimentAnalyser
+
+# pylint: disable=redefined-outer-name,unused-argument
+
+# without the punctuation emphasis, ALL CAPS or "but" VADER applies across sentences
+BODIES = [
+    "The NHS is doing a great job. Waiting lists are terrible. Staff are happy.",
+    "Tariffs were not good for trade. Markets fell sharply. The NHS was not mentioned.",
+    "Nothing of note happened today.",
+]
+
+
+@pytest.fixture(scope="module")
+def analyser(nltk_data):
+    '''Sentiment analyser, skipping the tests if the NLTK data is not installed.'''
+    return SentimentAnalyser(sentence_scoring=True)
+
+
+def test_from_sentences_finds_offsets_in_order():
+    '''Test each sentence's offsets point at it, with repeated sentences found in turn.'''
+    body = "Good.  Bad. Good."
+    sentences = ["Good.", "Bad.", "Good."]
+    scores = [dict.fromkeys(('pos', 'neu', 'neg', 'compound'), 0.0)] * 3
+    sentence_scores = SentenceScores.from_sentences(body, sentences, scores)
+    assert sentence_scores.get_offsets().tolist() == [[0, 5], [7, 11], [12, 17]]
+    assert sentence_scores.get_sentences(body) == sentences
+
+
+def test_bytes_round_trip_at_16_bytes_per_sentence():
+    '''Test the record is stored in 16 bytes per sentence and read back unchanged.'''
+    sentence_scores = SentenceScores([[0, 5], [6, 20]],
+                                     [[0.1, 0.8, 0.1, 0.25], [0.0, 0.5, 0.5, -0.9]])
+    offsets, scores = sentence_scores.to_bytes()
+    assert len(offsets) + len(scores) == 2 * 16
+    restored = SentenceScores.from_bytes(offsets, scores)
+    assert np.array_equal(restored.get_offsets(), sentence_scores.get_offsets())
+    assert np.array_equal(restored.get_scores(), sentence_scores.get_scores())
+    assert len(restored) == 2
+
+
+def test_single_sentence_topic_matches_stored_scores():
+    '''Test a topic found in one sentence gets that sentence's scores back.'''
+    sentence_scores = SentenceScores([[0, 9], [10, 19]],
+                                     [[0.5, 0.5, 0.0, 0.6], [0.0, 0.4, 0.6, -0.7]])
+    table = SentenceScoreTable(["Good day. Bad news."], [sentence_scores])
+    scores = table.score_topic(["NEWS"])
+    assert scores['sentences'].tolist() == [1]
+    assert [scores[key][0] for key in ('pos', 'neu', 'neg', 'compound')] == \
+        pytest.approx([0.0, 0.4, 0.6, -0.7], abs=1e-3)
+
+
+def test_articles_without_matches_score_zero():
+    '''Test articles with no matching sentence (or no sentences) score zero, as VADER
+    scores empty text.'''
+    sentence_scores = [SentenceScores([[0, 9]], [[0.5, 0.5, 0.0, 0.6]]),
+                       SentenceScores(np.empty((0, 2)), np.empty((0, 4)))]
+    table = SentenceScoreTable(["Good day.", ""], sentence_scores)
+    scores = table.score_topic(["tariffs"])
+    for key in ('pos', 'neu', 'neg', 'compound', 'sentences'):
+        assert scores[key].tolist() == [0, 0]
+
+
+def test_rebuilt_scores_approximate_vader(analyser):
+    '''Test the rebuilt topic scores of each article are close to VADER's scores of the
+    matching sentences joined: the compound score to rounding, and the proportions, which
+    are weighted by sentence length rather than by VADER's token counts, roughly.'''
+    table = SentenceScoreTable(BODIES, [analyser.score_sentences(body) for body in BODIES])
+    for key_terms in (["NHS"], ["tariffs", "markets"], ["staff", "waiting lists"]):
+        rebuilt = table.score_topic(key_terms)
+        expected = [analyser.score_topics(body, [key_terms])[0] for body in BODIES]
+        assert rebuilt['sentences'].tolist() == [scores['sentences'] for scores in expected]
+        assert rebuilt['compound'] == pytest.approx(
+            [scores['compound'] for scores in expected], abs=0.01)
+        for key in ('pos', 'neu', 'neg'):
+            assert rebuilt[key] == pytest.approx(
+                [scores[key] for scores in expected], abs=0.1)
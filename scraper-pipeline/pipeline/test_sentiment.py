@@ -0,0 +1,66 @@
+'''
+    Test the sentiment analysis of article bodies and topics, on one and several processes.
+'''
+
+import pytest
+import nltk
+from sentiment import SentimentAnalyser, ParallelSentimentAnalyser
+
+# pylint: disable=redefined-outer-name,unused-argument
+
+TASKS = [
+    ("The NHS is doing a GREAT job. Waiting lists are terrible! But staff are happy.",
+     [["NHS", "waiting lists"], ["staff"]]),
+    ("Tariffs were not good for trade. Markets fell sharply.", [["tariffs", "markets"]]),
+    ("Nothing of note happened today.", []),
+] * 4
+
+
+@pytest.fixture(scope="module")
+def analyser(nltk_data):
+    '''Sentiment analyser, skipping the tests if the NLTK data is not installed.'''
+    return SentimentAnalyser()
+
+
+def test_score_topics_uses_sentences_with_key_terms(analyser):
+    '''Test each topic is scored from the sentences containing its key terms.'''
+    body = "Tariffs were not good for trade. Markets fell sharply."
+    scores = analyser.score_topics(body, [["tariffs"], ["unmentioned"]])
+    assert scores[0]['compound'] < 0
+    assert scores[0]['sentences'] == 1
+    assert scores[1] == {'neg': 0.0, 'neu': 0.0, 'pos': 0.0, 'compound': 0.0, 'sentences': 0}
+
+
+def test_score_body_includes_polarity_and_subjectivity(analyser):
+    '''Test the body scores combine TextBlob and VADER.'''
+    scores = analyser.score_body("What a wonderful, happy day.")
+    assert set(scores) == {'polarity', 'subjectivity', 'pos', 'neu', 'neg', 'compound'}
+    assert scores['polarity'] > 0 and scores['compound'] > 0
+
+
+def test_sentence_scoring_matches_document_scoring(analyser):
+    '''Test the sentence scoring mode gives the same scores.'''
+    sentence_analyser = SentimentAnalyser(sentence_scoring=True)
+    for task in TASKS:
+        assert sentence_analyser.analyse(*task) == analyser.analyse(*task)
+
+
+def test_score_sentences_scores_each_sentence(analyser):
+    '''Test each sentence is scored on its own, with its offsets in the body.'''
+    body, _ = TASKS[0]
+    sentence_scores = analyser.score_sentences(body)
+    sentences = sentence_scores.get_sentences(body)
+    assert sentences == list(nltk.sent_tokenize(body))
+    for sentence, scores in zip(sentences, sentence_scores.get_scores().tolist()):
+        expected = analyser.score_topics(sentence, [[""]])[0]
+        assert scores == pytest.approx(
+            [expected[key] for key in ('pos', 'neu', 'neg', 'compound')], abs=1e-3)
+
+
+def test_parallel_results_match_serial_in_order(analyser):
+    '''Test the process pool returns the serial results, in the order of the tasks.'''
+    parallel_analyser = ParallelSentimentAnalyser(workers=2, chunksize=2)
+    try:
+        assert parallel_analyser.analyse(TASKS) == [analyser.analyse(*task) for task in TASKS]
+    finally:
+        parallel_analyser.close()
@@ -20,6 +20,15 @@ def test_clean_date_parses_known_formats():
     assert isinstance(date_2, datetime)
 
 
+def test_clean_date_converts_offsets_to_naive_utc():
+    '''Test that a date with an offset is converted to the naive UTC date it is stored
+    as, including across the start of a month.'''
+    factory = ArticleFactory([], [])
+    assert factory._clean_date("Tue, 01 Apr 2025 00:15:00 +0100") == \
+        datetime(2025, 3, 31, 23, 15)
+    assert factory._clean_date("Wed, 10 Apr 2024 14:30:00 GMT") == datetime(2024, 4, 10, 14, 30)
+
+
 def test_clean_date_raises_on_unknown_format():
     '''Test the clean date for incorrectly formatted dates.'''
     factory = ArticleFactory([], [])
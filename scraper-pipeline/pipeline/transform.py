@@ -2,7 +2,7 @@
     Script for converting the raw, RSS feed article data into cleaned objects.
 '''
 
-from datetime import datetime
+from datetime import datetime, timezone
 from models import Article
 
 
@@ -17,7 +17,9 @@ class ArticleFactory:
 
     def _clean_date(self, date_str: str) -> datetime:
         '''Given a date string, convert to a datetime object. Different news outlets
-        have different date formats.'''
+        have different date formats. Dates with an offset are converted to naive UTC, as
+        they are stored, so the day and month of an article (e.g. of its rollups, partition
+        and body store segment) are those of the stored date.'''
         date_format_options = {
             '%a, %d %b %Y %H:%M:%S %z',
             '%a, %d %b %Y %H:%M:%S %Z',
@@ -25,6 +27,8 @@ class ArticleFactory:
         for date_format in date_format_options:
             try:
                 date_obj = datetime.strptime(date_str, date_format)
+                if date_obj.tzinfo is not None:
+                    date_obj = date_obj.astimezone(timezone.utc).replace(tzinfo=None)
                 return date_obj
             except (ValueError, TypeError):
                 continue
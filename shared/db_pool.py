@@ -0,0 +1,203 @@
+'''
+    Script defining the pooled database access shared by the scraper pipeline, the archival
+    pipeline, the dashboard and the daily report. One connection pool is created per
+    process, from the DB_* environment variables, and kept for the life of the process, so
+    warm Lambda invocations and Streamlit sessions reuse open connections. Connections run
+    with a statement timeout, transient errors are retried, and every query is timed and
+    passed to the registered query hooks.
+'''
+
+import os
+import threading
+import time
+from typing import Any, Callable
+
+import psycopg2
+import psycopg2.extras
+from psycopg2.extensions import connection, cursor, QueryCanceledError
+from psycopg2.pool import ThreadedConnectionPool
+
+DEFAULT_MIN_CONNECTIONS = 1
+DEFAULT_MAX_CONNECTIONS = 5
+DEFAULT_STATEMENT_TIMEOUT_MS = 30_000
+CONNECT_TIMEOUT_SECONDS = 10
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 0.5
+# Connections idle for longer than this (e.g. while a Lambda was frozen) are checked
+# before being handed out, as the server may have dropped them.
+PING_AFTER_SECONDS = 60
+TRANSIENT_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+_LAST_RELEASED = {}
+_QUERY_HOOKS = []
+
+
+def add_query_hook(hook: Callable[[Any, float], None]) -> None:
+    '''Register a hook called with each query (as passed to the cursor) and the seconds
+    it took, e.g. to log slow queries.'''
+    _QUERY_HOOKS.append(hook)
+
+
+def remove_query_hook(hook: Callable[[Any, float], None]) -> None:
+    '''Unregister a query hook.'''
+    _QUERY_HOOKS.remove(hook)
+
+
+def _run_query_hooks(query: Any, duration: float) -> None:
+    '''Pass a query and its duration to every query hook.'''
+    for hook in list(_QUERY_HOOKS):
+        hook(query, duration)
+
+
+class TimedCursorMixin:
+    '''Mixin timing the queries run through a cursor, for the query hooks.'''
+
+    def execute(self, query, params=None):
+        '''Execute a query, timing it.'''
+        start = time.perf_counter()
+        try:
+            return super().execute(query, params)
+        finally:
+            _run_query_hooks(query, time.perf_counter() - start)
+
+    def executemany(self, query, params_list):
+        '''Execute a query against each set of parameters, timing them together.'''
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, params_list)
+        finally:
+            _run_query_hooks(query, time.perf_counter() - start)
+
+    def copy_expert(self, sql, file, size=8192):
+        '''Run a COPY statement, timing it.'''
+        start = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            _run_query_hooks(sql, time.perf_counter() - start)
+
+
+class TimedCursor(TimedCursorMixin, cursor):
+    '''The default cursor of pooled connections.'''
+
+
+class TimedRealDictCursor(TimedCursorMixin, psycopg2.extras.RealDictCursor):
+    '''Cursor returning rows as dictionaries, timing its queries.'''
+
+
+def _get_connection_arguments() -> dict:
+    '''Get the arguments of new connections from the environment. Any PGOPTIONS are kept
+    alongside the statement timeout.'''
+    statement_timeout = int(os.environ.get(
+        'DB_STATEMENT_TIMEOUT_MS', DEFAULT_STATEMENT_TIMEOUT_MS))
+    options = f"-c statement_timeout={statement_timeout} {os.environ.get('PGOPTIONS', '')}"
+    return {
+        'dbname': os.environ["DB_NAME"],
+        'user': os.environ["DB_USERNAME"],
+        'host': os.environ["DB_HOST"],
+        'password': os.environ["DB_PASSWORD"],
+        'port': os.environ["DB_PORT"],
+        'connect_timeout': CONNECT_TIMEOUT_SECONDS,
+        'options': options.strip(),
+        'cursor_factory': TimedCursor,
+    }
+
+
+def get_pool() -> ThreadedConnectionPool:
+    '''Get the process's connection pool, creating it on first use. Up to
+    DB_POOL_MIN_CONNECTIONS idle connections are kept open, and at most
+    DB_POOL_MAX_CONNECTIONS are open at once.'''
+    global _POOL  # pylint: disable=global-statement
+    with _POOL_LOCK:
+        if _POOL is None or _POOL.closed:
+            _POOL = ThreadedConnectionPool(
+                int(os.environ.get('DB_POOL_MIN_CONNECTIONS', DEFAULT_MIN_CONNECTIONS)),
+                int(os.environ.get('DB_POOL_MAX_CONNECTIONS', DEFAULT_MAX_CONNECTIONS)),
+                **_get_connection_arguments(),
+            )
+        return _POOL
+
+
+def _is_alive(conn: connection) -> bool:
+    '''Check whether the server still answers on a connection.'''
+    try:
+        with conn.cursor(cursor_factory=cursor) as cur:
+            cur.execute('SELECT 1')
+        conn.rollback()
+        return True
+    except TRANSIENT_ERRORS:
+        return False
+
+
+def get_connection() -> connection:
+    '''Borrow a connection from the pool; it must be given back with release_connection.
+    Connections idle for longer than PING_AFTER_SECONDS are replaced if they were dropped.'''
+    pool = get_pool()
+    conn = pool.getconn()
+    released = _LAST_RELEASED.pop(id(conn), None)
+    if conn.closed or (released is not None
+                       and time.monotonic() - released > PING_AFTER_SECONDS
+                       and not _is_alive(conn)):
+        pool.putconn(conn, close=True)
+        conn = pool.getconn()
+    return conn
+
+
+def release_connection(conn: connection, discard: bool = False) -> None:
+    '''Give a borrowed connection back to the pool, rolling back any open transaction.
+    Discarded (e.g. broken) connections are closed instead of reused.'''
+    discard = discard or bool(conn.closed)
+    if not discard:
+        _LAST_RELEASED[id(conn)] = time.monotonic()
+    get_pool().putconn(conn, close=discard)
+
+
+def close_pool() -> None:
+    '''Close every connection of the process's pool.'''
+    global _POOL  # pylint: disable=global-statement
+    with _POOL_LOCK:
+        if _POOL is not None and not _POOL.closed:
+            _POOL.closeall()
+        _POOL = None
+        _LAST_RELEASED.clear()
+
+
+def retry(operation: Callable, *args, attempts: int = RETRY_ATTEMPTS,
+          on_retry: Callable[[], None] = None, **kwargs) -> Any:
+    '''Call the operation, retrying it with exponential backoff if it fails with a
+    transient error (e.g. a dropped connection or a serialization failure). on_retry is
+    called before each retry, e.g. to replace a broken connection. Statement timeouts are
+    not retried.'''
+    for attempt in range(1, attempts + 1):
+        try:
+            return operation(*args, **kwargs)
+        except TRANSIENT_ERRORS as error:
+            if attempt == attempts or isinstance(error, QueryCanceledError):
+                raise
+            print(f"Transient database error, retrying: {error}")
+            if on_retry is not None:
+                on_retry()
+            time.sleep(RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+    return None
+
+
+def run(operation: Callable[[connection], Any], attempts: int = RETRY_ATTEMPTS) -> Any:
+    '''Call the operation with a pooled connection, in a transaction committed if it
+    succeeds and rolled back if it fails. Transient errors are retried on a new
+    connection.'''
+    def attempt() -> Any:
+        conn = get_connection()
+        try:
+            with conn:
+                result = operation(conn)
+        except TRANSIENT_ERRORS:
+            release_connection(conn, discard=True)
+            raise
+        except Exception:
+            release_connection(conn)
+            raise
+        release_connection(conn)
+        return result
+    return retry(attempt, attempts=attempts)
@@ -0,0 +1,95 @@
+'''
+    Script defining the process-level cache of the reference data (the news outlet and
+    topic IDs), which is almost static. Within the TTL the cached maps are used without
+    querying the database; once it has passed, a single cheap version query (the highest
+    ID and count of each table) decides whether the maps are reloaded or kept for another
+    TTL. Call invalidate after changing the reference tables in the same process.
+'''
+
+import os
+import threading
+import time
+
+from psycopg2.extensions import connection
+
+import db_pool
+
+DEFAULT_TTL_SECONDS = 600
+NEWS_OUTLETS_QUERY = 'SELECT news_outlet_name, news_outlet_id FROM news_outlet'
+TOPICS_QUERY = 'SELECT topic_name, topic_id FROM topic'
+VERSION_QUERY = '''
+    SELECT
+        (SELECT COALESCE(MAX(news_outlet_id), 0) FROM news_outlet),
+        (SELECT COUNT(*) FROM news_outlet),
+        (SELECT COALESCE(MAX(topic_id), 0) FROM topic),
+        (SELECT COUNT(*) FROM topic);
+'''
+
+
+class ReferenceDataCache:
+    '''Class caching the news outlet and topic IDs for the life of the process.'''
+
+    def __init__(self, ttl_seconds: float = None):
+        '''Instantiate the cache. The TTL defaults to REFERENCE_DATA_TTL_SECONDS, or ten
+        minutes.'''
+        self.__ttl_seconds = ttl_seconds
+        self.__lock = threading.Lock()
+        self.__version = None
+        self.__news_outlet_ids = None
+        self.__topic_ids = None
+        self.__checked_at = None
+
+    def _get_ttl_seconds(self) -> float:
+        '''Get the TTL, read from the environment when first needed if not given.'''
+        if self.__ttl_seconds is None:
+            self.__ttl_seconds = float(
+                os.environ.get('REFERENCE_DATA_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+        return self.__ttl_seconds
+
+    def _query(self, conn: connection, query: str) -> list[tuple]:
+        '''Run a query on the connection, or on a pooled connection if none is given.'''
+        def fetch(conn: connection) -> list[tuple]:
+            with conn.cursor() as cur:
+                cur.execute(query)
+                return cur.fetchall()
+        if conn is not None:
+            return fetch(conn)
+        return db_pool.run(fetch)
+
+    def _refresh(self, conn: connection) -> None:
+        '''Load the maps if there are none, or check their version once the TTL has passed
+        and reload them if it changed.'''
+        now = time.monotonic()
+        if self.__checked_at is not None and now - self.__checked_at < self._get_ttl_seconds():
+            return
+        version = self._query(conn, VERSION_QUERY)[0]
+        if version != self.__version:
+            self.__news_outlet_ids = dict(self._query(conn, NEWS_OUTLETS_QUERY))
+            self.__topic_ids = dict(self._query(conn, TOPICS_QUERY))
+            self.__version = version
+        self.__checked_at = now
+
+    def get_news_outlet_ids(self, conn: connection = None) -> dict[str, int]:
+        '''Get a map of news outlet names to IDs. The queries, if any are needed, run on
+        the given connection, or on a pooled one.'''
+        with self.__lock:
+            self._refresh(conn)
+            return dict(self.__news_outlet_ids)
+
+    def get_topic_ids(self, conn: connection = None) -> dict[str, int]:
+        '''Get a map of topic names to IDs.'''
+        with self.__lock:
+            self._refresh(conn)
+            return dict(self.__topic_ids)
+
+    def get_topic_names(self, conn: connection = None) -> list[str]:
+        '''Get the sorted topic names.'''
+        return sorted(self.get_topic_ids(conn))
+
+    def invalidate(self) -> None:
+        '''Check the version on the next lookup, whatever the TTL.'''
+        with self.__lock:
+            self.__checked_at = None
+
+
+REFERENCE_DATA = ReferenceDataCache()
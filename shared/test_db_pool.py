@@ -0,0 +1,168 @@
+'''
+    Script for testing the shared pooled database access.
+'''
+
+from unittest.mock import MagicMock, patch
+import psycopg2
+import psycopg2.extensions
+import pytest
+import db_pool
+
+# pylint: disable=redefined-outer-name, protected-access, unused-argument
+
+
+def make_connection() -> MagicMock:
+    '''Mock an open connection.'''
+    conn = MagicMock()
+    conn.closed = 0
+    return conn
+
+
+@pytest.fixture(autouse=True)
+def mock_env_vars(monkeypatch):
+    '''Mock environment variables for database connections.'''
+    monkeypatch.setenv("DB_NAME", "test_db")
+    monkeypatch.setenv("DB_USERNAME", "user")
+    monkeypatch.setenv("DB_HOST", "localhost")
+    monkeypatch.setenv("DB_PASSWORD", "pass")
+    monkeypatch.setenv("DB_PORT", "5432")
+    monkeypatch.delenv("PGOPTIONS", raising=False)
+
+
+@pytest.fixture
+def mock_connect():
+    '''Mock psycopg2.connect (as used by the pool), giving a new connection each call.'''
+    with patch("psycopg2.connect", side_effect=lambda **_: make_connection()) as connect:
+        yield connect
+    db_pool.close_pool()
+
+
+@pytest.fixture(autouse=True)
+def no_sleep():
+    '''Skip the retry backoff.'''
+    with patch("db_pool.time.sleep") as sleep:
+        yield sleep
+
+
+def test_pool_created_once_with_statement_timeout(mock_connect, monkeypatch):
+    '''Test that a single pool is created per process, whose connections have the
+    statement timeout and keep any PGOPTIONS.'''
+    monkeypatch.setenv("DB_STATEMENT_TIMEOUT_MS", "5000")
+    monkeypatch.setenv("PGOPTIONS", "-c search_path=test")
+
+    assert db_pool.get_pool() is db_pool.get_pool()
+    kwargs = mock_connect.call_args.kwargs
+    assert kwargs["dbname"] == "test_db"
+    assert kwargs["options"] == "-c statement_timeout=5000 -c search_path=test"
+    assert kwargs["cursor_factory"] is db_pool.TimedCursor
+
+
+def test_released_connection_reused(mock_connect):
+    '''Test that a released connection is handed out again rather than reconnecting.'''
+    conn = db_pool.get_connection()
+    db_pool.release_connection(conn)
+
+    assert db_pool.get_connection() is conn
+    assert mock_connect.call_count == 1
+
+
+def test_discarded_connection_closed(mock_connect):
+    '''Test that a discarded connection is closed and replaced on the next borrow.'''
+    conn = db_pool.get_connection()
+    db_pool.release_connection(conn, discard=True)
+
+    conn.close.assert_called_once()
+    assert db_pool.get_connection() is not conn
+
+
+def test_idle_dropped_connection_replaced(mock_connect):
+    '''Test that a connection idle for too long is checked, and replaced if the server
+    dropped it.'''
+    conn = db_pool.get_connection()
+    conn.cursor.return_value.__enter__.return_value.execute.side_effect = \
+        psycopg2.OperationalError
+    db_pool.release_connection(conn)
+    db_pool._LAST_RELEASED[id(conn)] -= db_pool.PING_AFTER_SECONDS + 1
+
+    new_conn = db_pool.get_connection()
+    assert new_conn is not conn
+    conn.close.assert_called()
+    assert mock_connect.call_count == 2
+
+
+def test_retry_retries_transient_errors():
+    '''Test that transient errors are retried, calling on_retry before each retry.'''
+    operation = MagicMock(side_effect=[psycopg2.OperationalError, psycopg2.InterfaceError, 7])
+    on_retry = MagicMock()
+
+    assert db_pool.retry(operation, 1, attempts=3, on_retry=on_retry) == 7
+    assert operation.call_count == 3
+    assert on_retry.call_count == 2
+    operation.assert_called_with(1)
+
+
+def test_retry_gives_up_after_attempts():
+    '''Test that the last transient error is raised once the attempts run out.'''
+    operation = MagicMock(side_effect=psycopg2.OperationalError("down"))
+
+    with pytest.raises(psycopg2.OperationalError, match="down"):
+        db_pool.retry(operation, attempts=2)
+    assert operation.call_count == 2
+
+
+@pytest.mark.parametrize("error", [psycopg2.extensions.QueryCanceledError, ValueError])
+def test_retry_does_not_retry_other_errors(error):
+    '''Test that statement timeouts and non-database errors are raised immediately.'''
+    operation = MagicMock(side_effect=error)
+
+    with pytest.raises(error):
+        db_pool.retry(operation)
+    operation.assert_called_once()
+
+
+def test_run_discards_broken_connection_and_retries(mock_connect):
+    '''Test that run retries on a new connection after a transient error, and releases
+    the connection it succeeded on to the pool.'''
+    used = []
+
+    def operation(conn):
+        used.append(conn)
+        if len(used) == 1:
+            raise psycopg2.OperationalError
+        return "rows"
+
+    assert db_pool.run(operation) == "rows"
+    assert used[0] is not used[1]
+    used[0].close.assert_called_once()
+    used[1].__enter__.assert_called_once()
+    assert db_pool.get_connection() is used[1]
+
+
+def test_query_hooks_receive_durations():
+    '''Test that queries run through a timed cursor are passed to the query hooks, even
+    if they fail.'''
+
+    class FakeCursor:
+        # pylint: disable=too-few-public-methods
+        '''Cursor failing on any query but SELECT 1.'''
+
+        def execute(self, query, params=None):
+            '''Run the query.'''
+            if query != "SELECT 1":
+                raise psycopg2.ProgrammingError
+            return params
+
+    class FakeTimedCursor(db_pool.TimedCursorMixin, FakeCursor):
+        '''Timed fake cursor.'''
+
+    hook = MagicMock()
+    db_pool.add_query_hook(hook)
+    try:
+        FakeTimedCursor().execute("SELECT 1")
+        with pytest.raises(psycopg2.ProgrammingError):
+            FakeTimedCursor().execute("SELECT nothing")
+    finally:
+        db_pool.remove_query_hook(hook)
+
+    assert [call.args[0] for call in hook.call_args_list] == ["SELECT 1", "SELECT nothing"]
+    assert all(call.args[1] >= 0 for call in hook.call_args_list)
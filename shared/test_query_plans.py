@@ -0,0 +1,169 @@
+'''
+    Regression tests of the query plans of the dashboard, daily report and pipeline
+    queries, against the schema in architecture/schema and a large synthetic dataset. They
+    need a Postgres database, given by the DB_* variables, and are skipped without one. The
+    schema is created in its own Postgres schema, dropped afterwards.
+'''
+
+import ast
+import os
+from datetime import date, timedelta
+import psycopg2
+import pytest
+import db_pool
+
+# pylint: disable=redefined-outer-name
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SCHEMA_FILE = os.path.join(REPO_DIR, 'architecture', 'schema', 'schema.sql')
+TEST_SCHEMA = 'query_plan_test'
+ARTICLE_COUNT = 200_000
+TOPIC_COUNT = 100
+FIRST_DAY = date(2024, 1, 1)
+DAY = date(2024, 3, 14)
+DAY_RANGE = {'day_start': DAY, 'day_end': DAY + timedelta(days=1)}
+
+SYNTHETIC_DATA_QUERIES = (
+    f'''
+    SELECT create_article_partitions(month::DATE)
+    FROM generate_series(DATE '{FIRST_DAY}', DATE '{FIRST_DAY}' + INTERVAL '10 months',
+                         INTERVAL '1 month') AS month;
+    ''',
+    f'''
+    INSERT INTO topic (topic_name)
+    SELECT 'Topic ' || i FROM generate_series(1, {TOPIC_COUNT}) AS i;
+    ''',
+    # two minutes apart, in publication order, as the pipeline loads them
+    f'''
+    INSERT INTO article
+        (news_outlet_id, article_headline, article_url, article_published_date,
+         article_subjectivity, article_polarity, article_positive_sentiment,
+         article_neutral_sentiment, article_negative_sentiment, article_compound_sentiment)
+    SELECT 1 + i % 2, 'Headline ' || i, 'https://example.com/' || i,
+        TIMESTAMP '{FIRST_DAY}' + i * INTERVAL '2 minutes',
+        random(), random(), random(), random(), random(), random()
+    FROM generate_series(1, {ARTICLE_COUNT}) AS i;
+    ''',
+    f'''
+    INSERT INTO article_topic
+    SELECT article_id, article_published_date, 1 + article_id % {TOPIC_COUNT},
+        random(), random(), random(), random()
+    FROM article;
+    ''',
+    'ANALYZE article, article_topic, topic, news_outlet;',
+)
+
+INDEX_SCANS = {'Index Scan', 'Index Only Scan', 'Bitmap Index Scan'}
+
+
+def read_constant(path: str, name: str):
+    '''Read a module or class constant from the source of a module of the repository. The
+    modules are not imported, as each service has its own dependencies (and two have a
+    database_manager module).'''
+    with open(os.path.join(REPO_DIR, path), encoding='utf-8') as file:
+        tree = ast.parse(file.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and any(
+                isinstance(target, ast.Name) and target.id == name for target in node.targets):
+            return ast.literal_eval(node.value)
+    raise LookupError(f'{name} is not defined in {path}.')
+
+
+# The queries checked, as the daily report (report_creator.py), the dashboard (page2.py),
+# the archival pipeline and the scraper pipeline run them.
+REPORT_MODULE = os.path.join('daily-report', 'report_creator.py')
+TOP_ARTICLES_QUERIES = {name: read_constant(REPORT_MODULE, name)
+                        for name in ('TOP_NEGATIVE_ARTICLES', 'TOP_POSITIVE_ARTICLES')}
+DASHBOARD_MODULE = os.path.join('dashboard', 'page2.py')
+ARTICLES_OF_DAY_QUERY = read_constant(DASHBOARD_MODULE, 'ARTICLES_OF_DAY_QUERY').format(
+    metric_column=read_constant(DASHBOARD_MODULE, 'METRIC_COLUMN_MAP')['Polarity'])
+ARCHIVAL_MODULE = os.path.join('archival-pipeline', 'database_manager.py')
+ARCHIVE_QUERIES = {name: read_constant(ARCHIVAL_MODULE, name)
+                   for name in ('FETCH_ARTICLE_DATA_QUERY', 'ARCHIVED_ROW_COUNT_QUERY')}
+UNASSIGNED_TOPICS_QUERY = read_constant(os.path.join('scraper-pipeline', 'pipeline', 'load.py'),
+                                        'UNASSIGNED_TOPICS_QUERY')
+DAY_PARAMS = (DAY_RANGE['day_start'], DAY_RANGE['day_end'])
+
+
+@pytest.fixture(scope='module')
+def conn():
+    '''A connection to the test schema, filled with the synthetic dataset.'''
+    if 'DB_HOST' not in os.environ:
+        pytest.skip('No database configured (DB_HOST is not set).')
+    try:
+        connection = db_pool.get_connection()
+    except psycopg2.OperationalError as error:
+        pytest.skip(f'Database unavailable: {error}')
+    with open(SCHEMA_FILE, encoding='utf-8') as file:
+        schema = ''.join(line for line in file if not line.startswith('\\copy'))
+    with connection.cursor() as cur:
+        cur.execute(f'DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE;')
+        cur.execute(f'CREATE SCHEMA {TEST_SCHEMA};')
+        cur.execute(f'SET search_path TO {TEST_SCHEMA};')
+        cur.execute(schema)
+        for query in SYNTHETIC_DATA_QUERIES:
+            cur.execute(query)
+    connection.commit()
+    yield connection
+    connection.rollback()
+    with connection.cursor() as cur:
+        cur.execute(f'DROP SCHEMA {TEST_SCHEMA} CASCADE;')
+        cur.execute('RESET search_path;')
+    connection.commit()
+    db_pool.release_connection(connection)
+
+
+def explain(conn, query: str, params) -> list[dict]:
+    '''Get every node of the plan of the query, with its (named or positional) parameters.'''
+    with conn.cursor() as cur:
+        cur.execute(f'EXPLAIN (FORMAT JSON) {query}', params)
+        plan = cur.fetchone()[0][0]['Plan']
+    nodes, pending = [], [plan]
+    while pending:
+        node = pending.pop()
+        nodes.append(node)
+        pending.extend(node.get('Plans', []))
+    return nodes
+
+
+def scanned_relations(nodes: list[dict]) -> set[str]:
+    '''Get the tables (partitions) scanned by a plan.'''
+    return {node['Relation Name'] for node in nodes if 'Relation Name' in node}
+
+
+@pytest.mark.parametrize('name', TOP_ARTICLES_QUERIES)
+def test_report_top_articles_use_index_of_one_partition(conn, name):
+    '''Test that the daily report reads a day's articles of an outlet through an index of
+    the partition of that month alone.'''
+    nodes = explain(conn, TOP_ARTICLES_QUERIES[name], {'outlet_id': 1, **DAY_RANGE})
+    assert scanned_relations(nodes) == {'article_p2024_03'}
+    assert any(node['Node Type'] in INDEX_SCANS for node in nodes)
+
+
+def test_dashboard_articles_of_day_use_index_of_one_partition(conn):
+    '''Test that the dashboard reads a day's articles, with a metric column, through an
+    index of the partition of that month alone.'''
+    nodes = explain(conn, ARTICLES_OF_DAY_QUERY, DAY_PARAMS)
+    assert scanned_relations(nodes) - {'news_outlet'} == {'article_p2024_03'}
+    assert any(node['Node Type'] in INDEX_SCANS
+               and node.get('Index Name', '').startswith('article_p')
+               for node in nodes)
+
+
+@pytest.mark.parametrize('name', ARCHIVE_QUERIES)
+def test_archive_of_day_prunes_article_partitions(conn, name):
+    '''Test that the archival pipeline reads a day's articles, joined to their topics,
+    from the article partition of that month alone.'''
+    nodes = explain(conn, ARCHIVE_QUERIES[name], DAY_PARAMS)
+    assert {relation for relation in scanned_relations(nodes)
+            if relation.startswith('article_p')} == {'article_p2024_03'}
+
+
+def test_unassigned_topics_use_topic_index(conn):
+    '''Test that the pipeline looks up the articles of each topic, to find the topics
+    without any, through the topic index.'''
+    nodes = explain(conn, UNASSIGNED_TOPICS_QUERY, None)
+    assert any(node['Node Type'] in INDEX_SCANS
+               and node.get('Index Name', '').startswith('article_topic_p')
+               and 'topic_id' in node['Index Name']
+               for node in nodes)
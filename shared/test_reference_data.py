@@ -0,0 +1,116 @@
+'''
+    Script for testing the reference data cache.
+'''
+
+from unittest.mock import MagicMock, patch
+import pytest
+import reference_data
+from reference_data import ReferenceDataCache
+
+# pylint: disable=redefined-outer-name, unused-argument
+
+
+class FakeDatabase:
+    '''Mock of the reference tables, counting the queries run against them.'''
+
+    def __init__(self):
+        self.news_outlets = [("The Guardian", 1), ("Daily Express", 2)]
+        self.topics = [("Economy", 1), ("Politics", 2)]
+        self.queries = []
+
+    def fetch(self, query: str) -> list[tuple]:
+        '''Answer a query.'''
+        self.queries.append(query)
+        if query == reference_data.VERSION_QUERY:
+            return [(max(i for _, i in self.news_outlets), len(self.news_outlets),
+                     max(i for _, i in self.topics), len(self.topics))]
+        if query == reference_data.NEWS_OUTLETS_QUERY:
+            return list(self.news_outlets)
+        return list(self.topics)
+
+    def connection(self) -> MagicMock:
+        '''Mock a connection to the database.'''
+        conn = MagicMock()
+        cursor = conn.cursor.return_value.__enter__.return_value
+        cursor.execute.side_effect = lambda query: setattr(
+            cursor, 'rows', self.fetch(query))
+        cursor.fetchall.side_effect = lambda: cursor.rows
+        return conn
+
+
+@pytest.fixture
+def database():
+    '''Mock database.'''
+    return FakeDatabase()
+
+
+@pytest.fixture
+def clock():
+    '''Mock monotonic clock, advanced by setting its return value.'''
+    with patch("reference_data.time.monotonic", return_value=0.0) as monotonic:
+        yield monotonic
+
+
+def test_maps_loaded_once_within_ttl(database, clock):
+    '''Test that the maps are only queried once within the TTL.'''
+    cache = ReferenceDataCache(ttl_seconds=60)
+    conn = database.connection()
+
+    assert cache.get_news_outlet_ids(conn) == {"The Guardian": 1, "Daily Express": 2}
+    clock.return_value = 59.0
+    assert cache.get_topic_ids(conn) == {"Economy": 1, "Politics": 2}
+    assert cache.get_topic_names(conn) == ["Economy", "Politics"]
+    assert len(database.queries) == 3
+
+
+def test_unchanged_version_keeps_maps(database, clock):
+    '''Test that once the TTL has passed only the version is queried if the reference
+    tables have not changed.'''
+    cache = ReferenceDataCache(ttl_seconds=60)
+    conn = database.connection()
+    cache.get_topic_ids(conn)
+    clock.return_value = 61.0
+
+    cache.get_topic_ids(conn)
+    assert database.queries[3:] == [reference_data.VERSION_QUERY]
+
+
+def test_new_topic_reloads_maps(database, clock):
+    '''Test that a new topic is picked up once the TTL has passed.'''
+    cache = ReferenceDataCache(ttl_seconds=60)
+    conn = database.connection()
+    cache.get_topic_ids(conn)
+    database.topics.append(("Housing", 3))
+
+    assert "Housing" not in cache.get_topic_ids(conn)
+    clock.return_value = 61.0
+    assert cache.get_topic_ids(conn)["Housing"] == 3
+
+
+def test_invalidate_checks_version_immediately(database, clock):
+    '''Test that invalidating the cache checks the version on the next lookup.'''
+    cache = ReferenceDataCache(ttl_seconds=60)
+    conn = database.connection()
+    cache.get_topic_ids(conn)
+    database.topics.append(("Housing", 3))
+
+    cache.invalidate()
+    assert "Housing" in cache.get_topic_names(conn)
+
+
+def test_returned_maps_are_copies(database, clock):
+    '''Test that changing a returned map does not change the cache.'''
+    cache = ReferenceDataCache(ttl_seconds=60)
+    cache.get_topic_ids(database.connection())["Economy"] = 99
+
+    assert cache.get_topic_ids(database.connection())["Economy"] == 1
+
+
+def test_pooled_connection_used_without_connection(database, clock):
+    '''Test that the queries run on a pooled connection if no connection is given.'''
+    cache = ReferenceDataCache(ttl_seconds=60)
+    conn = database.connection()
+    with patch("reference_data.db_pool.run",
+               side_effect=lambda operation: operation(conn)) as mock_run:
+        assert cache.get_news_outlet_ids()["The Guardian"] == 1
+    assert mock_run.call_count == 3